@@ -0,0 +1,59 @@
+"""
+Vectorized aggregations for the reporting layer.
+
+Callers pull the handful of columns a report needs (amount, month index,
+property id, type code) in one streamed query; everything here works on
+those plain NumPy arrays and never touches ORM objects.
+"""
+import math
+from itertools import chain
+
+import numpy as np
+
+AMOUNT, MONTH, PROPERTY, KIND = range(4)
+
+
+def to_columns(partitions, width=4):
+    # Each partition is a list of numeric rows from the database cursor;
+    # flattening through fromiter avoids numpy probing every row object
+    chunks = [np.fromiter(chain.from_iterable(chunk), dtype=np.float64,
+                          count=len(chunk) * width).reshape(-1, width)
+              for chunk in partitions]
+    if not chunks:
+        return np.empty((0, width))
+    return np.concatenate(chunks)
+
+
+def group_sum(keys, values, size):
+    return np.bincount(keys.astype(np.int64), weights=values, minlength=size)[:size]
+
+
+def group_by_key(keys, values):
+    # For sparse keys such as property ids: returns (unique keys, sums)
+    unique, inverse = np.unique(keys.astype(np.int64), return_inverse=True)
+    return unique, np.bincount(inverse, weights=values, minlength=len(unique))
+
+
+def rolling_mean(series, window):
+    result = np.full(series.shape, np.nan)
+    if len(series) >= window:
+        totals = np.cumsum(np.concatenate(([0.0], series)))
+        result[window - 1:] = (totals[window:] - totals[:-window]) / window
+    return result
+
+
+def period_delta(series, period=12):
+    # Absolute and relative change against the same month `period` months back
+    delta = np.full(series.shape, np.nan)
+    ratio = np.full(series.shape, np.nan)
+    if len(series) > period:
+        prior = series[:-period]
+        delta[period:] = series[period:] - prior
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio[period:] = np.where(prior != 0, delta[period:] / np.abs(prior), np.nan)
+    return delta, ratio
+
+
+def to_list(values, digits=2):
+    # JSON-friendly: NaN becomes None
+    return [None if math.isnan(v) else round(v, digits) for v in values.tolist()]
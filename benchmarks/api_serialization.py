@@ -0,0 +1,83 @@
+"""
+API page benchmark: payload size and time for one large page of payments,
+ORM objects with to_dict() and jsonify versus the /api/v1 column path.
+
+    python benchmarks/api_serialization.py --rows 10000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+
+from app import create_app
+from extensions import db
+from models import Owner, Payment, Property, Tenant
+from serialization import dumps, orjson
+from services import api_page, payments_page
+
+app = create_app()
+
+
+def seed(rows):
+    db.session.add(Owner(id=1, username='bench', email='bench@example.com'))
+    db.session.flush()
+    db.session.execute(db.insert(Property), [dict(id=1, name='Unit 1', owner_id=1, monthly_rent=1000)])
+    db.session.execute(db.insert(Tenant), [dict(id=1, name='Tenant 1', phone='5550000001', property_id=1, owner_id=1)])
+    first = date(2015, 1, 1)
+    db.session.execute(db.insert(Payment), [
+        dict(property_id=1, owner_id=1, tenant_id=1, amount=1000 + i % 7, payment_type='rent', status='completed',
+             payment_method='bank_transfer', payment_date=first + timedelta(days=i % 3000), notes='')
+        for i in range(rows)])
+    db.session.commit()
+
+
+def naive(rows):
+    payments, next_cursor = payments_page(1, limit=rows)
+    return jsonify({'items': [p.to_dict() for p in payments], 'next_cursor': next_cursor}).get_data()
+
+
+def columnar(rows, fields=None):
+    names = fields or ['id', 'property_id', 'tenant_id', 'amount', 'payment_date', 'payment_method',
+                       'payment_type', 'status', 'notes']
+    items, next_cursor = api_page(1, 'payments', names, {}, limit=rows)
+    return dumps({'items': items, 'next_cursor': next_cursor})
+
+
+def measure(label, fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    print('%-40s %7.1f ms median %9d bytes' % (label, statistics.median(timings), len(body)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    with app.test_request_context():
+        db.create_all()
+        seed(args.rows)
+        print('encoder: %s' % ('orjson' if orjson else 'json'))
+        measure('to_dict() + jsonify', lambda: naive(args.rows), args.iterations)
+        measure('/api/v1 all fields', lambda: columnar(args.rows), args.iterations)
+        measure('/api/v1 fields=id,amount,payment_date',
+                lambda: columnar(args.rows, ['id', 'amount', 'payment_date']), args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Bulk payment import benchmark: rows per second and peak memory.
+
+    python benchmarks/bulk_import.py --rows 1000000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import resource
+import sys
+import time
+from datetime import date, timedelta
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from importer import ErrorReport, read_records
+from models import Owner, Property, Tenant
+from services import import_records
+
+app = create_app()
+
+
+def write_csv(path, rows, units):
+    rng = random.Random(3)
+    first_day = date(2020, 1, 1)
+    with open(path, 'w', newline='') as fileobj:
+        writer = csv.writer(fileobj)
+        writer.writerow(['property_id', 'tenant_id', 'amount', 'payment_date', 'payment_type', 'payment_method'])
+        for _ in range(rows):
+            unit = rng.randint(1, units)
+            writer.writerow([unit, unit, rng.randint(500, 3000),
+                             (first_day + timedelta(days=rng.randrange(1800))).isoformat(),
+                             'rent', 'bank_transfer'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--units', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    path = os.path.join(_tmp_dir, 'payments.csv')
+    write_csv(path, args.rows, args.units)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Owner(id=1, username='bench', email='bench@example.com'))
+        db.session.execute(db.insert(Property), [
+            dict(id=i, name='Unit %d' % i, owner_id=1, monthly_rent=1000) for i in range(1, args.units + 1)])
+        db.session.execute(db.insert(Tenant), [
+            dict(id=i, name='Tenant %d' % i, phone='555%07d' % i, property_id=i, owner_id=1)
+            for i in range(1, args.units + 1)])
+        db.session.commit()
+
+        started = time.perf_counter()
+        with open(path, 'rb') as stream:
+            errors = ErrorReport(io.StringIO())
+            imported = import_records(1, 'payments', read_records(stream, path), errors, args.batch_size)
+        elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    print('imported %d rows (%d rejected) in %.1f s: %.0f rows/s, peak RSS %.0f MB' % (
+        imported, errors.count, elapsed, imported / elapsed, peak_mb))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Cold-start benchmark: how long a fresh worker process takes to import the
+app, build it with create_app() and serve its first request, and its peak
+memory. Every run is a new interpreter, so nothing is warm but the OS page
+cache; the first run is discarded.
+
+    python benchmarks/cold_start.py --runs 10 --output cold-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from datagen import scratch_instance
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child; the unauthenticated dashboard request goes through
+# routing, the session store and login_required without rendering a template
+CHILD = '''
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/dashboard')
+served = time.perf_counter()
+assert response.status_code == 302, response.status_code
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'total_ms': (served - started) * 1000,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def run_once(env):
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=ROOT).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help='Write results to this JSON file.')
+    args = parser.parse_args()
+
+    tmp_dir = scratch_instance()
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp_dir, 'bench.db'))
+    runs = [run_once(env) for _ in range(args.runs + 1)][1:]
+
+    results = {}
+    for name in runs[0]:
+        values = [run[name] for run in runs]
+        results[name] = {'median': round(statistics.median(values), 2), 'min': round(min(values), 2),
+                         'max': round(max(values), 2)}
+        print('%-18s %10.2f median %10.2f min %10.2f max' % (
+            name, results[name]['median'], results[name]['min'], results[name]['max']))
+    if args.output:
+        report = {
+            'commit': _git_commit(),
+            'created_at': datetime.utcnow().isoformat(),
+            'runs': args.runs,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.output, 'w') as fileobj:
+            json.dump(report, fileobj, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Dashboard query benchmark: the original five-query dashboard versus the
+single aggregated query and the materialized OwnerStats row.
+
+    python benchmarks/dashboard.py --units 2000 --iterations 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models import MaintenanceRequest, Owner, Payment, Property, Tenant
+from services import compute_owner_stats, get_owner_stats
+
+app = create_app()
+
+
+def seed(units, payments_per_unit):
+    rng = random.Random(42)
+    db.session.add(Owner(id=1, username='bench', email='bench@example.com'))
+    db.session.flush()
+    db.session.execute(db.insert(Property), [
+        dict(id=i, name='Unit %d' % i, owner_id=1, monthly_rent=rng.randint(500, 3000))
+        for i in range(1, units + 1)
+    ])
+    db.session.execute(db.insert(Tenant), [
+        dict(id=i, name='Tenant %d' % i, phone='555%07d' % i, property_id=i, owner_id=1,
+             is_active=rng.random() < 0.9)
+        for i in range(1, units + 1)
+    ])
+    start = date(2020, 1, 1)
+    db.session.execute(db.insert(Payment), [
+        dict(property_id=i, owner_id=1, tenant_id=i, amount=1000, payment_type='rent', status='completed',
+             payment_date=start + timedelta(days=30 * n))
+        for i in range(1, units + 1) for n in range(payments_per_unit)
+    ])
+    db.session.execute(db.insert(MaintenanceRequest), [
+        dict(property_id=rng.randint(1, units), owner_id=1, status=rng.choice(['open', 'in_progress', 'completed']))
+        for _ in range(units)
+    ])
+    db.session.commit()
+
+
+def legacy_dashboard(owner_id):
+    Property.query.filter_by(owner_id=owner_id).count()
+    db.session.query(Tenant).join(Property).filter(
+        Property.owner_id == owner_id, Tenant.is_active == True).count()
+    db.session.query(db.func.sum(Property.monthly_rent)).filter_by(owner_id=owner_id).scalar()
+    recent_payments(owner_id)
+    db.session.query(MaintenanceRequest).join(Property).filter(
+        Property.owner_id == owner_id, MaintenanceRequest.status != 'completed').count()
+
+
+def recent_payments(owner_id):
+    return db.session.query(Payment).join(Property).filter(
+        Property.owner_id == owner_id
+    ).order_by(Payment.payment_date.desc()).limit(5).all()
+
+
+def aggregated_dashboard(owner_id):
+    compute_owner_stats(owner_id)
+    recent_payments(owner_id)
+
+
+def materialized_dashboard(owner_id):
+    get_owner_stats(owner_id)
+    recent_payments(owner_id)
+
+
+def measure(fn, iterations):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    timings = []
+    try:
+        for _ in range(iterations):
+            db.session.expire_all()
+            statements.clear()
+            started = time.perf_counter()
+            fn(1)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return len(statements), statistics.median(timings), statistics.quantiles(timings, n=20)[18]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--units', type=int, default=2000)
+    parser.add_argument('--payments-per-unit', type=int, default=24)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        seed(args.units, args.payments_per_unit)
+        get_owner_stats(1)
+        print('%-14s %8s %10s %10s' % ('variant', 'queries', 'p50 ms', 'p95 ms'))
+        for name, fn in (('legacy', legacy_dashboard),
+                         ('aggregated', aggregated_dashboard),
+                         ('materialized', materialized_dashboard)):
+            queries, p50, p95 = measure(fn, args.iterations)
+            print('%-14s %8d %10.2f %10.2f' % (name, queries, p50, p95))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""
+Deterministic synthetic data for benchmarks and load tests.
+
+A scale and a seed always produce the same owners, units, leases, rent
+payments, expenses, maintenance requests, conversations and documents, laid
+out backwards from a fixed end date rather than from today. Derived tables
+(owner stats, monthly rollups, the rent ledger) are rebuilt afterwards and
+the search index fills itself through its triggers.
+
+    DOCUMENT_ROOT=/tmp/bench-documents python benchmarks/datagen.py --scale small --database sqlite:////tmp/bench.db
+
+Lease files go to DOCUMENT_ROOT, a new temporary directory unless it is set;
+serve the data with the same DOCUMENT_ROOT. Every owner signs in as
+ownerN@example.com with the password BENCH_PASSWORD.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# owners, units (spread round-robin over the owners) and years of history
+SCALES = {
+    'tiny': dict(owners=1, units=10, years=1),
+    'small': dict(owners=10, units=200, years=3),
+    'medium': dict(owners=100, units=1000, years=5),
+    'large': dict(owners=1000, units=5000, years=10),
+}
+END_DATE = date(2025, 12, 31)
+BENCH_PASSWORD = 'bench'
+BATCH_SIZE = 10000
+
+FIRST_NAMES = ('James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Priya',
+               'William', 'Barbara', 'Rahul', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Carlos', 'Maria')
+LAST_NAMES = ('Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Sharma', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Patel', 'Taylor', 'Moore', 'Jackson', 'Martin')
+STREETS = ('Oak', 'Maple', 'Cedar', 'Elm', 'Pine', 'Lake', 'Hill', 'Park', 'River', 'Sunset')
+EXPENSES = (('maintenance', 'Plumbing repair'), ('maintenance', 'Repainting'), ('utilities', 'Water bill'),
+            ('utilities', 'Electricity for common areas'), ('taxes', 'Property tax instalment'),
+            ('insurance', 'Building insurance premium'), ('maintenance', 'Garden upkeep'))
+VENDORS = ('Acme Plumbing', 'City Water', 'Bright Electric', 'County Tax Office', 'SafeHome Insurance',
+           'Green Thumb Gardens', 'ProPaint')
+ISSUES = (('plumbing', 'Leaking kitchen tap'), ('electrical', 'Bedroom socket not working'),
+          ('hvac', 'Heating makes a rattling noise'), ('other', 'Front door lock sticks'),
+          ('plumbing', 'Blocked bathroom drain'), ('hvac', 'AC not cooling'))
+PAYMENT_NOTES = ('paid by bank transfer', 'paid late', 'cheque deposited', 'paid in cash at the office')
+LEASE_TEMPLATES = 20  # distinct lease files; every lease document is one of them
+
+# Settings create_app would otherwise point into the repository's instance
+# folder, and the file or directory each gets in a scratch instance
+INSTANCE_PATHS = (('SESSION_SQLITE_PATH', 'sessions.db'), ('DOCUMENT_ROOT', 'documents'),
+                  ('IMPORT_ROOT', 'imports'), ('PROFILE_DIR', 'profiles'))
+
+
+def scratch_instance(override=True):
+    # Points SECRET_KEY and every instance path at a new temporary directory,
+    # so a benchmark run leaves nothing in the checkout. With override=False
+    # settings already in the environment are kept. Returns the directory.
+    tmp_dir = tempfile.mkdtemp(prefix='rentalxpert-bench-')
+    settings = dict((name, os.path.join(tmp_dir, path)) for name, path in INSTANCE_PATHS)
+    settings['SECRET_KEY'] = 'bench'
+    for name, value in settings.items():
+        if override or name not in os.environ:
+            os.environ[name] = value
+    return tmp_dir
+
+
+class _Writer(object):
+    # Buffers rows per model and bulk-inserts them in batches, always in the
+    # order the models were first seen so foreign keys resolve
+
+    def __init__(self, db):
+        self.db = db
+        self.pending = {}
+        self.counts = {}
+
+    def add(self, model, row):
+        rows = self.pending.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        for model, rows in self.pending.items():
+            if rows:
+                self.db.session.execute(self.db.insert(model), rows)
+                self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(rows)
+                del rows[:]
+
+
+def _months(start, end):
+    month = start
+    while month <= end:
+        yield month
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _moment(rng, start, end):
+    # A datetime uniformly between two dates
+    span = (end - start).days * 86400
+    return datetime.combine(start, datetime.min.time()) + timedelta(seconds=rng.randrange(max(span, 1)))
+
+
+def generate(owners, units, years, seed=1, end=END_DATE):
+    # Fills the configured database; returns row counts per model
+    from werkzeug.security import generate_password_hash
+    from extensions import db
+    from models import (Conversation, ConversationMember, Document, DocumentBlob, Expense, MaintenanceRequest,
+                        Message, Owner, Payment, Property, Tenant)
+    from services import (MAINTENANCE_PRIORITIES, document_store, maintenance_sla_due, rebuild_rent_ledger,
+                          rebuild_rollups, refresh_owner_stats)
+
+    rng = random.Random(seed)
+    start = _add_months(date(end.year, end.month, 1), -12 * years)
+    writer = _Writer(db)
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    for owner_id in range(1, owners + 1):
+        writer.add(Owner, dict(id=owner_id, username='owner%d' % owner_id, email='owner%d@example.com' % owner_id,
+                               password_hash=password_hash, phone='+1555%07d' % owner_id,
+                               created_at=datetime.combine(start, datetime.min.time())))
+    writer.flush()
+
+    # A few distinct lease files, stored once each and shared by every lease
+    blobs = []
+    store = document_store()
+    for number in range(LEASE_TEMPLATES):
+        content = b'%PDF-1.4\n% lease template ' + str(number).encode() + b'\n' + b'0' * (20000 + number * 1000)
+        sha256, size, mimetype = store.save(io.BytesIO(content), 'lease.pdf')
+        blobs.append(sha256)
+        writer.add(DocumentBlob, dict(sha256=sha256, size=size, mimetype=mimetype,
+                                      created_at=datetime.combine(start, datetime.min.time())))
+    writer.flush()
+
+    tenant_id = document_id = 0
+    for unit in range(1, units + 1):
+        owner_id = (unit - 1) % owners + 1
+        rent = rng.randrange(500, 4000, 50)
+        street = rng.choice(STREETS)
+        writer.add(Property, dict(
+            id=unit, owner_id=owner_id, name='%s Street %d' % (street, unit),
+            address='%d %s Street, Springfield' % (unit, street),
+            property_type=rng.choice(('apartment', 'apartment', 'house', 'commercial')),
+            bedrooms=rng.randint(1, 4), bathrooms=rng.randint(1, 3), area_sqft=rng.randrange(400, 2500, 10),
+            monthly_rent=rent, created_at=datetime.combine(start, datetime.min.time())))
+
+        # Back-to-back leases with the odd vacant month, each paid monthly
+        month = start
+        while month <= end:
+            if rng.random() < 0.08:
+                month = _add_months(month, 1)
+                continue
+            length = rng.choice((6, 12, 12, 12, 24))
+            lease_end = _add_months(month, length) - timedelta(days=1)
+            tenant_id += 1
+            name = '%s %s' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+            phone = '555-%07d' % rng.randrange(10000000)
+            writer.add(Tenant, dict(
+                id=tenant_id, property_id=unit, owner_id=owner_id, name=name,
+                email='%s%d@example.com' % (name.lower().replace(' ', '.'), tenant_id), phone=phone,
+                whatsapp_number=phone if rng.random() < 0.6 else None, lease_start=month, lease_end=lease_end,
+                security_deposit=rent, is_active=lease_end >= end,
+                created_at=datetime.combine(month, datetime.min.time())))
+            writer.add(Payment, dict(
+                property_id=unit, owner_id=owner_id, tenant_id=tenant_id, amount=rent, payment_date=month,
+                payment_method='bank_transfer', payment_type='security_deposit', status='completed'))
+            for due in _months(month, min(lease_end, end)):
+                roll = rng.random()
+                if roll < 0.03:
+                    continue  # missed
+                writer.add(Payment, dict(
+                    property_id=unit, owner_id=owner_id, tenant_id=tenant_id,
+                    amount=rent // 2 if roll < 0.08 else rent,
+                    payment_date=min(due + timedelta(days=rng.randint(0, 9)), end),
+                    payment_method=rng.choice(('bank_transfer', 'bank_transfer', 'online', 'cash')),
+                    payment_type='rent', status='completed',
+                    notes=rng.choice(PAYMENT_NOTES) if rng.random() < 0.1 else None))
+            document_id += 1
+            writer.add(Document, dict(
+                id=document_id, property_id=unit, owner_id=owner_id, tenant_id=tenant_id, document_type='lease',
+                file_name='lease-%d.pdf' % tenant_id, file_url='/documents/%d' % document_id,
+                sha256=rng.choice(blobs), uploaded_at=datetime.combine(month, datetime.min.time())))
+            month = _add_months(month, length)
+
+        for _ in range(years * 6):
+            category, description = rng.choice(EXPENSES)
+            writer.add(Expense, dict(
+                property_id=unit, owner_id=owner_id, category=category, description=description,
+                amount=rng.randrange(20, 2000), expense_date=start + timedelta(days=rng.randrange((end - start).days)),
+                vendor=rng.choice(VENDORS)))
+
+        for _ in range(years * 3):
+            issue_type, description = rng.choice(ISSUES)
+            priority = rng.choice(MAINTENANCE_PRIORITIES)
+            created_at = _moment(rng, start, end)
+            sla_due_at = maintenance_sla_due(priority, created_at)
+            recent = (datetime.combine(end, datetime.min.time()) - created_at).days < 30
+            status = rng.choice(('open', 'in_progress', 'completed')) if recent else 'completed'
+            resolved_at = created_at + timedelta(hours=rng.randint(1, 120)) if status == 'completed' else None
+            writer.add(MaintenanceRequest, dict(
+                property_id=unit, owner_id=owner_id, issue_type=issue_type, description=description,
+                priority=priority, priority_rank=MAINTENANCE_PRIORITIES.index(priority), status=status,
+                created_at=created_at, resolved_at=resolved_at, sla_due_at=sla_due_at,
+                sla_breached=bool(resolved_at and resolved_at > sla_due_at)))
+    writer.flush()
+
+    # Each owner talks to the next two owners; a conversation carries about
+    # ten messages a year, the most recent ones sometimes unread
+    message_id = conversation_id = 0
+    pairs = sorted({tuple(sorted((owner_id, (owner_id + step - 1) % owners + 1)))
+                    for owner_id in range(1, owners + 1) for step in (1, 2)} if owners > 1 else set())
+    for low, high in pairs:
+        if low == high:
+            continue
+        conversation_id += 1
+        moments = sorted(_moment(rng, start, end) for _ in range(years * rng.randint(5, 15)))
+        writer.add(Conversation, dict(
+            id=conversation_id, key='%d:%d:' % (low, high), last_message_id=message_id + len(moments),
+            last_message_at=moments[-1], created_at=moments[0]))
+        unread = {low: 0, high: 0}
+        for index, moment in enumerate(moments):
+            message_id += 1
+            sender = rng.choice((low, high))
+            receiver = high if sender == low else low
+            is_read = index < len(moments) - 3 or rng.random() < 0.5
+            unread[receiver] += not is_read
+            writer.add(Message, dict(
+                id=message_id, conversation_id=conversation_id, sender_id=sender, receiver_id=receiver,
+                message='Message %d about the shared building' % message_id, timestamp=moment, is_read=is_read))
+        for owner_id, other_owner_id in ((low, high), (high, low)):
+            writer.add(ConversationMember, dict(
+                conversation_id=conversation_id, owner_id=owner_id, other_owner_id=other_owner_id,
+                unread_count=unread[owner_id], last_message_at=moments[-1]))
+    writer.flush()
+    if db.engine.dialect.name == 'postgresql':
+        # ids were given explicitly, so move the sequences past them
+        for model in (Owner, Property, Tenant, Document, Conversation, Message):
+            db.session.execute(db.text("SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                                       "(SELECT coalesce(max(id), 1) FROM {0}))".format(model.__tablename__)))
+
+    rebuild_rollups()
+    rebuild_rent_ledger(today=end)
+    for owner_id in range(1, owners + 1):
+        refresh_owner_stats(owner_id)
+    db.session.commit()
+    return writer.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--owners', type=int, help='Override the scale\'s number of owners.')
+    parser.add_argument('--units', type=int, help='Override the scale\'s number of units.')
+    parser.add_argument('--years', type=int, help='Override the scale\'s years of history.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database', help='SQLAlchemy URL; defaults to DATABASE_URL.')
+    args = parser.parse_args()
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    scratch_instance(override=False)
+    scale = dict(SCALES[args.scale])
+    scale.update((name, getattr(args, name)) for name in scale if getattr(args, name))
+
+    from app import create_app
+    from extensions import db
+    with create_app().app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = generate(seed=args.seed, **scale)
+        for name, count in sorted(counts.items()):
+            print('%-20s %10d' % (name, count))
+        print('generated in %.1f s' % (time.perf_counter() - started))
+        print('documents in %s' % os.environ['DOCUMENT_ROOT'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Load test against a running server seeded by benchmarks/datagen.py.
+
+    export DOCUMENT_ROOT=/tmp/load-documents
+    python benchmarks/datagen.py --scale medium --database sqlite:////tmp/load.db
+    DATABASE_URL=sqlite:////tmp/load.db DB_PROFILE=production flask run
+    BENCH_OWNERS=100 locust -f benchmarks/locustfile.py --host http://localhost:5000 \\
+        --headless -u 50 -r 10 -t 5m --json > load-$(git rev-parse --short HEAD).json
+
+Each simulated user signs in as one of the generated owners and behaves
+like one: mostly dashboards and listings, some searches, API and report
+reads, and now and then a payment, a maintenance request or a message.
+"""
+import itertools
+import os
+import random
+
+from locust import HttpUser, between, task
+
+from datagen import BENCH_PASSWORD
+
+OWNERS = int(os.environ.get('BENCH_OWNERS', 10))
+_owner_ids = itertools.cycle(range(1, OWNERS + 1))
+SEARCHES = ('smith', 'garcia', 'leak', 'plumb', 'oak street', 'cheque', '555')
+
+
+class OwnerUser(HttpUser):
+    wait_time = between(1, 5)
+
+    def on_start(self):
+        self.owner_id = next(_owner_ids)
+        self.client.post('/login', data={'email': 'owner%d@example.com' % self.owner_id,
+                                         'password': BENCH_PASSWORD})
+        tenants = self.client.get('/api/tenants').json()['items']
+        self.tenants = [(tenant['id'], tenant['property_id']) for tenant in tenants if tenant['is_active']]
+
+    @task(10)
+    def dashboard(self):
+        self.client.get('/dashboard')
+
+    @task(4)
+    def listings(self):
+        self.client.get(random.choice(('/properties', '/tenants', '/payments', '/expenses', '/maintenance',
+                                       '/documents')))
+
+    @task(2)
+    def next_page(self):
+        page = self.client.get('/api/payments').json()
+        if page.get('next_cursor'):
+            self.client.get('/api/payments?cursor=%s' % page['next_cursor'], name='/api/payments?cursor=')
+
+    @task(3)
+    def search(self):
+        text = random.choice(SEARCHES)
+        for end in range(2, len(text) + 1, 2):
+            self.client.get('/api/search/autocomplete?q=%s' % text[:end], name='/api/search/autocomplete')
+        self.client.get('/api/search?q=%s' % text, name='/api/search')
+
+    @task(2)
+    def reports(self):
+        self.client.get('/reports')
+        self.client.get('/api/reports/analytics')
+
+    @task(2)
+    def inbox(self):
+        inbox = self.client.get('/api/messages').json()
+        if inbox['items']:
+            conversation = random.choice(inbox['items'])
+            self.client.get('/api/messages/%d' % conversation['conversation_id'], name='/api/messages/<id>')
+
+    @task(1)
+    def api_v1(self):
+        self.client.get('/api/v1/payments?fields=id,amount,payment_date&limit=200', name='/api/v1/payments')
+
+    @task(1)
+    def record_payment(self):
+        if self.tenants:
+            tenant_id, property_id = random.choice(self.tenants)
+            self.client.post('/add_payment', data={
+                'property_id': property_id, 'tenant_id': tenant_id, 'amount': '1000',
+                'payment_date': '2025-12-05', 'payment_method': 'bank_transfer', 'payment_type': 'rent'})
+
+    @task(1)
+    def report_issue(self):
+        if self.tenants:
+            _, property_id = random.choice(self.tenants)
+            self.client.post('/add_maintenance', data={
+                'property_id': property_id, 'issue_type': 'plumbing', 'description': 'Dripping tap',
+                'priority': random.choice(('low', 'medium', 'high', 'urgent'))})
+
+    @task(1)
+    def send_message(self):
+        if OWNERS > 1:
+            other = self.owner_id % OWNERS + 1
+            self.client.post('/api/messages', json={'receiver_id': other, 'message': 'Are you free this week?'})
@@ -0,0 +1,93 @@
+"""
+Maintenance triage queue benchmark: p95 latency of the first and a deep
+queue page with a large history of requests, plus one SLA check pass.
+
+    python benchmarks/maintenance_queue.py --requests 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import MaintenanceRequest, Owner, Property
+from services import (MAINTENANCE_PRIORITIES, _chunks, detect_sla_breaches, maintenance_queue_page,
+                      maintenance_sla_due)
+
+app = create_app()
+
+
+def seed(requests, units, open_share):
+    rng = random.Random(17)
+    db.session.add(Owner(id=1, username='bench', email='bench@example.com'))
+    db.session.flush()
+    db.session.execute(db.insert(Property), [
+        dict(id=i, name='Unit %d' % i, owner_id=1, monthly_rent=1000) for i in range(1, units + 1)])
+    start = datetime(2016, 1, 1)
+    span = (datetime.utcnow() - start).total_seconds()
+
+    def rows():
+        for _ in range(requests):
+            priority = rng.choice(MAINTENANCE_PRIORITIES)
+            created = start + timedelta(seconds=rng.random() * span)
+            status = rng.choice(('open', 'in_progress')) if rng.random() < open_share else 'completed'
+            yield dict(property_id=rng.randint(1, units), owner_id=1, issue_type='plumbing', priority=priority,
+                       priority_rank=MAINTENANCE_PRIORITIES.index(priority), status=status, created_at=created,
+                       resolved_at=None if status != 'completed' else created + timedelta(hours=30),
+                       sla_due_at=maintenance_sla_due(priority, created), sla_breached=False)
+
+    for chunk in _chunks(rows(), 50000):
+        db.session.execute(db.insert(MaintenanceRequest), chunk)
+    db.session.commit()
+
+
+def p95(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    return statistics.quantiles(timings, n=20)[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000000)
+    parser.add_argument('--units', type=int, default=2000)
+    parser.add_argument('--open-share', type=float, default=0.02)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        seed(args.requests, args.units, args.open_share)
+        first = lambda: maintenance_queue_page(1)
+        _, cursor = first()
+        for _ in range(20):
+            _, cursor = maintenance_queue_page(1, cursor=cursor)
+        print('queue first page      p95 %6.2f ms' % p95(first, args.iterations))
+        print('queue page 21         p95 %6.2f ms' % p95(lambda: maintenance_queue_page(1, cursor=cursor),
+                                                          args.iterations))
+        started = time.perf_counter()
+        breached = detect_sla_breaches()
+        db.session.commit()
+        print('first SLA check       %6.0f ms (%d breaches)' % ((time.perf_counter() - started) * 1000, breached))
+        started = time.perf_counter()
+        detect_sla_breaches()
+        db.session.commit()
+        print('next SLA check        %6.2f ms' % ((time.perf_counter() - started) * 1000))
+
+
+if __name__ == '__main__':
+    main()
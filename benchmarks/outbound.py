@@ -0,0 +1,87 @@
+"""
+Outbound sending benchmark: queued WhatsApp reminders sent through the
+Twilio provider to a local fake API that answers after --latency ms, by the
+threaded job worker and by `run-worker --async`. Reports jobs per second,
+how the jobs ended and how many connections the fake API saw.
+
+    python benchmarks/outbound.py --jobs 2000 --latency 200
+    python benchmarks/outbound.py --jobs 200 --latency 3000 --timeout 1   # timeouts are retried
+
+Needs aiohttp for the async mode. The fake API is tests/fake_twilio.py.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+os.environ.update(NOTIFICATION_PROVIDER='twilio', TWILIO_ACCOUNT_SID='ACbench', TWILIO_AUTH_TOKEN='token',
+                  TWILIO_WHATSAPP_FROM='+15550000000', NOTIFICATION_RATE_PER_SECOND='1000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.fake_twilio import FakeTwilio
+
+
+def enqueue(count, mode):
+    # Each mode starts from an empty queue, so retries left by the previous
+    # one don't come due in the middle of its run
+    from extensions import db
+    from models import BackgroundJob
+    from services import enqueue_jobs
+
+    db.session.query(BackgroundJob).delete()
+    enqueue_jobs('whatsapp_reminder', None, [
+        ('bench:%s:%d' % (mode, n), {'to': '+1555%07d' % n, 'message': 'Rent reminder %d' % n})
+        for n in range(count)])
+    db.session.commit()
+
+
+def drain(mode, concurrency):
+    from services import run_jobs, run_worker_async
+
+    if mode == 'async':
+        asyncio.run(run_worker_async('bench-async', concurrency, max(concurrency, 100), once=True))
+    else:
+        while run_jobs('bench-threads', concurrency):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=200, help='Fake API response time in ms.')
+    parser.add_argument('--timeout', type=float, default=10, help='NOTIFICATION_TIMEOUT in seconds.')
+    parser.add_argument('--modes', default='threads,async')
+    parser.add_argument('--thread-concurrency', type=int, default=8)
+    parser.add_argument('--async-concurrency', type=int, default=200)
+    args = parser.parse_args()
+
+    from app import create_app
+    from extensions import db
+    from models import BackgroundJob
+
+    print('%-8s %6s %10s %8s %8s %8s %8s %12s' % (
+        'mode', 'limit', 'seconds', 'jobs/s', 'done', 'retry', 'failed', 'connections'))
+    with FakeTwilio(args.latency / 1000) as server, \
+            create_app({'TWILIO_API_BASE': server.url, 'NOTIFICATION_TIMEOUT': args.timeout}).app_context():
+        db.create_all()
+        for mode in args.modes.split(','):
+            concurrency = args.async_concurrency if mode == 'async' else args.thread_concurrency
+            enqueue(args.jobs, mode)
+            server.reset()
+            started = time.perf_counter()
+            drain(mode, concurrency)
+            elapsed = time.perf_counter() - started
+            counts = dict(db.session.execute(
+                db.select(BackgroundJob.status, db.func.count()).group_by(BackgroundJob.status)).all())
+            print('%-8s %6d %10.2f %8.1f %8d %8d %8d %12d' % (
+                mode, concurrency, elapsed, args.jobs / elapsed, counts.get('done', 0), counts.get('queued', 0),
+                counts.get('failed', 0), server.connections))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Rent ledger benchmark: full rebuild versus the nightly incremental run.
+
+    python benchmarks/rent_ledger.py --leases 100000 --changed 1000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import Owner, Payment, Property, Tenant
+from services import add_months, mark_rent_ledger_stale, rebuild_rent_ledger, run_rent_ledger
+
+app = create_app()
+
+
+def seed(leases, months):
+    rng = random.Random(11)
+    first = date(2025, 1, 1)
+    db.session.add(Owner(id=1, username='bench', email='bench@example.com'))
+    db.session.flush()
+    db.session.execute(db.insert(Property), [
+        dict(id=i, name='Unit %d' % i, owner_id=1, monthly_rent=1000) for i in range(1, leases + 1)])
+    db.session.execute(db.insert(Tenant), [
+        dict(id=i, name='Tenant %d' % i, phone='555%07d' % i, property_id=i, owner_id=1, is_active=True,
+             lease_start=add_months(first, rng.randrange(months)))
+        for i in range(1, leases + 1)])
+    # Most tenants pay most months, some only part of the rent
+    db.session.execute(db.insert(Payment), [
+        dict(property_id=i, owner_id=1, tenant_id=i, amount=rng.choice((1000, 1000, 1000, 400)),
+             payment_type='rent', status='completed', payment_date=add_months(first, n).replace(day=3))
+        for i in range(1, leases + 1) for n in range(months) if rng.random() < 0.9])
+    db.session.commit()
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    db.session.commit()
+    print('%-36s %8.2f s' % (label, time.perf_counter() - started))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--leases', type=int, default=100000)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--changed', type=int, default=1000)
+    args = parser.parse_args()
+
+    today = add_months(date(2025, 1, 1), args.months - 1).replace(day=20)
+    with app.app_context():
+        db.create_all()
+        seed(args.leases, args.months)
+        timed('full rebuild (%d leases)' % args.leases, lambda: rebuild_rent_ledger(today=today))
+
+        rng = random.Random(5)
+        changed = rng.sample(range(1, args.leases + 1), args.changed)
+        db.session.execute(db.insert(Payment), [
+            dict(property_id=i, owner_id=1, tenant_id=i, amount=600, payment_type='rent', status='completed',
+                 payment_date=today) for i in changed])
+        mark_rent_ledger_stale(changed)
+        db.session.commit()
+        timed('nightly run (%d changed tenants)' % args.changed, lambda: run_rent_ledger(today))
+        timed('nightly run opening the next cycle', lambda: run_rent_ledger(add_months(today, 1)))
+        timed('nightly run with nothing changed', lambda: run_rent_ledger(add_months(today, 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""
+Route benchmarks: every route timed in-process through Flask's test client
+against generated data, signed in as the first owner. Results are written
+as JSON so runs can be compared between commits.
+
+    python benchmarks/routes.py --scale small --output bench-$(git rev-parse --short HEAD).json
+    python benchmarks/routes.py --scale small --compare bench-abc1234.json
+
+Every scenario must answer with a 2xx or 3xx status; one that does not is
+reported and left out of the results, and the run exits non-zero. --compare
+also exits non-zero when a route's median got slower than the baseline by
+more than --threshold (and by more than a millisecond).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from datagen import BENCH_PASSWORD, SCALES, generate
+from extensions import db
+from models import (BackgroundJob, ConversationMember, Document, Expense, MaintenanceRequest, Owner, Property,
+                    Tenant)
+from services import enqueue_jobs, send_message, set_maintenance_status
+
+app = create_app()
+
+# Endpoints not timed: long-lived streams, session teardown, static files
+UNTIMED = {'messages.message_stream', 'auth.logout', 'static'}
+
+
+def _alternate(*values):
+    return lambda i: values[i % len(values)]
+
+
+def scenarios(ids):
+    # (name, endpoint, method, path, request kwargs as a function of the
+    # iteration number); writes alternate their inputs so they stay valid
+    status = _alternate('in_progress', 'open')
+    csv_rows = 'property_id,amount,expense_date,category,vendor\n' + ''.join(
+        '%d,%d,2025-06-%02d,utilities,City Water\n' % (ids['property'], 10 + n, n % 28 + 1) for n in range(100))
+    return [
+        ('index', 'dashboard.index', 'GET', '/', None),
+        ('login form', 'auth.login', 'GET', '/login', None),
+        ('login', 'auth.login', 'POST', '/login', lambda i: dict(
+            data={'email': ids['email'], 'password': BENCH_PASSWORD})),
+        ('register form', 'auth.register', 'GET', '/register', None),
+        ('dashboard', 'dashboard.dashboard', 'GET', '/dashboard', None),
+        ('properties', 'properties.properties', 'GET', '/properties', None),
+        ('tenants', 'tenants.tenants', 'GET', '/tenants', None),
+        ('payments', 'payments.payments', 'GET', '/payments', None),
+        ('expenses', 'expenses.expenses', 'GET', '/expenses', None),
+        ('maintenance', 'maintenance.maintenance', 'GET', '/maintenance', None),
+        ('documents', 'documents.documents', 'GET', '/documents', None),
+        ('messages', 'messages.messages', 'GET', '/messages', None),
+        ('conversation', 'messages.conversation', 'GET', '/messages/%d' % ids['conversation'], None),
+        ('reports', 'reports.reports', 'GET', '/reports', None),
+        ('search', 'dashboard.search', 'GET', '/search?q=smith', None),
+        ('import form', 'imports.import_data', 'GET', '/import', None),
+        ('toggle dark mode', 'dashboard.toggle_dark_mode', 'GET', '/toggle_dark_mode', None),
+        ('add property form', 'properties.add_property', 'GET', '/add_property', None),
+        ('add tenant form', 'tenants.add_tenant', 'GET', '/add_tenant', None),
+        ('add payment form', 'payments.add_payment', 'GET', '/add_payment', None),
+        ('add maintenance form', 'maintenance.add_maintenance', 'GET', '/add_maintenance', None),
+        ('add document form', 'documents.add_document', 'GET', '/add_document', None),
+        ('api tenants', 'api.tenants', 'GET', '/api/tenants', None),
+        ('api payments', 'api.payments', 'GET', '/api/payments', None),
+        ('api expenses', 'api.expenses', 'GET', '/api/expenses', None),
+        ('api reports', 'api.reports', 'GET', '/api/reports', None),
+        ('api analytics', 'api.reports_analytics', 'GET', '/api/reports/analytics', None),
+        ('api v1 payments', 'api.v1_list', 'GET', '/api/v1/payments?fields=id,amount,payment_date&limit=200',
+         None),
+        ('api maintenance queue', 'api.maintenance_queue', 'GET', '/api/maintenance/queue', None),
+        ('api messages', 'api.messages', 'GET', '/api/messages', None),
+        ('api conversation', 'api.conversation', 'GET', '/api/messages/%d' % ids['conversation'], None),
+        ('api poll', 'api.poll_messages', 'GET', '/api/messages/poll?timeout=0', None),
+        ('api search', 'api.search', 'GET', '/api/search?q=leak', None),
+        ('api autocomplete', 'api.search_autocomplete', 'GET', '/api/search/autocomplete?q=ma', None),
+        ('document download', 'documents.download_document', 'GET', '/documents/%d' % ids['document'], None),
+        ('document thumbnail', 'documents.document_thumbnail', 'GET', '/documents/%d/thumbnail' % ids['document'], None),
+        ('export payments csv', 'reports.export_ledger', 'GET', '/export/payments.csv', None),
+        ('import errors', 'imports.import_errors', 'GET', '/import/errors/%s.csv' % ids['import_errors'], None),
+        ('metrics', 'metrics.metrics', 'GET', '/metrics', None),
+        ('add property', 'properties.add_property', 'POST', '/add_property', lambda i: dict(data={
+            'name': 'Bench unit %d' % i, 'address': '1 Bench Road', 'monthly_rent': '1000', 'bedrooms': '1',
+            'bathrooms': '1', 'area_sqft': '500'})),
+        ('add tenant', 'tenants.add_tenant', 'POST', '/add_tenant', lambda i: dict(data={
+            'property_id': str(ids['property']), 'name': 'Bench Tenant %d' % i, 'phone': '555-0100',
+            'lease_start': '2025-01-01', 'lease_end': '2025-12-31', 'security_deposit': '0'})),
+        ('add payment', 'payments.add_payment', 'POST', '/add_payment', lambda i: dict(data={
+            'property_id': str(ids['property']), 'tenant_id': str(ids['tenant']), 'amount': '100',
+            'payment_date': '2025-12-15', 'payment_method': 'cash', 'payment_type': 'rent'})),
+        ('add maintenance', 'maintenance.add_maintenance', 'POST', '/add_maintenance', lambda i: dict(data={
+            'property_id': str(ids['property']), 'issue_type': 'plumbing', 'description': 'Dripping tap',
+            'priority': 'high'})),
+        ('maintenance status', 'maintenance.update_maintenance_status', 'POST',
+         '/maintenance/%d/status' % ids['maintenance'], lambda i: dict(data={'status': status(i)})),
+        ('maintenance priority', 'maintenance.update_maintenance_priority', 'POST',
+         '/maintenance/%d/priority' % ids['maintenance'], lambda i: dict(data={'priority': 'urgent'})),
+        ('send message', 'messages.send_message_route', 'POST', '/messages/send', lambda i: dict(data={
+            'email': ids['other_email'], 'message': 'Form message %d' % i})),
+        ('api send message', 'api.post_message', 'POST', '/api/messages', lambda i: dict(json={
+            'receiver_id': ids['other_owner'], 'message': 'API message %d' % i})),
+        ('whatsapp reminder', 'api.send_whatsapp_reminder', 'POST', '/api/send_whatsapp_reminder', lambda i: dict(
+            json={'tenant_id': ids['tenant'], 'message': 'Rent is due'},
+            headers={'Idempotency-Key': 'bench-%d' % i})),
+        ('overdue reminders', 'api.remind_overdue_tenants', 'POST', '/api/reminders/overdue', None),
+        ('api job status', 'api.job_status', 'GET', '/api/jobs/%d' % ids['job'], None),
+        ('upload document', 'documents.add_document', 'POST', '/add_document', lambda i: dict(
+            content_type='multipart/form-data', data={
+                'property_id': str(ids['property']), 'document_type': 'inspection',
+                'file': (io.BytesIO(b'%PDF-1.4\n' + str(i).encode() * 1000), 'inspection.pdf')})),
+        ('api upload document', 'api.upload_document', 'PUT',
+         '/api/documents?property_id=%d&file_name=photo.png' % ids['property'], lambda i: dict(
+             data=b'\x89PNG\r\n\x1a\n' + str(i).encode() * 1000)),
+        ('upload receipt', 'expenses.upload_receipt', 'POST', '/expenses/%d/receipt' % ids['expense'], lambda i: dict(
+            content_type='multipart/form-data', data={'file': (io.BytesIO(b'%PDF-1.4\nreceipt'), 'receipt.pdf')})),
+        ('share document', 'documents.share_document', 'POST', '/documents/%d/share' % ids['document'],
+         lambda i: dict(data={'tenant_id': [str(ids['tenant'])]})),
+        ('offer property transfer', 'properties.transfer_property_route', 'POST',
+         '/properties/%d/transfer' % ids['spare_property'], lambda i: dict(data={'email': ids['other_email']})),
+        ('import expenses', 'imports.import_data', 'POST', '/import', lambda i: dict(
+            content_type='multipart/form-data', data={'kind': 'expenses', 'file': (
+                io.BytesIO(csv_rows.encode()), 'expenses.csv')})),
+    ]
+
+
+def sample_ids(owner_id):
+    # Records of the signed-in owner the scenarios point at, seeding any the
+    # generated data lacks: a second owner to message (tiny has only one), a
+    # queued job and an import error report. The maintenance request is
+    # reopened so status changes stay valid transitions.
+    maintenance = MaintenanceRequest.query.filter_by(owner_id=owner_id).order_by(MaintenanceRequest.id).first()
+    if maintenance.status != 'open':
+        set_maintenance_status(maintenance, 'open')
+    other = ConversationMember.query.filter_by(owner_id=owner_id).order_by(ConversationMember.id).first()
+    if other is None:
+        peer = Owner(username='bench-peer', email='bench-peer@example.com', phone='+15550000000')
+        db.session.add(peer)
+        db.session.flush()
+        send_message(peer.id, owner_id, 'Hello from the other owner')
+        other = ConversationMember.query.filter_by(owner_id=owner_id).one()
+    enqueue_jobs('whatsapp_reminder', owner_id, [('bench:status', {'to': '+15550000001', 'message': 'Rent'})])
+    job = BackgroundJob.query.filter_by(idempotency_key='bench:status').one()
+    import_errors = 'bench'
+    os.makedirs(app.config['IMPORT_ROOT'], exist_ok=True)
+    with open(os.path.join(app.config['IMPORT_ROOT'], '%d-%s.csv' % (owner_id, import_errors)), 'w') as report:
+        report.write('row,error\n2,amount is not a number\n')
+    db.session.commit()
+    # The tenant's own property, so recorded payments are accepted
+    tenant = Tenant.query.filter_by(owner_id=owner_id, is_active=True).order_by(Tenant.id).first()
+    spare_property = Property.query.filter(Property.owner_id == owner_id, Property.id != tenant.property_id
+                                           ).order_by(Property.id).first()
+    return {
+        'email': 'owner%d@example.com' % owner_id,
+        'property': tenant.property_id,
+        'spare_property': (spare_property or tenant.property).id,
+        'tenant': tenant.id,
+        'expense': Expense.query.filter_by(owner_id=owner_id).order_by(Expense.id).first().id,
+        'document': Document.query.filter_by(owner_id=owner_id).order_by(Document.id).first().id,
+        'maintenance': maintenance.id,
+        'conversation': other.conversation_id,
+        'other_owner': other.other_owner_id,
+        'other_email': db.session.get(Owner, other.other_owner_id).email,
+        'job': job.id,
+        'import_errors': import_errors,
+    }
+
+
+def run(client, cases, iterations, warmup):
+    # Returns the results and the scenarios that got an error response; those
+    # stop at the first one, since timing an error page says nothing about
+    # the route
+    results, failed = {}, {}
+    for name, endpoint, method, path, make_kwargs in cases:
+        timings, statuses = [], set()
+        for i in range(warmup + iterations):
+            kwargs = make_kwargs(i) if make_kwargs else {}
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()  # drain streamed bodies
+            elapsed = (time.perf_counter() - started) * 1000
+            response.close()
+            statuses.add(response.status_code)
+            if response.status_code >= 400:
+                failed[name] = response.status_code
+                break
+            if i >= warmup:
+                timings.append(elapsed)
+        if name in failed:
+            print('%-24s %-6s FAILED with status %d' % (name, method, failed[name]))
+            continue
+        results[name] = {
+            'endpoint': endpoint, 'method': method, 'path': path, 'status': sorted(statuses),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0], 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'min_ms': round(min(timings), 3),
+        }
+        print('%-24s %-6s %8.2f ms p50 %8.2f ms p95  %s' % (
+            name, method, results[name]['p50_ms'], results[name]['p95_ms'], results[name]['status']))
+    return results, failed
+
+
+def compare(results, baseline, threshold):
+    regressions = 0
+    print('\n%-24s %10s %10s %8s' % ('route', 'base p50', 'p50', 'change'))
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = result['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0
+        slower = change > threshold and result['p50_ms'] - before['p50_ms'] > 1
+        regressions += slower
+        print('%-24s %10.2f %10.2f %+7.0f%%%s' % (name, before['p50_ms'], result['p50_ms'], change * 100,
+                                                 '  REGRESSION' if slower else ''))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help='Comma-separated endpoints to time.')
+    parser.add_argument('--output', help='Write results to this JSON file.')
+    parser.add_argument('--compare', help='Baseline JSON file from an earlier run.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p50 slowdown (0.2 = 20%%).')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        generate(seed=args.seed, **SCALES[args.scale])
+        print('generated %s data in %.1f s' % (args.scale, time.perf_counter() - started))
+        ids = sample_ids(1)
+
+    # Endpoints this app doesn't register (/metrics without INSTRUMENTATION=1)
+    # are skipped
+    cases = [case for case in scenarios(ids) if case[1] in app.view_functions]
+    missing = {rule.endpoint for rule in app.url_map.iter_rules()} - UNTIMED - {case[1] for case in cases}
+    if missing:
+        print('no scenario for: %s' % ', '.join(sorted(missing)))
+    if args.only:
+        cases = [case for case in cases if case[1] in args.only.split(',')]
+
+    client = app.test_client()
+    client.post('/login', data={'email': ids['email'], 'password': BENCH_PASSWORD})
+    results, failed = run(client, cases, args.iterations, args.warmup)
+    report = {
+        'commit': _git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'scale': dict(SCALES[args.scale], name=args.scale, seed=args.seed),
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as fileobj:
+            json.dump(report, fileobj, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as fileobj:
+            baseline = json.load(fileobj)
+        if baseline.get('scale') != report['scale']:
+            print('warning: the baseline was run at scale %s' % baseline.get('scale'))
+        regressions = compare(report['results'], baseline, args.threshold)
+        if regressions:
+            sys.exit('%d routes regressed' % regressions)
+    if failed:
+        sys.exit('%d scenarios got an error response: %s' % (len(failed), ', '.join(sorted(failed))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Full-text search benchmark: p95 latency of autocomplete prefixes and ranked
+searches with a large number of indexed records, most of them belonging to
+other owners.
+
+    python benchmarks/search.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import Expense, Owner, Payment, Property, Tenant
+from services import _chunks, search_records
+
+app = create_app()
+
+FIRST = ('james', 'mary', 'robert', 'patricia', 'john', 'jennifer', 'michael', 'linda', 'david', 'elizabeth',
+         'william', 'barbara', 'richard', 'susan', 'joseph', 'jessica', 'thomas', 'sarah', 'carlos', 'maria')
+LAST = ('smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'rodriguez', 'martinez',
+        'hernandez', 'lopez', 'gonzalez', 'wilson', 'anderson', 'thomas', 'taylor', 'moore', 'jackson', 'martin')
+WORDS = ('paid', 'late', 'cheque', 'transfer', 'deposit', 'partial', 'rent', 'month', 'bank', 'cash', 'roof',
+         'plumbing', 'repair', 'paint', 'garden', 'cleaning', 'electrical', 'boiler', 'window', 'invoice')
+
+
+def seed(rows, owners, units):
+    # rows are split evenly between tenants, payments and expenses
+    rng = random.Random(23)
+    db.session.execute(db.insert(Owner), [
+        dict(id=i, username='owner%d' % i, email='owner%d@example.com' % i) for i in range(1, owners + 1)])
+    db.session.execute(db.insert(Property), [
+        dict(id=i, name='%s house %d' % (rng.choice(LAST).title(), i), address='%d %s street' % (i, rng.choice(LAST)),
+             owner_id=i % owners + 1, monthly_rent=1000) for i in range(1, units + 1)])
+    per_kind = rows // 3
+
+    def tenants():
+        for i in range(per_kind):
+            unit = rng.randint(1, units)
+            name = '%s %s' % (rng.choice(FIRST), rng.choice(LAST))
+            yield dict(name=name.title(), email=name.replace(' ', '.') + '%d@example.com' % i,
+                       phone='555-%07d' % rng.randint(0, 9999999), property_id=unit, owner_id=unit % owners + 1)
+
+    def payments():
+        for _ in range(per_kind):
+            unit = rng.randint(1, units)
+            yield dict(property_id=unit, owner_id=unit % owners + 1, amount=1000,
+                       notes=' '.join(rng.sample(WORDS, 4)))
+
+    def expenses():
+        for _ in range(per_kind):
+            unit = rng.randint(1, units)
+            yield dict(property_id=unit, owner_id=unit % owners + 1, amount=100,
+                       vendor='%s %s' % (rng.choice(LAST).title(), rng.choice(('Ltd', 'Services', 'and Sons'))),
+                       description=' '.join(rng.sample(WORDS, 5)))
+
+    for model, generate in ((Tenant, tenants), (Payment, payments), (Expense, expenses)):
+        for chunk in _chunks(generate(), 50000):
+            db.session.execute(db.insert(model), chunk)
+    db.session.commit()
+    db.session.execute(db.text("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+    db.session.commit()
+
+
+def p95(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.quantiles(timings, n=20)[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--owners', type=int, default=20)
+    parser.add_argument('--units', type=int, default=5000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seed(args.rows, args.owners, args.units)
+        print('seed and index %d rows  %6.1f s' % (args.rows, time.perf_counter() - started))
+        cases = (
+            ('autocomplete "ma"', dict(text='ma', autocomplete=True, limit=8)),
+            ('autocomplete "mart"', dict(text='mart', autocomplete=True, limit=8)),
+            ('autocomplete "maria ga"', dict(text='maria ga', autocomplete=True, limit=8)),
+            ('autocomplete phone', dict(text='555012', autocomplete=True, limit=8)),
+            ('search "roof repair"', dict(text='roof repair', limit=20)),
+            ('search "garcia"', dict(text='garcia', kinds=['tenant'], limit=20)),
+        )
+        for label, kwargs in cases:
+            timing = p95(lambda: search_records(1, **kwargs), args.iterations)
+            print('%-26s p95 %6.2f ms (%d results)' % (label, timing, len(search_records(1, **kwargs))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Serving benchmark: requests per second through a real HTTP server against
+generated data, for the development server and the gunicorn profile in
+gunicorn.conf.py. Each client process keeps a connection open and requests
+a mix of API reads as the first owner; the first --warmup seconds are not
+counted.
+
+    python benchmarks/serving.py --scale small --clients 16 --seconds 20 --output serving.json
+
+Servers: dev-debug is the old entry point (Werkzeug with the debugger and
+reloader), dev is `python app.py`, gthread and gevent are gunicorn with that
+worker class. Clients and servers share the machine, so compare runs made
+on the same host.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+from datagen import scratch_instance
+
+_tmp_dir = scratch_instance()
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'bench.db')
+os.environ['DB_PROFILE'] = 'production'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app
+from datagen import BENCH_PASSWORD, SCALES, generate
+from extensions import db
+
+# name: (command, extra environment)
+SERVERS = {
+    'dev-debug': ([sys.executable, 'app.py'], {'FLASK_DEBUG': '1'}),
+    'dev': ([sys.executable, 'app.py'], {}),
+    'gthread': ([sys.executable, '-m', 'gunicorn'], {'WEB_WORKER_CLASS': 'gthread'}),
+    'gevent': ([sys.executable, '-m', 'gunicorn'], {'WEB_WORKER_CLASS': 'gevent'}),
+}
+
+PATHS = ('/api/tenants', '/api/payments', '/api/maintenance/queue', '/api/search?q=smith', '/api/reports')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, port):
+    command, env = SERVERS[name]
+    env = dict(os.environ, PORT=str(port), **env)
+    # Own process group, so the reloader's child goes down with it
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('%s exited with status %d' % (name, process.returncode))
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/dashboard')
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError('%s did not start listening on port %d' % (name, port))
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def login(port, email):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    conn.request('POST', '/login', urlencode({'email': email, 'password': BENCH_PASSWORD}),
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    if response.status != 302:
+        raise RuntimeError('login returned %d' % response.status)
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def _get(conn, path, cookie):
+    # A kept-alive connection the server closed meanwhile (a worker recycled
+    # by max_requests) is retried once on a new one, as browsers and proxies
+    # do for GETs; http.client reopens closed connections itself
+    for retry in (True, False):
+        reused = conn.sock is not None
+        try:
+            conn.request('GET', path, headers={'Cookie': cookie})
+            response = conn.getresponse()
+            response.read()
+            return response.status == 200
+        except ConnectionError:
+            conn.close()
+            if not (retry and reused):
+                raise
+
+
+def client(port, cookie, offset, measure_from, deadline, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies, errors, i = [], 0, offset
+    while time.time() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        started = time.time()
+        try:
+            ok = _get(conn, path, cookie)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            ok = False
+        if started >= measure_from:
+            latencies.append((time.time() - started) * 1000)
+            errors += not ok
+    conn.close()
+    results.put((latencies, errors))
+
+
+def run(name, clients, seconds, warmup, email):
+    port = _free_port()
+    process = start_server(name, port)
+    try:
+        cookie = login(port, email)
+        results = multiprocessing.Queue()
+        measure_from = time.time() + warmup
+        deadline = measure_from + seconds
+        workers = [multiprocessing.Process(target=client, args=(port, cookie, n, measure_from, deadline, results))
+                   for n in range(clients)]
+        for worker in workers:
+            worker.start()
+        latencies, errors = [], 0
+        for _ in workers:
+            worker_latencies, worker_errors = results.get()
+            latencies.extend(worker_latencies)
+            errors += worker_errors
+        for worker in workers:
+            worker.join()
+    finally:
+        stop_server(process)
+    percentiles = statistics.quantiles(latencies, n=100)
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'errors': errors,
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(percentiles[94], 2),
+        'p99_ms': round(percentiles[98], 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=ROOT).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--servers', default=','.join(SERVERS), help='Comma-separated servers to run.')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client connections.')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--output', help='Write results to this JSON file.')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        generate(seed=args.seed, **SCALES[args.scale])
+        print('generated %s data in %.1f s' % (args.scale, time.perf_counter() - started))
+        db.engine.dispose()
+    email = 'owner1@example.com'
+
+    results = {}
+    print('%-10s %10s %10s %10s %10s %8s' % ('server', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for name in args.servers.split(','):
+        results[name] = run(name, args.clients, args.seconds, args.warmup, email)
+        print('%-10s %10.1f %10.2f %10.2f %10.2f %8d' % (
+            name, results[name]['requests_per_second'], results[name]['p50_ms'], results[name]['p95_ms'],
+            results[name]['p99_ms'], results[name]['errors']))
+    if args.output:
+        report = {
+            'commit': _git_commit(),
+            'created_at': datetime.utcnow().isoformat(),
+            'scale': dict(SCALES[args.scale], name=args.scale, seed=args.seed),
+            'clients': args.clients,
+            'seconds': args.seconds,
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.output, 'w') as fileobj:
+            json.dump(report, fileobj, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
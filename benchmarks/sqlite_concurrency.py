@@ -0,0 +1,111 @@
+"""
+Concurrent read/write load test for the SQLite storage profiles.
+
+Forks reader and writer processes against one database file, the way
+several gunicorn workers would share it, and reports throughput and
+"database is locked" errors for each DB_PROFILE.
+
+    python benchmarks/sqlite_concurrency.py --readers 6 --writers 2 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from datagen import scratch_instance
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker(kind, seconds, results):
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from extensions import db
+    from models import Payment
+    from services import adjust_owner_stats, payments_page
+
+    with create_app().app_context():
+        db.engine.dispose(close=False)
+        ops = errors = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                if kind == 'read':
+                    payments_page(1)
+                    db.session.rollback()
+                else:
+                    db.session.add(Payment(property_id=1, owner_id=1, tenant_id=1, amount=100,
+                                           payment_type='rent'))
+                    adjust_owner_stats(1, payment_count=1, total_collected=100)
+                    db.session.commit()
+                ops += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+        results.put((kind, ops, errors))
+
+
+def run_profile(args):
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from extensions import db
+    from models import Owner, Payment, Property, Tenant
+    from schema import upgrade_schema
+    from services import get_owner_stats
+
+    with create_app().app_context():
+        upgrade_schema()
+        db.session.add(Owner(id=1, username='bench', email='bench@example.com'))
+        db.session.add(Property(id=1, name='Unit 1', owner_id=1, monthly_rent=1000))
+        db.session.add(Tenant(id=1, name='Tenant', phone='555', property_id=1, owner_id=1))
+        db.session.execute(db.insert(Payment), [
+            dict(property_id=1, owner_id=1, tenant_id=1, amount=100, payment_type='rent')
+            for _ in range(5000)
+        ])
+        db.session.commit()
+        get_owner_stats(1)
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(kind, args.seconds, results))
+                 for kind in ['read'] * args.readers + ['write'] * args.writers]
+    for process in processes:
+        process.start()
+    totals = {'read': [0, 0], 'write': [0, 0]}
+    for _ in processes:
+        kind, ops, errors = results.get()
+        totals[kind][0] += ops
+        totals[kind][1] += errors
+    for process in processes:
+        process.join()
+    print('%-10s %10.0f %10.0f %8d %8d' % (
+        os.environ['DB_PROFILE'], totals['read'][0] / args.seconds, totals['write'][0] / args.seconds,
+        totals['read'][1], totals['write'][1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+
+    print('%-10s %10s %10s %8s %8s' % ('profile', 'reads/s', 'writes/s', 'r.errs', 'w.errs'))
+    for profile in ('default', 'production'):
+        env = dict(os.environ, DB_PROFILE=profile, DATABASE_URL='sqlite:///' + os.path.join(
+            scratch_instance(), 'bench.db'))
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--profile', profile,
+                        '--readers', str(args.readers), '--writers', str(args.writers),
+                        '--seconds', str(args.seconds)], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
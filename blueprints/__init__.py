@@ -0,0 +1,16 @@
+"""
+The app's routes, one blueprint per area. Endpoints are named after their
+blueprint, e.g. url_for('tenants.add_tenant').
+"""
+from blueprints import (api, auth, dashboard, documents, expenses, imports, maintenance, messages, payments,
+                        properties, reports, tenants)
+
+BLUEPRINTS = (auth.bp, dashboard.bp, properties.bp, tenants.bp, payments.bp, expenses.bp, maintenance.bp,
+              documents.bp, messages.bp, reports.bp, imports.bp, api.bp)
+
+def register_blueprints(app):
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    if app.config['INSTRUMENTATION']:
+        from blueprints import metrics
+        app.register_blueprint(metrics.bp)
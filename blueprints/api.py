@@ -0,0 +1,218 @@
+"""
+JSON API, mounted under /api.
+"""
+import secrets
+
+from flask import Blueprint, Response, abort, jsonify, request
+from flask_login import current_user, login_required
+
+from blueprints.common import (date_arg, document_tenant_id, member_or_404, message_args, owned_property_or_404,
+                               page_args, read_only, report_args, search_args, sql_budget)
+from extensions import db
+from models import BackgroundJob, Tenant
+from serialization import dumps
+from services import (API_RESOURCES, analytics_report, api_page, enqueue_jobs, expenses_page, financial_report,
+                      inbox_page, maintenance_queue_page, MAINTENANCE_TRANSITIONS, mark_conversation_read,
+                      message_broker, new_messages, overdue_reminder_jobs, payments_page, publish_message,
+                      search_records, send_message, store_document, tenants_page, thread_page,
+                      unread_message_count)
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+def _api_filter_value(name, kind, value):
+    if kind is bool:
+        if value.lower() in ('1', 'true', 'yes'):
+            return True
+        if value.lower() in ('0', 'false', 'no'):
+            return False
+        abort(400, '{} must be true or false'.format(name))
+    try:
+        return kind(value)
+    except ValueError:
+        abort(400, 'Invalid value for {}'.format(name))
+
+def api_args(resource):
+    # (field names, filters) from ?fields=a,b and the resource's filter params
+    spec = API_RESOURCES[resource]
+    names = [name for name in request.args.get('fields', '').split(',') if name] or list(spec['fields'])
+    unknown = [name for name in names if name not in spec['fields']]
+    if unknown:
+        abort(400, 'Unknown fields: {}'.format(', '.join(unknown)))
+    filters = {name: _api_filter_value(name, kind, request.args[name])
+               for name, kind in spec['filters'].items() if request.args.get(name)}
+    if spec.get('date_field'):
+        filters['from'], filters['to'] = date_arg('from'), date_arg('to')
+    return names, filters
+
+@bp.route('/tenants')
+@login_required
+@read_only
+@sql_budget(1)
+def tenants():
+    tenants, next_cursor = tenants_page(current_user.id, *page_args())
+    return jsonify({'items': [t.to_dict() for t in tenants], 'next_cursor': next_cursor})
+
+@bp.route('/payments')
+@login_required
+@read_only
+@sql_budget(1)
+def payments():
+    payments, next_cursor = payments_page(current_user.id, *page_args())
+    return jsonify({'items': [p.to_dict() for p in payments], 'next_cursor': next_cursor})
+
+@bp.route('/expenses')
+@login_required
+@read_only
+@sql_budget(1)
+def expenses():
+    expenses, next_cursor = expenses_page(current_user.id, *page_args())
+    return jsonify({'items': [e.to_dict() for e in expenses], 'next_cursor': next_cursor})
+
+@bp.route('/v1/<resource>')
+@login_required
+@read_only
+@sql_budget(1)
+def v1_list(resource):
+    # ?fields=id,amount&property_id=3&from=2024-01-01&limit=100&cursor=...
+    if resource not in API_RESOURCES:
+        abort(404)
+    items, next_cursor = api_page(current_user.id, resource, *api_args(resource), *page_args())
+    return Response(dumps({'items': items, 'next_cursor': next_cursor}), mimetype='application/json')
+
+@bp.route('/search')
+@login_required
+@read_only
+@sql_budget(1)
+def search():
+    text, kinds = search_args()
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    return jsonify({'items': search_records(current_user.id, text, kinds, limit)})
+
+@bp.route('/search/autocomplete')
+@login_required
+@read_only
+@sql_budget(1)
+def search_autocomplete():
+    text, kinds = search_args()
+    limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+    return jsonify({'items': search_records(current_user.id, text, kinds, limit, autocomplete=True)})
+
+@bp.route('/maintenance/queue')
+@login_required
+@read_only
+@sql_budget(1)
+def maintenance_queue():
+    status = request.args.get('status', 'open')
+    if status not in MAINTENANCE_TRANSITIONS:
+        abort(400, 'Unknown status')
+    requests, next_cursor = maintenance_queue_page(current_user.id, status, *page_args())
+    return jsonify({'items': [r.to_dict() for r in requests], 'next_cursor': next_cursor})
+
+@bp.route('/documents', methods=['PUT'])
+@login_required
+def upload_document():
+    # Raw request body upload: streamed straight from the socket into the store
+    property = owned_property_or_404(request.args.get('property_id', type=int))
+    document = store_document(property, request.stream, request.args.get('file_name'),
+                              tenant_id=document_tenant_id(property),
+                              document_type=request.args.get('document_type'))
+    db.session.commit()
+    return jsonify(document.to_dict()), 201
+
+@bp.route('/messages')
+@login_required
+@read_only
+@sql_budget(1)
+def messages():
+    conversations, next_cursor = inbox_page(current_user.id, *page_args())
+    return jsonify({'items': [c.to_dict() for c in conversations], 'next_cursor': next_cursor})
+
+@bp.route('/messages', methods=['POST'])
+@login_required
+def post_message():
+    data = request.get_json(silent=True) or {}
+    body = (data.get('message') or '').strip()
+    if not body:
+        return jsonify({'status': 'error', 'message': 'message is required'}), 400
+    try:
+        receiver, property_id = message_args(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    message = send_message(current_user.id, receiver.id, body, property_id)
+    db.session.commit()
+    publish_message(message)
+    return jsonify(message.to_dict()), 201
+
+@bp.route('/messages/<int:conversation_id>')
+@login_required
+def conversation(conversation_id):
+    member = member_or_404(conversation_id)
+    if mark_conversation_read(member):
+        db.session.commit()
+    thread, next_cursor = thread_page(conversation_id, *page_args())
+    return jsonify({'items': [m.to_dict() for m in thread], 'next_cursor': next_cursor})
+
+@bp.route('/messages/poll')
+@login_required
+def poll_messages():
+    # Long-polling alternative to the event stream: returns as soon as a
+    # message newer than ?after= arrives, or empty after ?timeout= seconds
+    owner_id = current_user.id
+    after = request.args.get('after', 0, type=int)
+    timeout = max(0, min(request.args.get('timeout', 25, type=int), 60))
+    subscription = message_broker().subscribe(owner_id)
+    try:
+        # Subscribed first, so nothing committed after this read is missed
+        received = new_messages(owner_id, after)
+        db.session.close()
+        if not received and subscription.get(timeout):
+            received = new_messages(owner_id, after)
+    finally:
+        subscription.close()
+    return jsonify({'items': [m.to_dict() for m in received], 'unread': unread_message_count(owner_id)})
+
+@bp.route('/reports')
+@login_required
+@read_only
+@sql_budget(3)
+def reports():
+    return jsonify(financial_report(current_user.id, *report_args()))
+
+@bp.route('/reports/analytics')
+@login_required
+@read_only
+@sql_budget(2)
+def reports_analytics():
+    return jsonify(analytics_report(current_user.id, *report_args()))
+
+@bp.route('/send_whatsapp_reminder', methods=['POST'])
+@login_required
+def send_whatsapp_reminder():
+    # Queued for `flask run-worker`; the request never waits on the provider
+    owner_id = current_user.id
+    data = request.get_json(silent=True) or {}
+    tenant = Tenant.query.filter_by(id=data.get('tenant_id'), owner_id=owner_id).first_or_404()
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({'status': 'error', 'message': 'message is required'}), 400
+    key = request.headers.get('Idempotency-Key') or data.get('idempotency_key') or secrets.token_hex(16)
+    key = 'reminder:{}:{}'.format(owner_id, key)
+    enqueue_jobs('whatsapp_reminder', owner_id, [
+        (key, {'tenant_id': tenant.id, 'to': tenant.whatsapp_number or tenant.phone, 'message': message})])
+    db.session.commit()
+    job = BackgroundJob.query.filter_by(idempotency_key=key).one()
+    return jsonify({'status': 'queued', 'job_id': job.id}), 202
+
+@bp.route('/reminders/overdue', methods=['POST'])
+@login_required
+def remind_overdue_tenants():
+    owner_id = current_user.id
+    enqueued = enqueue_jobs('whatsapp_reminder', owner_id, overdue_reminder_jobs(owner_id))
+    db.session.commit()
+    return jsonify({'status': 'queued', 'enqueued': enqueued}), 202
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = BackgroundJob.query.filter_by(id=job_id, owner_id=current_user.id).first_or_404()
+    return jsonify(job.to_dict())
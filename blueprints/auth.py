@@ -0,0 +1,77 @@
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
+from flask_login import login_required, login_user, logout_user
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from extensions import db, login_manager
+from models import Owner, OwnerIdentity
+from sessions import regenerate_session
+
+bp = Blueprint('auth', __name__)
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Served from the per-process cache on the hot path, so authenticated
+    # requests don't query the owner table
+    owner_cache = current_app.extensions['owner_cache']
+    user_id = int(user_id)
+    identity = owner_cache.get(user_id)
+    if identity is None:
+        owner = db.session.get(Owner, user_id)
+        if owner is None:
+            return None
+        identity = OwnerIdentity(owner)
+        owner_cache.set(user_id, identity)
+    return identity
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form.get('username')
+        email = request.form.get('email')
+        password = request.form.get('password')
+        phone = request.form.get('phone')
+
+        # Check if user exists
+        if Owner.query.filter_by(email=email).first():
+            flash('Email already registered', 'danger')
+            return redirect(url_for('auth.register'))
+
+        # Create new owner
+        hashed_password = generate_password_hash(password)
+        new_owner = Owner(
+            username=username,
+            email=email,
+            password_hash=hashed_password,
+            phone=phone
+        )
+        db.session.add(new_owner)
+        db.session.commit()
+
+        flash('Registration successful! Please login.', 'success')
+        return redirect(url_for('auth.login'))
+
+    return render_template('register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('password')
+
+        owner = Owner.query.filter_by(email=email).first()
+
+        if owner and check_password_hash(owner.password_hash, password):
+            regenerate_session(session)
+            login_user(owner)
+            flash('Welcome back, {}!'.format(owner.username), 'success')
+            return redirect(url_for('dashboard.dashboard'))
+        else:
+            flash('Invalid email or password', 'danger')
+
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for('dashboard.index'))
@@ -0,0 +1,185 @@
+"""
+Decorators and request helpers shared by the blueprints.
+"""
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+
+from flask import abort, current_app, g, has_app_context, make_response, request, session
+from flask_login import current_user
+
+from extensions import db
+from models import ConversationMember, Owner, OwnerStats, Property, Tenant
+from search import KINDS as SEARCH_KINDS
+from services import MAX_PAGE_SIZE, PAGE_SIZE, add_months, month_start
+
+# Page cache; each app keeps its own TTLCache in app.extensions['page_cache']
+def owner_data_version(owner_id, bind=None):
+    # Read from the primary unless another bind is given, even under
+    # @read_only: a lagging replica would validate a page the primary has
+    # already changed
+    return db.session.scalar(db.select(OwnerStats.data_version).where(OwnerStats.owner_id == owner_id),
+                             bind_arguments={'bind': bind or db.engine})
+
+def _replica_behind(owner_id, version):
+    replica = db.engines.get('replica')
+    return (g.get('use_replica') and replica is not None
+            and owner_data_version(owner_id, replica) != version)
+
+def cached_view(view):
+    # Per-owner page cache keyed by the owner's data version. A browser that
+    # already has this version gets a 304 and nothing is queried or rendered;
+    # otherwise the rendered page is reused until the next write bumps the
+    # version. Only the ETag is validated: updated_at has one-second
+    # resolution, so If-Modified-Since could not tell two writes apart.
+    # Place above sql_budget so only a re-render is counted.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if '_flashes' in session:
+            # Pending flash messages are rendered into the page once
+            return view(*args, **kwargs)
+        owner_id = current_user.id
+        version = owner_data_version(owner_id)
+        if version is None:
+            return view(*args, **kwargs)
+        page_cache = current_app.extensions['page_cache']
+        variant = '{}|{}|{}'.format(current_app.config['RELEASE'], request.full_path,
+                                    session.get('dark_mode', False))
+        key = (owner_id, variant)
+        etag = '{}-{}-{}'.format(owner_id, version, hashlib.sha1(variant.encode('utf-8')).hexdigest()[:16])
+
+        response = make_response('')
+        if etag not in request.if_none_match:
+            cached = page_cache.get(key)
+            if cached is not None and cached[0] == version:
+                body = cached[1]
+            else:
+                if _replica_behind(owner_id, version):
+                    # Render this version from the primary rather than cache
+                    # the replica's older data under it
+                    g.use_replica = False
+                body = view(*args, **kwargs)
+                if not isinstance(body, str):
+                    return body
+                page_cache.set(key, (version, body))
+            response = make_response(body)
+        else:
+            response.status_code = 304
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+# SQL statement budgets: with ENFORCE_SQL_BUDGET on (the default under
+# TESTING) a page that issues more statements than its budget fails loudly,
+# which is how an N+1 regression in a template shows up. create_app hooks
+# count_sql_statement into every engine. The budget is kept on the view as
+# `sql_budget` (the decorators above it copy it along) for tests to read.
+def count_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+
+def sql_budget(max_statements):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('ENFORCE_SQL_BUDGET', current_app.testing):
+                return view(*args, **kwargs)
+            g.sql_statements = 0
+            response = view(*args, **kwargs)
+            if g.sql_statements > max_statements:
+                raise AssertionError('%s issued %d SQL statements, budget is %d' % (
+                    request.endpoint, g.sql_statements, max_statements))
+            return response
+        wrapper.sql_budget = max_statements
+        return wrapper
+    return decorator
+
+# Query string arguments
+def date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, 'Dates are formatted YYYY-MM-DD')
+
+def month_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return month_start(datetime.strptime(value, '%Y-%m').date())
+    except ValueError:
+        abort(400, 'Months are formatted YYYY-MM')
+
+def report_args():
+    end = month_arg('end', month_start(date.today()))
+    start = month_arg('start', add_months(end, -11))
+    if start > end:
+        abort(400, 'start must not be after end')
+    return start, end, request.args.get('property_id', type=int)
+
+def page_args():
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    return request.args.get('cursor'), max(1, min(limit, MAX_PAGE_SIZE))
+
+def search_args():
+    kinds = request.args.getlist('kind')
+    if any(kind not in SEARCH_KINDS for kind in kinds):
+        abort(400, 'Unknown kind')
+    return request.args.get('q', ''), kinds
+
+# Lookups scoped to the signed-in owner
+def owned_property_or_404(property_id):
+    return Property.query.filter_by(id=property_id, owner_id=current_user.id).first_or_404()
+
+def document_tenant_id(property):
+    tenant_id = request.values.get('tenant_id', type=int)
+    if tenant_id and not Tenant.query.filter_by(id=tenant_id, property_id=property.id).first():
+        abort(400, 'That tenant does not rent this property')
+    return tenant_id
+
+def _id_value(data, name):
+    # A form field or JSON member holding a record id; booleans are rejected
+    # even though int() would take them
+    value = data.get(name)
+    if not value:
+        return None
+    if isinstance(value, bool):
+        raise ValueError('Invalid value for {}'.format(name))
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid value for {}'.format(name)) from None
+
+def message_args(data):
+    # (receiver, property_id) for a new message; the property, if any, must
+    # belong to one of the two owners. Raises ValueError with a message for
+    # the client when either is missing or invalid.
+    receiver = None
+    receiver_id = _id_value(data, 'receiver_id')
+    if receiver_id:
+        receiver = db.session.get(Owner, receiver_id)
+    elif data.get('email'):
+        receiver = Owner.query.filter_by(email=data.get('email')).first()
+    if receiver is None or receiver.id == current_user.id:
+        raise ValueError('Unknown recipient')
+    property_id = _id_value(data, 'property_id')
+    if property_id and not Property.query.filter(
+            Property.id == property_id, Property.owner_id.in_((current_user.id, receiver.id))).first():
+        raise ValueError('Unknown property')
+    return receiver, property_id
+
+def member_or_404(conversation_id):
+    return ConversationMember.query.filter_by(
+        conversation_id=conversation_id, owner_id=current_user.id).first_or_404()
@@ -0,0 +1,58 @@
+from flask import Blueprint, redirect, render_template, request, session, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import cached_view, read_only, search_args, sql_budget
+from services import get_owner_stats, recent_payments_query, search_records
+
+bp = Blueprint('dashboard', __name__)
+
+@bp.app_context_processor
+def inject_theme():
+    # Example: Use session to store dark mode preference
+    return dict(dark_mode=session.get('dark_mode', False))
+
+@bp.route('/toggle_dark_mode')
+def toggle_dark_mode():
+    session['dark_mode'] = not session.get('dark_mode', False)
+    return redirect(request.referrer or url_for('dashboard.dashboard'))
+
+@bp.route('/')
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard.dashboard'))
+    return render_template('index.html')
+
+@bp.route('/dashboard')
+@login_required
+@read_only
+@cached_view
+@sql_budget(5)
+def dashboard():
+    owner_id = current_user.id
+    
+    # Counters come from the materialized stats row
+    stats = get_owner_stats(owner_id)
+    
+    # Recent payments
+    recent_payments = recent_payments_query(owner_id).all()
+    
+    return render_template('dashboard.html',
+                         total_properties=stats.property_count,
+                         active_tenants=stats.active_tenant_count,
+                         monthly_income=stats.monthly_rent_total,
+                         recent_payments=recent_payments,
+                         pending_maintenance=stats.open_maintenance_count,
+                         sla_breaches=stats.sla_breach_count or 0,
+                         unread_messages=stats.unread_message_count or 0,
+                         overdue_count=stats.overdue_count or 0,
+                         overdue_total=stats.overdue_total or 0)
+
+@bp.route('/search')
+@login_required
+@read_only
+@sql_budget(1)
+def search():
+    text, kinds = search_args()
+    results = search_records(current_user.id, text, kinds, limit=50)
+    return render_template('search.html', q=text, kinds=kinds, results=results)
+
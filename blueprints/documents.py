@@ -0,0 +1,84 @@
+import os
+
+from flask import Blueprint, abort, flash, jsonify, redirect, render_template, request, send_file, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import document_tenant_id, owned_property_or_404, page_args, read_only, sql_budget
+from extensions import db
+from models import Document, Property, Tenant
+from services import (attach_document, document_store, documents_page, request_thumbnail, send_document,
+                      store_document)
+from storage import INLINE_TYPES
+
+bp = Blueprint('documents', __name__)
+
+@bp.route('/documents')
+@login_required
+@read_only
+@sql_budget(1)
+def documents():
+    documents, next_cursor = documents_page(current_user.id, *page_args())
+    return render_template('documents.html', documents=documents, next_cursor=next_cursor)
+
+@bp.route('/add_document', methods=['GET', 'POST'])
+@login_required
+def add_document():
+    if request.method == 'POST':
+        property = owned_property_or_404(int(request.form.get('property_id')))
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a file to upload', 'danger')
+        else:
+            store_document(property, upload.stream, upload.filename, tenant_id=document_tenant_id(property),
+                           document_type=request.form.get('document_type'))
+            db.session.commit()
+            flash('Document uploaded successfully!', 'success')
+            return redirect(url_for('documents.documents'))
+
+    properties = Property.query.filter_by(owner_id=current_user.id).all()
+    return render_template('add_document.html', properties=properties)
+
+def _owned_document_or_404(document_id):
+    return Document.query.filter_by(id=document_id, owner_id=current_user.id).first_or_404()
+
+@bp.route('/documents/<int:document_id>')
+@login_required
+@read_only
+@sql_budget(1)
+def download_document(document_id):
+    document = _owned_document_or_404(document_id)
+    return send_document(document.sha256, document.blob.mimetype, document.file_name)
+
+@bp.route('/documents/<int:document_id>/thumbnail')
+@login_required
+def document_thumbnail(document_id):
+    document = _owned_document_or_404(document_id)
+    path = document_store().thumbnail_path(document.sha256)
+    if os.path.exists(path):
+        return send_file(path, mimetype='image/png', conditional=True, etag=document.sha256 + '-thumbnail',
+                         max_age=86400)
+    if document.blob.mimetype not in INLINE_TYPES:
+        abort(404)
+    job = request_thumbnail(document.blob)
+    if job.status == 'failed':
+        abort(404)
+    response = jsonify({'status': job.status, 'job_id': job.id})
+    response.status_code = 202
+    response.headers['Retry-After'] = '2'
+    return response
+
+@bp.route('/documents/<int:document_id>/share', methods=['POST'])
+@login_required
+def share_document(document_id):
+    # Attach a stored document to more tenants of the same property without
+    # uploading it again
+    document = _owned_document_or_404(document_id)
+    property = owned_property_or_404(document.property_id)
+    tenant_ids = request.form.getlist('tenant_id', type=int)
+    tenants = Tenant.query.filter(Tenant.id.in_(tenant_ids), Tenant.property_id == document.property_id).all()
+    for tenant in tenants:
+        attach_document(property, document.sha256, document.file_name, tenant_id=tenant.id,
+                     document_type=document.document_type)
+    db.session.commit()
+    flash('Document shared with {} tenants.'.format(len(tenants)), 'success')
+    return redirect(request.referrer or url_for('documents.documents'))
@@ -0,0 +1,32 @@
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import cached_view, page_args, read_only, sql_budget
+from extensions import db
+from models import Expense
+from services import expenses_page, store_document
+
+bp = Blueprint('expenses', __name__)
+
+@bp.route('/expenses')
+@login_required
+@read_only
+@cached_view
+@sql_budget(1)
+def expenses():
+    expenses, next_cursor = expenses_page(current_user.id, *page_args())
+    return render_template('expenses.html', expenses=expenses, next_cursor=next_cursor)
+
+@bp.route('/expenses/<int:expense_id>/receipt', methods=['POST'])
+@login_required
+def upload_receipt(expense_id):
+    expense = Expense.query.filter_by(id=expense_id, owner_id=current_user.id).first_or_404()
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Choose a file to upload', 'danger')
+    else:
+        document = store_document(expense.property, upload.stream, upload.filename, document_type='receipt')
+        expense.receipt_url = document.file_url
+        db.session.commit()
+        flash('Receipt uploaded successfully!', 'success')
+    return redirect(request.referrer or url_for('expenses.expenses'))
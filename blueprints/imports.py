@@ -0,0 +1,50 @@
+import os
+import secrets
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, send_from_directory, url_for
+from flask_login import current_user, login_required
+
+from importer import KINDS as IMPORT_KINDS, ErrorReport, ImportRowError, read_records
+from services import import_records
+
+bp = Blueprint('imports', __name__)
+
+def _import_errors_dir():
+    path = current_app.config['IMPORT_ROOT']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_data():
+    if request.method == 'POST':
+        owner_id = current_user.id
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        if kind not in IMPORT_KINDS or not upload or not upload.filename:
+            flash('Choose what to import and a CSV or Excel file', 'danger')
+            return redirect(url_for('imports.import_data'))
+        token = secrets.token_hex(8)
+        path = os.path.join(_import_errors_dir(), '{}-{}.csv'.format(owner_id, token))
+        with open(path, 'w', newline='') as report:
+            errors = ErrorReport(report)
+            try:
+                imported = import_records(owner_id, kind, read_records(upload.stream, upload.filename), errors)
+            except ImportRowError as error:
+                flash(str(error), 'danger')
+                imported = None
+        if not errors.count:
+            os.remove(path)
+            token = None
+        if imported is not None:
+            flash('Imported {} {}; {} rows rejected.'.format(imported, kind, errors.count),
+                  'warning' if errors.count else 'success')
+        return redirect(url_for('imports.import_data', errors=token))
+    
+    return render_template('import.html', kinds=IMPORT_KINDS, error_report=request.args.get('errors'))
+
+@bp.route('/import/errors/<token>.csv')
+@login_required
+def import_errors(token):
+    return send_from_directory(_import_errors_dir(), '{}-{}.csv'.format(current_user.id, token),
+                               as_attachment=True, download_name='import-errors.csv')
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import owned_property_or_404, page_args, read_only, sql_budget
+from extensions import db
+from models import MaintenanceRequest, Property, Tenant
+from services import (MAINTENANCE_PRIORITIES, MAINTENANCE_TRANSITIONS, maintenance_queue_page,
+                      new_maintenance_request, set_maintenance_priority, set_maintenance_status)
+
+bp = Blueprint('maintenance', __name__)
+
+@bp.route('/maintenance')
+@login_required
+@read_only
+@sql_budget(1)
+def maintenance():
+    status = request.args.get('status', 'open')
+    if status not in MAINTENANCE_TRANSITIONS:
+        abort(400, 'Unknown status')
+    requests, next_cursor = maintenance_queue_page(current_user.id, status, *page_args())
+    return render_template('maintenance.html', requests=requests, next_cursor=next_cursor, status=status,
+                           now=datetime.utcnow())
+
+@bp.route('/add_maintenance', methods=['GET', 'POST'])
+@login_required
+def add_maintenance():
+    if request.method == 'POST':
+        property = owned_property_or_404(int(request.form.get('property_id')))
+        priority = request.form.get('priority', 'medium')
+        tenant_id = request.form.get('tenant_id', type=int)
+        if priority not in MAINTENANCE_PRIORITIES:
+            flash('Invalid priority', 'danger')
+        elif tenant_id and not Tenant.query.filter_by(id=tenant_id, property_id=property.id).first():
+            flash('That tenant does not rent this property', 'danger')
+        else:
+            new_maintenance_request(property, priority, tenant_id=tenant_id,
+                                    issue_type=request.form.get('issue_type'),
+                                    description=request.form.get('description'))
+            db.session.commit()
+            flash('Maintenance request created!', 'success')
+            return redirect(url_for('maintenance.maintenance'))
+
+    properties = Property.query.filter_by(owner_id=current_user.id).all()
+    return render_template('add_maintenance.html', properties=properties, priorities=MAINTENANCE_PRIORITIES)
+
+def _owned_maintenance_request_or_404(request_id):
+    return MaintenanceRequest.query.filter_by(id=request_id, owner_id=current_user.id).first_or_404()
+
+@bp.route('/maintenance/<int:request_id>/status', methods=['POST'])
+@login_required
+def update_maintenance_status(request_id):
+    maintenance_request = _owned_maintenance_request_or_404(request_id)
+    try:
+        set_maintenance_status(maintenance_request, request.form.get('status'))
+    except ValueError as error:
+        flash(str(error), 'danger')
+    else:
+        db.session.commit()
+        flash('Maintenance request updated!', 'success')
+    return redirect(request.referrer or url_for('maintenance.maintenance'))
+
+@bp.route('/maintenance/<int:request_id>/priority', methods=['POST'])
+@login_required
+def update_maintenance_priority(request_id):
+    maintenance_request = _owned_maintenance_request_or_404(request_id)
+    priority = request.form.get('priority')
+    if priority not in MAINTENANCE_PRIORITIES:
+        flash('Invalid priority', 'danger')
+    else:
+        set_maintenance_priority(maintenance_request, priority)
+        db.session.commit()
+        flash('Maintenance request updated!', 'success')
+    return redirect(request.referrer or url_for('maintenance.maintenance'))
@@ -0,0 +1,89 @@
+from flask import Blueprint, Response, current_app, flash, redirect, render_template, request, url_for
+from flask import stream_with_context
+from flask_login import current_user, login_required
+
+from blueprints.common import member_or_404, message_args, page_args, read_only, sql_budget
+from extensions import db
+from models import Message
+from serialization import dumps
+from services import (inbox_page, mark_conversation_read, message_broker, new_messages, publish_message,
+                      send_message, thread_page, unread_message_count)
+
+bp = Blueprint('messages', __name__)
+
+@bp.route('/messages')
+@login_required
+@read_only
+@sql_budget(1)
+def messages():
+    conversations, next_cursor = inbox_page(current_user.id, *page_args())
+    return render_template('messages.html', conversations=conversations, next_cursor=next_cursor)
+
+@bp.route('/messages/send', methods=['POST'])
+@login_required
+def send_message_route():
+    body = (request.form.get('message') or '').strip()
+    if not body:
+        flash('Write a message first', 'danger')
+        return redirect(request.referrer or url_for('messages.messages'))
+    try:
+        receiver, property_id = message_args(request.form)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(request.referrer or url_for('messages.messages'))
+    message = send_message(current_user.id, receiver.id, body, property_id)
+    db.session.commit()
+    publish_message(message)
+    return redirect(url_for('messages.conversation', conversation_id=message.conversation_id))
+
+@bp.route('/messages/<int:conversation_id>')
+@login_required
+def conversation(conversation_id):
+    # Opening a thread marks what the owner received in it as read
+    member = member_or_404(conversation_id)
+    if mark_conversation_read(member):
+        db.session.commit()
+    thread, next_cursor = thread_page(conversation_id, *page_args())
+    return render_template('conversation.html', member=member, messages=thread, next_cursor=next_cursor)
+
+@bp.route('/messages/stream')
+@login_required
+def message_stream():
+    # Server-Sent Events: new messages are pushed as they are published;
+    # every heartbeat also catches up from the database, which covers
+    # messages published by other workers when the broker is per-process
+    owner_id = current_user.id
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    subscription = message_broker().subscribe(owner_id)
+    if last_id is None:
+        last_id = db.session.execute(db.select(db.func.max(Message.id)).where(
+            Message.receiver_id == owner_id)).scalar() or 0
+    backlog = [message.to_dict() for message in new_messages(owner_id, last_id)]
+    unread = unread_message_count(owner_id)
+    db.session.close()  # no connection is held while the stream idles
+
+    def event(name, data, event_id=None):
+        prefix = 'id: {}\n'.format(event_id) if event_id is not None else ''
+        return '{}event: {}\ndata: {}\n\n'.format(prefix, name, dumps(data).decode('utf-8'))
+
+    def generate():
+        seen = last_id
+        try:
+            yield 'retry: 5000\n' + event('unread', {'unread': unread})
+            pending = backlog
+            while True:
+                for message in pending:
+                    if message['id'] > seen:
+                        seen = message['id']
+                        yield event('message', message, message['id'])
+                pending = subscription.get(timeout=current_app.config['MESSAGE_STREAM_HEARTBEAT'])
+                if not pending:
+                    pending = [message.to_dict() for message in new_messages(owner_id, seen)]
+                    db.session.close()
+                    if not pending:
+                        yield ': heartbeat\n\n'
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
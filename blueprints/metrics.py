@@ -0,0 +1,14 @@
+import secrets
+
+from flask import Blueprint, Response, abort, current_app, request
+
+# Registered only when INSTRUMENTATION is on, so /metrics is a 404 otherwise
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics')
+def metrics():
+    # Prometheus scrape target
+    token = current_app.config['METRICS_TOKEN']
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), 'Bearer ' + token):
+        abort(401)
+    return Response(current_app.extensions['instrumentation'].render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,56 @@
+from datetime import datetime
+from decimal import Decimal
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import cached_view, owned_property_or_404, page_args, read_only, sql_budget
+from extensions import db
+from models import Payment, Property, Tenant
+from services import (add_to_rollups, adjust_owner_stats, mark_rent_ledger_stale, payment_rollup_entries,
+                      payments_page)
+
+bp = Blueprint('payments', __name__)
+
+@bp.route('/payments')
+@login_required
+@read_only
+@cached_view
+@sql_budget(1)
+def payments():
+    payments, next_cursor = payments_page(current_user.id, *page_args())
+    return render_template('payments.html', payments=payments, next_cursor=next_cursor)
+
+@bp.route('/add_payment', methods=['GET', 'POST'])
+@login_required
+def add_payment():
+    if request.method == 'POST':
+        property = owned_property_or_404(int(request.form.get('property_id')))
+        # Former tenants included, so arrears can be recorded after they
+        # move out; bulk imports apply the same rule
+        tenant = Tenant.query.filter_by(id=request.form.get('tenant_id', type=int), property_id=property.id,
+                                        owner_id=property.owner_id).first()
+        if tenant is None:
+            flash('That tenant does not rent this property', 'danger')
+            return redirect(url_for('payments.add_payment'))
+        new_payment = Payment(
+            property_id=property.id,
+            owner_id=property.owner_id,
+            tenant_id=tenant.id,
+            amount=Decimal(request.form.get('amount')),
+            payment_date=datetime.strptime(request.form.get('payment_date'), '%Y-%m-%d').date(),
+            payment_method=request.form.get('payment_method'),
+            payment_type=request.form.get('payment_type'),
+            notes=request.form.get('notes')
+        )
+        db.session.add(new_payment)
+        adjust_owner_stats(current_user.id, payment_count=1, total_collected=new_payment.amount)
+        add_to_rollups(payment_rollup_entries([new_payment]))
+        if new_payment.payment_type == 'rent':
+            mark_rent_ledger_stale([new_payment.tenant_id])
+        db.session.commit()
+        flash('Payment recorded successfully!', 'success')
+        return redirect(url_for('payments.payments'))
+    
+    properties = Property.query.filter_by(owner_id=current_user.id).all()
+    return render_template('add_payment.html', properties=properties)
@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import cached_view, owned_property_or_404, read_only
+from extensions import db
+from models import Owner, Property, PropertyTransfer
+from services import (accept_property_transfer, adjust_owner_stats, cancel_property_transfer,
+                      offer_property_transfer)
+
+bp = Blueprint('properties', __name__)
+
+@bp.route('/properties')
+@login_required
+@read_only
+@cached_view
+def properties():
+    properties = Property.query.filter_by(owner_id=current_user.id).all()
+    offered = PropertyTransfer.query.filter_by(from_owner_id=current_user.id).all()
+    incoming = PropertyTransfer.query.filter_by(to_owner_id=current_user.id).all()
+    return render_template('properties.html', properties=properties, incoming=incoming,
+                           offered={transfer.property_id: transfer for transfer in offered})
+
+@bp.route('/add_property', methods=['GET', 'POST'])
+@login_required
+def add_property():
+    if request.method == 'POST':
+        new_property = Property(
+            name=request.form.get('name'),
+            address=request.form.get('address'),
+            property_type=request.form.get('property_type'),
+            bedrooms=int(request.form.get('bedrooms', 0)),
+            bathrooms=int(request.form.get('bathrooms', 0)),
+            area_sqft=float(request.form.get('area_sqft', 0)),
+            monthly_rent=Decimal(request.form.get('monthly_rent', 0)),
+            owner_id=current_user.id
+        )
+        db.session.add(new_property)
+        adjust_owner_stats(current_user.id, property_count=1,
+                           monthly_rent_total=new_property.monthly_rent)
+        db.session.commit()
+        flash('Property added successfully!', 'success')
+        return redirect(url_for('properties.properties'))
+    
+    return render_template('add_property.html')
+
+@bp.route('/properties/<int:property_id>/transfer', methods=['POST'])
+@login_required
+def transfer_property_route(property_id):
+    # Only offers the property; it moves when the other owner accepts
+    property = owned_property_or_404(property_id)
+    new_owner = Owner.query.filter_by(email=request.form.get('email')).first()
+    if new_owner is None:
+        flash('No owner is registered with that email', 'danger')
+    elif new_owner.id == current_user.id:
+        flash('You already own this property', 'danger')
+    else:
+        offer_property_transfer(property, new_owner.id)
+        db.session.commit()
+        flash('Transfer offered to {}; the property moves when they accept.'.format(new_owner.username),
+              'success')
+    return redirect(url_for('properties.properties'))
+
+@bp.route('/transfers/<int:transfer_id>/accept', methods=['POST'])
+@login_required
+def accept_transfer(transfer_id):
+    transfer = PropertyTransfer.query.filter_by(id=transfer_id, to_owner_id=current_user.id).first_or_404()
+    name = transfer.property.name
+    accept_property_transfer(transfer)
+    db.session.commit()
+    flash('{} is now yours.'.format(name), 'success')
+    return redirect(url_for('properties.properties'))
+
+@bp.route('/transfers/<int:transfer_id>/cancel', methods=['POST'])
+@login_required
+def cancel_transfer(transfer_id):
+    # The recipient declines, or the owner withdraws the offer
+    transfer = PropertyTransfer.query.filter(
+        PropertyTransfer.id == transfer_id,
+        db.or_(PropertyTransfer.to_owner_id == current_user.id,
+               PropertyTransfer.from_owner_id == current_user.id)).first_or_404()
+    cancel_property_transfer(transfer)
+    db.session.commit()
+    flash('Transfer cancelled.', 'success')
+    return redirect(url_for('properties.properties'))
@@ -0,0 +1,44 @@
+import tempfile
+from datetime import date
+
+from flask import Blueprint, Response, abort, render_template, request, send_file, stream_with_context
+from flask_login import current_user, login_required
+
+from blueprints.common import date_arg, read_only, report_args, sql_budget
+from exporter import csv_chunks, write_parquet
+from services import EXPORT_KINDS, analytics_report, export_batches, export_header, financial_report
+
+bp = Blueprint('reports', __name__)
+
+@bp.route('/reports')
+@login_required
+@read_only
+@sql_budget(3)
+def reports():
+    # ?mode=analytics scans the raw ledgers for ad-hoc breakdowns; the default
+    # report reads only the monthly rollups
+    if request.args.get('mode') == 'analytics':
+        return render_template('reports.html', analytics=analytics_report(current_user.id, *report_args()))
+    report = financial_report(current_user.id, *report_args())
+    return render_template('reports.html', report=report)
+
+@bp.route('/export/<kind>.<fmt>')
+@login_required
+@read_only
+def export_ledger(kind, fmt):
+    if kind not in EXPORT_KINDS or fmt not in ('csv', 'parquet'):
+        abort(404)
+    batches = export_batches(current_user.id, kind, date_arg('start'), date_arg('end'),
+                             request.args.get('property_id', type=int))
+    filename = '{}-{}.{}'.format(kind, date.today().isoformat(), fmt)
+    if fmt == 'csv':
+        header = [name for name, _ in export_header(kind)]
+        return Response(stream_with_context(csv_chunks(header, batches)), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=' + filename})
+    # Parquet's footer is written last, so the file is built on disk a row
+    # group at a time and then sent
+    output = tempfile.TemporaryFile()
+    write_parquet(output, export_header(kind), batches)
+    output.seek(0)
+    return send_file(output, mimetype='application/vnd.apache.parquet',
+                     as_attachment=True, download_name=filename)
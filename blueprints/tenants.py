@@ -0,0 +1,61 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from blueprints.common import cached_view, owned_property_or_404, page_args, read_only, sql_budget
+from extensions import db
+from models import Property, Tenant
+from services import (adjust_owner_stats, end_lease, mark_occupied, mark_rent_ledger_stale, occupancy_entries,
+                      tenants_page)
+
+bp = Blueprint('tenants', __name__)
+
+@bp.route('/tenants')
+@login_required
+@read_only
+@cached_view
+@sql_budget(1)
+def tenants():
+    tenants, next_cursor = tenants_page(current_user.id, *page_args())
+    return render_template('tenants.html', tenants=tenants, next_cursor=next_cursor)
+
+@bp.route('/add_tenant', methods=['GET', 'POST'])
+@login_required
+def add_tenant():
+    if request.method == 'POST':
+        property = owned_property_or_404(int(request.form.get('property_id')))
+        new_tenant = Tenant(
+            name=request.form.get('name'),
+            email=request.form.get('email'),
+            phone=request.form.get('phone'),
+            whatsapp_number=request.form.get('whatsapp_number'),
+            lease_start=datetime.strptime(request.form.get('lease_start'), '%Y-%m-%d').date(),
+            lease_end=datetime.strptime(request.form.get('lease_end'), '%Y-%m-%d').date(),
+            security_deposit=Decimal(request.form.get('security_deposit', 0)),
+            property_id=property.id,
+            owner_id=property.owner_id
+        )
+        db.session.add(new_tenant)
+        adjust_owner_stats(current_user.id, active_tenant_count=1)
+        mark_occupied(occupancy_entries(new_tenant, property.monthly_rent, date.today()))
+        mark_rent_ledger_stale([new_tenant.id])
+        db.session.commit()
+        flash('Tenant added successfully!', 'success')
+        return redirect(url_for('tenants.tenants'))
+    
+    properties = Property.query.filter_by(owner_id=current_user.id).all()
+    return render_template('add_tenant.html', properties=properties)
+
+@bp.route('/tenants/<int:tenant_id>/move_out', methods=['POST'])
+@login_required
+def move_out(tenant_id):
+    tenant = Tenant.query.filter_by(id=tenant_id, owner_id=current_user.id).first_or_404()
+    if not tenant.is_active:
+        flash('That tenant has already moved out', 'danger')
+    else:
+        end_lease(tenant, date.today())
+        db.session.commit()
+        flash('Tenant moved out', 'success')
+    return redirect(request.referrer or url_for('tenants.tenants'))
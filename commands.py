@@ -0,0 +1,174 @@
+"""
+`flask` CLI commands, registered on every app by create_app.
+"""
+import asyncio
+import os
+import secrets
+import socket
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from exporter import csv_chunks, write_parquet
+from extensions import db
+from importer import KINDS as IMPORT_KINDS, ErrorReport, ImportRowError, read_records
+from models import Owner
+from schema import full_scans, upgrade_schema, view_queries
+from services import (EXPORT_KINDS, IMPORT_BATCH_SIZE, detect_sla_breaches, export_batches, export_header,
+                      import_records, rebuild_rent_ledger, rebuild_rollups, rebuild_search_index,
+                      refresh_owner_stats, run_jobs, run_rent_ledger, run_worker_async)
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Create missing tables and indexes."""
+    upgrade_schema()
+    click.echo('Database schema is up to date.')
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any view query plans a full table scan."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('EXPLAIN QUERY PLAN checks only run against SQLite')
+    failures = 0
+    for name, statement in view_queries(owner_id=1).items():
+        scans = full_scans(statement)
+        failures += bool(scans)
+        click.echo('%-28s %s' % (name, 'FULL SCAN: ' + '; '.join(scans) if scans else 'ok'))
+    if failures:
+        raise click.ClickException('%d view queries do a full scan' % failures)
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Re-index every searchable record from the source tables."""
+    rebuild_search_index()
+    click.echo('Search index rebuilt.')
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute every owner's dashboard counters from the raw tables."""
+    for (owner_id,) in db.session.query(Owner.id):
+        refresh_owner_stats(owner_id)
+    db.session.commit()
+    click.echo('Owner stats rebuilt.')
+
+@click.command('rebuild-rollups')
+@click.option('--owner-id', type=int, help='Only rebuild this owner\'s rollups.')
+@with_appcontext
+def rebuild_rollups_command(owner_id):
+    """Recompute monthly report rollups from payments, expenses and leases."""
+    rebuild_rollups(owner_id)
+    db.session.commit()
+    click.echo('Monthly rollups rebuilt.')
+
+@click.command('run-rent-ledger')
+@click.option('--date', 'today', type=click.DateTime(formats=['%Y-%m-%d']), help='Run as of this day.')
+@with_appcontext
+def run_rent_ledger_command(today):
+    """Bring the rent ledger up to date; schedule nightly, e.g. from cron."""
+    changed = run_rent_ledger(today.date() if today else None)
+    db.session.commit()
+    click.echo('Rent ledger updated ({} changed tenants).'.format(changed))
+
+@click.command('rebuild-rent-ledger')
+@click.option('--owner-id', type=int, help='Only rebuild this owner\'s ledger.')
+@with_appcontext
+def rebuild_rent_ledger_command(owner_id):
+    """Recompute the rent ledger from leases and rent payments."""
+    tenants = rebuild_rent_ledger(owner_id)
+    db.session.commit()
+    click.echo('Rent ledger rebuilt for {} tenants.'.format(tenants))
+
+@click.command('check-maintenance-sla')
+@with_appcontext
+def check_maintenance_sla_command():
+    """Flag open maintenance requests past their SLA; schedule every few minutes."""
+    breached = detect_sla_breaches()
+    db.session.commit()
+    click.echo('{} maintenance requests newly past their SLA.'.format(breached))
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(IMPORT_KINDS))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--owner-email', required=True, help='Owner account the rows belong to.')
+@click.option('--errors', 'errors_path', help='Where to write rejected rows (default: PATH.errors.csv).')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_data_command(kind, path, owner_email, errors_path, batch_size):
+    """Bulk-load properties, tenants, payments or expenses from CSV/Excel."""
+    owner = Owner.query.filter_by(email=owner_email).first()
+    if owner is None:
+        raise click.ClickException('No owner with email %s' % owner_email)
+    errors_path = errors_path or path + '.errors.csv'
+    with open(path, 'rb') as stream, open(errors_path, 'w', newline='') as report:
+        errors = ErrorReport(report)
+        try:
+            imported = import_records(owner.id, kind, read_records(stream, path), errors, batch_size)
+        except ImportRowError as error:
+            raise click.ClickException(str(error))
+    if not errors.count:
+        os.remove(errors_path)
+    click.echo('Imported %d %s, rejected %d%s.' % (
+        imported, kind, errors.count, ' (see %s)' % errors_path if errors.count else ''))
+
+@click.command('export-ledger')
+@click.argument('kind', type=click.Choice(EXPORT_KINDS))
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--owner-email', required=True)
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']))
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']))
+@click.option('--property-id', type=int)
+@with_appcontext
+def export_ledger_command(kind, output, owner_email, start, end, property_id):
+    """Write an owner's payments or expenses to OUTPUT (.csv or .parquet)."""
+    owner = Owner.query.filter_by(email=owner_email).first()
+    if owner is None:
+        raise click.ClickException('No owner with email %s' % owner_email)
+    batches = export_batches(owner.id, kind, start and start.date(), end and end.date(), property_id)
+    with open(output, 'wb') as fileobj:
+        if output.endswith('.parquet'):
+            write_parquet(fileobj, export_header(kind), batches)
+        else:
+            for chunk in csv_chunks([name for name, _ in export_header(kind)], batches):
+                fileobj.write(chunk)
+    click.echo('Wrote %s.' % output)
+
+@click.command('run-worker')
+@click.option('--async', 'use_async', is_flag=True,
+              help='Send from an event loop over one pooled aiohttp session (needs aiohttp).')
+@click.option('--concurrency', type=int, help='Sends in flight at once.  [default: 8, or 200 with --async]')
+@click.option('--batch-size', type=int, help='Jobs claimed per round.  [default: 100, or 500 with --async]')
+@click.option('--poll-interval', default=2.0, show_default=True, help='Seconds to sleep when idle.')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of polling.')
+@with_appcontext
+def run_worker_command(use_async, concurrency, batch_size, poll_interval, once):
+    """Send queued reminders. Run one per process; they share the queue safely.
+
+    Set NOTIFICATION_WORKERS to the number of processes so that together
+    they stay within NOTIFICATION_RATE_PER_SECOND.
+    """
+    worker_id = '{}-{}-{}'.format(socket.gethostname(), os.getpid(), secrets.token_hex(4))
+    click.echo('Worker {} started.'.format(worker_id))
+    if use_async:
+        asyncio.run(run_worker_async(worker_id, concurrency or 200, batch_size or 500, poll_interval, once))
+        return
+    concurrency, batch_size = concurrency or 8, batch_size or 100
+    while True:
+        if run_jobs(worker_id, concurrency, batch_size):
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+
+COMMANDS = (upgrade_db_command, check_query_plans_command, rebuild_search_index_command,
+            rebuild_stats_command, rebuild_rollups_command, run_rent_ledger_command,
+            rebuild_rent_ledger_command, check_maintenance_sla_command, import_data_command,
+            export_ledger_command, run_worker_command)
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
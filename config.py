@@ -0,0 +1,129 @@
+"""
+Settings for create_app, read from the environment.
+
+Anything passed to create_app(config) is applied on top of these, so tests
+and scripts can build an app against their own database or paths.
+"""
+import os
+import secrets
+import tempfile
+from datetime import timedelta
+
+
+def _database_url(name, default=None):
+    # Hosted Postgres commonly hands out postgres:// URLs, which SQLAlchemy rejects
+    url = os.environ.get(name, default)
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _secret_key(instance_path):
+    # Sessions must survive restarts and be readable by every worker, so the
+    # key is never regenerated: SECRET_KEY from the environment, or one
+    # generated once and kept in the instance folder
+    key = os.environ.get('SECRET_KEY')
+    if key:
+        return key
+    path = os.path.join(instance_path, 'secret_key')
+    if not os.path.exists(path):
+        fd, tmp_path = tempfile.mkstemp(dir=instance_path)
+        with os.fdopen(fd, 'w') as tmp:
+            tmp.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, path)  # atomic; the first worker to start wins
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+    with open(path) as fileobj:
+        return fileobj.read().strip()
+
+
+def load_config(instance_path):
+    config = {}
+    config['SECRET_KEY'] = _secret_key(instance_path)
+    config['SQLALCHEMY_DATABASE_URI'] = _database_url('DATABASE_URL', 'sqlite:///rental_management.db')
+    config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if os.environ.get('DATABASE_REPLICA_URL'):
+        # Read-only views are routed here; see RoutingSession
+        config['SQLALCHEMY_BINDS'] = {'replica': _database_url('DATABASE_REPLICA_URL')}
+
+    # Storage profile: 'default' keeps the stock SQLite settings; 'production'
+    # enables WAL, tuned pragmas and a bounded connection pool for multi-worker use
+    config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'default')
+    config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    config['DB_POOL_OVERFLOW'] = int(os.environ.get('DB_POOL_OVERFLOW', 5))
+    config['SQLITE_PRAGMAS'] = {
+        'journal_mode': 'WAL',          # readers no longer block on writers
+        'synchronous': 'NORMAL',        # fsync at checkpoints only; safe with WAL
+        'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000)),
+        'cache_size': -64000,           # 64 MB page cache per connection
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+    # Sessions: 'sqlite' (default) keeps them server-side in the instance folder,
+    # 'redis' in SESSION_REDIS_URL, 'cookie' in Flask's signed cookie
+    config['SESSION_BACKEND'] = os.environ.get('SESSION_BACKEND', 'sqlite')
+    config['SESSION_SQLITE_PATH'] = os.environ.get(
+        'SESSION_SQLITE_PATH', os.path.join(instance_path, 'sessions.db'))
+    config['SESSION_REDIS_URL'] = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+    config['SESSION_COOKIE_HTTPONLY'] = True
+    config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    config['OWNER_CACHE_TTL'] = int(os.environ.get('OWNER_CACHE_TTL', 60))
+
+    # Rendered pages are cached per owner and data version; set RELEASE per deploy
+    # so browsers revalidate pages rendered by older templates
+    config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    config['RELEASE'] = os.environ.get('RELEASE', '')
+
+    # Outbound notifications: 'log' (default), 'fake' for tests, or 'twilio'
+    config['NOTIFICATION_PROVIDER'] = os.environ.get('NOTIFICATION_PROVIDER', 'log')
+    config['TWILIO_ACCOUNT_SID'] = os.environ.get('TWILIO_ACCOUNT_SID')
+    config['TWILIO_AUTH_TOKEN'] = os.environ.get('TWILIO_AUTH_TOKEN')
+    config['TWILIO_WHATSAPP_FROM'] = os.environ.get('TWILIO_WHATSAPP_FROM')
+    config['TWILIO_API_BASE'] = os.environ.get('TWILIO_API_BASE', 'https://api.twilio.com')
+    # The rate is the provider account's limit. Each `flask run-worker` process
+    # enforces its own token bucket, so set NOTIFICATION_WORKERS to the number
+    # of worker processes and each takes an equal share of the rate
+    config['NOTIFICATION_RATE_PER_SECOND'] = float(os.environ.get('NOTIFICATION_RATE_PER_SECOND', 10))
+    config['NOTIFICATION_WORKERS'] = int(os.environ.get('NOTIFICATION_WORKERS', 1))
+    config['NOTIFICATION_TIMEOUT'] = float(os.environ.get('NOTIFICATION_TIMEOUT', 10))  # seconds per send
+    config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    config['JOB_LOCK_TIMEOUT'] = timedelta(minutes=10)
+
+    # Uploaded documents live in a content-addressed store. Downloads go through
+    # the WSGI server's sendfile, or are handed to the front-end server with
+    # DOCUMENT_X_SENDFILE=1 (Apache/lighttpd) or DOCUMENT_ACCEL_PREFIX (nginx
+    # internal location mapped onto DOCUMENT_ROOT)
+    config['DOCUMENT_ROOT'] = os.environ.get('DOCUMENT_ROOT', os.path.join(instance_path, 'documents'))
+    config['DOCUMENT_MAX_BYTES'] = int(os.environ.get('DOCUMENT_MAX_BYTES', 50 * 1024 * 1024))
+    config['USE_X_SENDFILE'] = os.environ.get('DOCUMENT_X_SENDFILE') == '1'
+    config['DOCUMENT_ACCEL_PREFIX'] = os.environ.get('DOCUMENT_ACCEL_PREFIX')
+
+    # Rejected rows of each bulk import, offered for download as a CSV
+    config['IMPORT_ROOT'] = os.environ.get('IMPORT_ROOT', os.path.join(instance_path, 'imports'))
+
+    # New messages are pushed over SSE/long-polling through this broker: 'local'
+    # (per process) or 'redis', which reaches streams held by other workers
+    config['MESSAGE_BROKER'] = os.environ.get('MESSAGE_BROKER', 'local')
+    config['MESSAGE_BROKER_URL'] = os.environ.get('MESSAGE_BROKER_URL', 'redis://localhost:6379/0')
+    config['MESSAGE_STREAM_HEARTBEAT'] = 15
+
+    # Hours allowed from report to resolution, per maintenance priority
+    config['MAINTENANCE_SLA_HOURS'] = {'urgent': 4, 'high': 24, 'medium': 72, 'low': 168}
+
+    # Rent becomes overdue this many days after the first of the month
+    config['RENT_GRACE_DAYS'] = int(os.environ.get('RENT_GRACE_DAYS', 5))
+
+    # Request instrumentation, off by default: per-request wall, SQL and template
+    # times exported at /metrics, and profiles of a sample of slow requests.
+    # Workers sharing METRICS_DIR report each other's totals; clear it on restart
+    config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION') == '1'
+    config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+    config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.01))
+    config['PROFILE_SLOW_MS'] = int(os.environ.get('PROFILE_SLOW_MS', 500))
+    config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(instance_path, 'profiles'))
+    return config
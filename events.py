@@ -0,0 +1,105 @@
+"""
+Publish/subscribe for pushing new messages to connected clients.
+
+LocalBroker fans events out to subscribers in the same process; with
+several workers a subscriber only hears what its own worker published, so
+the streaming views also catch up from the database on every heartbeat.
+RedisBroker delivers across workers and hosts.
+"""
+import json
+import queue
+import threading
+
+
+class LocalSubscription(object):
+
+    def __init__(self, broker, owner_id, max_pending=100):
+        self.broker = broker
+        self.owner_id = owner_id
+        self.queue = queue.Queue(maxsize=max_pending)
+
+    def get(self, timeout):
+        # Blocks up to `timeout` seconds for the first event, then drains
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker(object):
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, owner_id):
+        subscription = LocalSubscription(self, owner_id)
+        with self._lock:
+            self._subscribers.setdefault(owner_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.owner_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.owner_id]
+
+    def publish(self, owner_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(owner_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                pass  # a stalled client catches up from the database
+
+
+class RedisSubscription(object):
+
+    def __init__(self, client, channel):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout):
+        events = []
+        message = self.pubsub.get_message(timeout=timeout)
+        while message is not None:
+            events.append(json.loads(message['data']))
+            message = self.pubsub.get_message(timeout=0)
+        return events
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker(object):
+
+    def __init__(self, url, prefix='messages:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('The redis message broker needs the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def subscribe(self, owner_id):
+        return RedisSubscription(self.client, self.prefix + str(owner_id))
+
+    def publish(self, owner_id, event):
+        self.client.publish(self.prefix + str(owner_id), json.dumps(event))
+
+
+def build_broker(config):
+    if config.get('MESSAGE_BROKER') == 'redis':
+        return RedisBroker(config['MESSAGE_BROKER_URL'])
+    return LocalBroker()
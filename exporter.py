@@ -0,0 +1,47 @@
+"""
+Chunked writers for ledger exports.
+
+Both writers consume an iterator of row batches (lists of tuples), so an
+export never holds more than one batch in memory.
+"""
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+
+def csv_chunks(header, batches):
+    # Yields encoded CSV text, one chunk per batch, starting with the header
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode('utf-8')
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _arrow_type(pa, sample_type):
+    if sample_type is int:
+        return pa.int64()
+    if sample_type is Decimal:
+        return pa.decimal128(14, 2)
+    if sample_type is date:
+        return pa.date32()
+    return pa.string()
+
+
+def write_parquet(fileobj, columns, batches):
+    # columns are (name, python type) pairs; each batch becomes a row group
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet exports need the pyarrow package')
+    schema = pa.schema([(name, _arrow_type(pa, kind)) for name, kind in columns])
+    with pq.ParquetWriter(fileobj, schema, compression='snappy') as writer:
+        for batch in batches:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
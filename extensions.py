@@ -0,0 +1,24 @@
+"""
+Extension objects shared by the models and blueprints; create_app binds
+them to an application.
+"""
+from flask import g
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+
+
+class RoutingSession(FlaskSQLAlchemySession):
+    # Views marked @read_only run their SELECTs on the replica bind when one
+    # is configured; flushes and DML statements always go to the primary
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and g.get('use_replica') and 'replica' in self._db.engines
+                and not self._flushing and not getattr(clause, 'is_dml', False)):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
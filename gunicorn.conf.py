@@ -0,0 +1,65 @@
+"""
+Production serving profile. gunicorn reads this file from the working
+directory, so from the repository root:
+
+    flask --app app upgrade-db
+    gunicorn
+
+Settings come from the environment (or gunicorn's own command-line flags,
+which take precedence):
+
+    PORT / BIND              address to listen on (default 0.0.0.0:8000)
+    WEB_WORKER_CLASS         gthread (default) or gevent
+    WEB_CONCURRENCY          worker processes (default 2 x cores + 1 for
+                             gthread, one per core for gevent)
+    WEB_THREADS              request threads per gthread worker (default 4)
+    WEB_WORKER_CONNECTIONS   concurrent connections per gevent worker
+
+Use gevent when many message streams (SSE and long-polls) are held open at
+once: a gthread worker spends a thread on each of them. Run with
+DB_PROFILE=production so SQLite is in WAL mode and the connection pool is
+bounded for several processes.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    # Patched before the app is preloaded, so the locks and sockets created
+    # at import time already cooperate with greenlets
+    from gevent import monkey
+    monkey.patch_all()
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+else:
+    workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 1000))
+
+# Import and build the app once in the master; workers fork with it already
+# in memory and share its pages until they write to them
+preload_app = True
+
+# Keep connections from a reverse proxy open between requests, and replace
+# each worker after about a thousand requests so slow leaks and cache growth
+# stay bounded; the jitter keeps workers from restarting all at once
+keepalive = 5
+max_requests = 1000
+max_requests_jitter = 100
+
+# Message streams send a heartbeat every 15 seconds, well inside the timeout
+timeout = 30
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    # Pooled connections opened in the master must not be shared with the
+    # workers; each worker opens its own on first use
+    from extensions import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,186 @@
+"""
+Streaming readers and row validators for bulk imports.
+
+Files are read a row at a time (CSV through the csv module, Excel through
+openpyxl's read-only mode), so memory stays bounded however large the
+upload is. Validators turn a raw record into column values or raise
+ImportRowError; resolving property and tenant references is left to the
+caller, which does it in batches against the database.
+"""
+import csv
+import io
+import os
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+KINDS = ('properties', 'tenants', 'payments', 'expenses')
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def read_records(stream, filename):
+    # Yields (row_number, record) pairs with lower-cased, stripped headers
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        rows = _excel_rows(stream)
+    else:
+        rows = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    header = None
+    for number, row in enumerate(rows, start=1):
+        if header is None:
+            header = [str(cell or '').strip().lower() for cell in row]
+            continue
+        values = ['' if cell is None else cell for cell in row]
+        if not any(str(value).strip() for value in values):
+            continue
+        yield number, dict(zip(header, values))
+
+
+def _excel_rows(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportRowError('Excel imports need the openpyxl package; upload a CSV instead')
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _text(record, name, required=False, max_length=None):
+    value = str(record.get(name) or '').strip()
+    if required and not value:
+        raise ImportRowError('%s is required' % name)
+    if max_length and len(value) > max_length:
+        raise ImportRowError('%s is longer than %d characters' % (name, max_length))
+    return value or None
+
+
+def _number(record, name, kind, required=False):
+    value = record.get(name)
+    if value in (None, ''):
+        if required:
+            raise ImportRowError('%s is required' % name)
+        return None
+    try:
+        return kind(str(value).strip().replace(',', ''))
+    except (ValueError, InvalidOperation):
+        raise ImportRowError('%s is not a valid number: %r' % (name, value))
+
+
+def _date(record, name, required=False):
+    value = record.get(name)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value in (None, ''):
+        if required:
+            raise ImportRowError('%s is required' % name)
+        return None
+    for pattern in ('%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y'):
+        try:
+            return datetime.strptime(str(value).strip(), pattern).date()
+        except ValueError:
+            pass
+    raise ImportRowError('%s is not a date (use YYYY-MM-DD): %r' % (name, value))
+
+
+def _choice(record, name, choices, default=None):
+    value = (_text(record, name) or default or '').lower() or None
+    if value is not None and value not in choices:
+        raise ImportRowError('%s must be one of %s' % (name, ', '.join(choices)))
+    return value
+
+
+def property_ref(record):
+    # A property is referenced by property_id or by its exact name
+    property_id = _number(record, 'property_id', int)
+    name = _text(record, 'property')
+    if property_id is None and name is None:
+        raise ImportRowError('property_id or property is required')
+    return property_id, name
+
+
+def tenant_ref(record):
+    tenant_id = _number(record, 'tenant_id', int)
+    phone = _text(record, 'tenant_phone')
+    return tenant_id, phone
+
+
+def parse_property(record):
+    return {
+        'name': _text(record, 'name', required=True, max_length=200),
+        'address': _text(record, 'address', max_length=500),
+        'property_type': _text(record, 'property_type', max_length=50),
+        'bedrooms': _number(record, 'bedrooms', int),
+        'bathrooms': _number(record, 'bathrooms', int),
+        'area_sqft': _number(record, 'area_sqft', float),
+        'monthly_rent': _number(record, 'monthly_rent', Decimal),
+    }
+
+
+def parse_tenant(record):
+    values = {
+        'name': _text(record, 'name', required=True, max_length=100),
+        'email': _text(record, 'email', max_length=120),
+        'phone': _text(record, 'phone', required=True, max_length=20),
+        'whatsapp_number': _text(record, 'whatsapp_number', max_length=20),
+        'lease_start': _date(record, 'lease_start'),
+        'lease_end': _date(record, 'lease_end'),
+        'security_deposit': _number(record, 'security_deposit', Decimal),
+        'is_active': (_text(record, 'is_active') or 'true').lower() in ('1', 'true', 'yes', 'y'),
+    }
+    if values['lease_start'] and values['lease_end'] and values['lease_end'] < values['lease_start']:
+        raise ImportRowError('lease_end is before lease_start')
+    return values
+
+
+def parse_payment(record):
+    return {
+        'amount': _number(record, 'amount', Decimal, required=True),
+        'payment_date': _date(record, 'payment_date', required=True),
+        'payment_method': _text(record, 'payment_method', max_length=50),
+        'payment_type': _text(record, 'payment_type', max_length=50),
+        'status': _choice(record, 'status', ('pending', 'completed', 'failed'), default='completed'),
+        'notes': _text(record, 'notes'),
+    }
+
+
+def parse_expense(record):
+    return {
+        'category': _text(record, 'category', max_length=100),
+        'description': _text(record, 'description'),
+        'amount': _number(record, 'amount', Decimal, required=True),
+        'expense_date': _date(record, 'expense_date', required=True),
+        'vendor': _text(record, 'vendor', max_length=200),
+        'receipt_url': _text(record, 'receipt_url', max_length=500),
+    }
+
+
+PARSERS = {
+    'properties': parse_property,
+    'tenants': parse_tenant,
+    'payments': parse_payment,
+    'expenses': parse_expense,
+}
+
+
+class ErrorReport(object):
+    # Rejected rows with their original values and the reason, as CSV
+
+    def __init__(self, fileobj):
+        self.writer = csv.writer(fileobj)
+        self.header = None
+        self.count = 0
+
+    def add(self, row_number, record, message):
+        if self.header is None:
+            self.header = list(record)
+            self.writer.writerow(['row', 'error'] + self.header)
+        self.writer.writerow([row_number, message] + [record.get(name, '') for name in self.header])
+        self.count += 1
@@ -0,0 +1,324 @@
+"""
+Opt-in request instrumentation and Prometheus metrics.
+
+For every request this records wall time, time spent in SQL, the number of
+statements, rows fetched and template render time, from Flask's request
+and template signals and SQLAlchemy's cursor events. Rows are counted by a
+DBAPI cursor subclass, installed through the engine's connect_args, as
+SQLAlchemy has no event for fetches.
+
+Each worker process keeps its own registry. With a metrics directory
+configured, workers also write snapshots there and /metrics merges them,
+so a scrape reaching any one worker reports totals for all of them.
+
+A sampled fraction of requests runs under a profiler (pyinstrument when
+installed, cProfile otherwise); profiles of those that turn out slow are
+written to disk.
+"""
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from flask import before_render_template, g, has_app_context, request, request_finished, request_started
+from flask import template_rendered
+from sqlalchemy import event
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# name: (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled.', None),
+    'http_request_duration_seconds': ('histogram', 'Wall time per request.', TIME_BUCKETS),
+    'http_request_sql_seconds': ('histogram', 'Time spent in SQL per request.', TIME_BUCKETS),
+    'http_request_sql_statements': ('histogram', 'SQL statements per request.', COUNT_BUCKETS),
+    'http_request_sql_rows': ('histogram', 'Rows fetched from the database per request.', ROW_BUCKETS),
+    'http_request_template_seconds': ('histogram', 'Template render time per request.', TIME_BUCKETS),
+    'http_slow_requests_total': ('counter', 'Requests slower than the profiling threshold.', None),
+    'http_request_profiles_total': ('counter', 'Slow request profiles written to disk.', None),
+}
+
+
+class MetricsRegistry(object):
+    # Counters and histograms keyed by (name, sorted label pairs)
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # one count per bucket (not cumulative), then sum and count
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(buckets) + 2)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[name, [list(pair) for pair in labels], list(value) if isinstance(value, list) else value]
+                    for (name, labels), value in self._values.items()]
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            if name not in METRICS:
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if isinstance(value, list):
+                current = merged.setdefault(key, [0] * len(value))
+                merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+
+def render_prometheus(merged):
+    # Prometheus text exposition format, version 0.0.4
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s %s' % (name, kind))
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append('%s%s %s' % (name, _labels(labels), value))
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                lines.append('%s_bucket%s %s' % (name, _labels(labels + (('le', bound),)), cumulative))
+            lines.append('%s_bucket%s %s' % (name, _labels(labels + (('le', '+Inf'),)), value[-1]))
+            lines.append('%s_sum%s %s' % (name, _labels(labels), value[-2]))
+            lines.append('%s_count%s %s' % (name, _labels(labels), value[-1]))
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats(object):
+    __slots__ = ('started', 'sql_seconds', 'sql_statements', 'sql_rows', 'template_seconds',
+                 'template_started', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_seconds = 0.0
+        self.sql_statements = 0
+        self.sql_rows = 0
+        self.template_seconds = 0.0
+        self.template_started = None
+        self.profiler = None
+
+
+def _current_stats():
+    if has_app_context():
+        return g.get('request_stats')
+    return None
+
+
+class _RowCountingCursor(object):
+
+    def fetchone(self):
+        row = super().fetchone()
+        stats = _current_stats()
+        if stats is not None and row is not None:
+            stats.sql_rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        stats = _current_stats()
+        if stats is not None:
+            stats.sql_rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        stats = _current_stats()
+        if stats is not None:
+            stats.sql_rows += len(rows)
+        return rows
+
+
+class _SQLiteCursor(_RowCountingCursor, sqlite3.Cursor):
+    pass
+
+
+class _SQLiteConnection(sqlite3.Connection):
+
+    def cursor(self, factory=_SQLiteCursor):
+        return super().cursor(factory)
+
+
+def row_counting_connect_args(backend, driver):
+    # connect_args that make the DBAPI count fetched rows; {} where the
+    # driver offers no cursor hook
+    if backend == 'sqlite' and driver == 'pysqlite':
+        return {'factory': _SQLiteConnection}
+    if backend == 'postgresql' and driver == 'psycopg2':
+        import psycopg2.extensions
+
+        class _Psycopg2Cursor(_RowCountingCursor, psycopg2.extensions.cursor):
+            pass
+        return {'cursor_factory': _Psycopg2Cursor}
+    return {}
+
+
+class _Profiler(object):
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            import cProfile
+            self.profiler, self.extension = cProfile.Profile(), 'prof'
+            self.profiler.enable()
+        else:
+            self.profiler, self.extension = Profiler(async_mode='disabled'), 'html'
+            self.profiler.start()
+
+    def stop(self):
+        if self.extension == 'prof':
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+
+    def dump(self, path):
+        if self.extension == 'prof':
+            self.profiler.dump_stats(path)
+        else:
+            with open(path, 'w') as fileobj:
+                fileobj.write(self.profiler.output_html())
+
+
+class Instrumentation(object):
+
+    def __init__(self, config):
+        self.registry = MetricsRegistry()
+        self.metrics_dir = config.get('METRICS_DIR')
+        self.profile_rate = config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.slow_seconds = config.get('PROFILE_SLOW_MS', 500) / 1000.0
+        self.profile_dir = config.get('PROFILE_DIR')
+        self._flushed = 0.0
+        if self.metrics_dir:
+            os.makedirs(self.metrics_dir, exist_ok=True)
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+    def init_app(self, app):
+        request_started.connect(self._request_started, app, weak=False)
+        request_finished.connect(self._request_finished, app, weak=False)
+        before_render_template.connect(self._template_started, app, weak=False)
+        template_rendered.connect(self._template_rendered, app, weak=False)
+
+    def instrument_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current_stats() is not None:
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats()
+        started = conn.info.get('query_started')
+        if stats is not None and started:
+            stats.sql_seconds += time.perf_counter() - started.pop()
+            stats.sql_statements += 1
+
+    def _template_started(self, sender, template, context, **extra):
+        stats = _current_stats()
+        if stats is not None:
+            stats.template_started = time.perf_counter()
+
+    def _template_rendered(self, sender, template, context, **extra):
+        stats = _current_stats()
+        if stats is not None and stats.template_started is not None:
+            stats.template_seconds += time.perf_counter() - stats.template_started
+            stats.template_started = None
+
+    def _request_started(self, sender, **extra):
+        stats = g.request_stats = RequestStats()
+        if self.profile_dir and self.profile_rate and random.random() < self.profile_rate:
+            try:
+                stats.profiler = _Profiler()
+            except (ValueError, RuntimeError):
+                pass  # another profiler is already active in this process
+
+    def _request_finished(self, sender, response, **extra):
+        # Streamed responses are timed until their headers are ready
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - stats.started
+        if stats.profiler is not None:
+            stats.profiler.stop()
+        endpoint = request.endpoint or 'unmatched'
+        labels = {'endpoint': endpoint}
+        registry = self.registry
+        registry.inc('http_requests_total', dict(labels, method=request.method, status=str(response.status_code)))
+        registry.observe('http_request_duration_seconds', labels, elapsed)
+        registry.observe('http_request_sql_seconds', labels, stats.sql_seconds)
+        registry.observe('http_request_sql_statements', labels, stats.sql_statements)
+        registry.observe('http_request_sql_rows', labels, stats.sql_rows)
+        registry.observe('http_request_template_seconds', labels, stats.template_seconds)
+        if elapsed >= self.slow_seconds:
+            registry.inc('http_slow_requests_total', labels)
+            if stats.profiler is not None:
+                name = '%s-%s-%dms.%s' % (time.strftime('%Y%m%dT%H%M%S'), endpoint, elapsed * 1000,
+                                          stats.profiler.extension)
+                stats.profiler.dump(os.path.join(self.profile_dir, name))
+                registry.inc('http_request_profiles_total', labels)
+        if self.metrics_dir and time.monotonic() - self._flushed >= 1:
+            self._flushed = time.monotonic()
+            self.write_snapshot()
+
+    def _snapshot_path(self, pid):
+        return os.path.join(self.metrics_dir, 'metrics-%d.json' % pid)
+
+    def write_snapshot(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.metrics_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fileobj:
+            json.dump(self.registry.snapshot(), fileobj)
+        os.replace(tmp_path, self._snapshot_path(os.getpid()))
+
+    def render(self):
+        # This worker's live registry plus the other workers' last snapshots
+        snapshots = [self.registry.snapshot()]
+        if self.metrics_dir:
+            own = os.path.basename(self._snapshot_path(os.getpid()))
+            for name in os.listdir(self.metrics_dir):
+                if name.startswith('metrics-') and name.endswith('.json') and name != own:
+                    try:
+                        with open(os.path.join(self.metrics_dir, name)) as fileobj:
+                            snapshots.append(json.load(fileobj))
+                    except (OSError, ValueError):
+                        continue
+        return render_prometheus(merge_snapshots(snapshots))
@@ -0,0 +1,393 @@
+"""
+Database models and indexes.
+"""
+from datetime import datetime
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from extensions import db
+from search import create_statements as search_create_statements, fill_statements as search_fill_statements
+
+class Owner(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200))
+    phone = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    properties = db.relationship('Property', backref='owner', lazy=True)
+
+class OwnerIdentity(UserMixin):
+    # Detached copy of an Owner's identity columns, cached for current_user
+    def __init__(self, owner):
+        self.id = owner.id
+        self.username = owner.username
+        self.email = owner.email
+        self.phone = owner.phone
+        self.created_at = owner.created_at
+    
+class Property(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    address = db.Column(db.String(500))
+    property_type = db.Column(db.String(50))  # apartment, house, commercial
+    bedrooms = db.Column(db.Integer)
+    bathrooms = db.Column(db.Integer)
+    area_sqft = db.Column(db.Float)
+    monthly_rent = db.Column(db.Numeric(12, 2))
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    tenants = db.relationship('Tenant', backref='property', lazy=True)
+    expenses = db.relationship('Expense', backref='property', lazy=True)
+    payments = db.relationship('Payment', backref='property', lazy=True)
+    maintenance_requests = db.relationship('MaintenanceRequest', backref='property', lazy=True)
+
+class Tenant(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120))
+    phone = db.Column(db.String(20), nullable=False)
+    whatsapp_number = db.Column(db.String(20))
+    lease_start = db.Column(db.Date)
+    lease_end = db.Column(db.Date)
+    security_deposit = db.Column(db.Numeric(12, 2))
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))  # copy of property.owner_id
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'phone': self.phone,
+            'whatsapp_number': self.whatsapp_number,
+            'lease_start': self.lease_start.isoformat() if self.lease_start else None,
+            'lease_end': self.lease_end.isoformat() if self.lease_end else None,
+            'security_deposit': self.security_deposit,
+            'property_id': self.property_id,
+            'is_active': self.is_active,
+        }
+
+class Payment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))  # copy of property.owner_id
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    payment_date = db.Column(db.Date, default=datetime.utcnow)
+    payment_method = db.Column(db.String(50))  # cash, bank_transfer, online
+    payment_type = db.Column(db.String(50))  # rent, security_deposit, maintenance
+    status = db.Column(db.String(20), default='completed')  # pending, completed, failed
+    notes = db.Column(db.Text)
+    tenant = db.relationship('Tenant', backref='payments')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'property_id': self.property_id,
+            'tenant_id': self.tenant_id,
+            'amount': self.amount,
+            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
+            'payment_method': self.payment_method,
+            'payment_type': self.payment_type,
+            'status': self.status,
+            'notes': self.notes,
+        }
+
+class Expense(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))  # copy of property.owner_id
+    category = db.Column(db.String(100))  # maintenance, utilities, taxes, insurance
+    description = db.Column(db.Text)
+    amount = db.Column(db.Numeric(12, 2), nullable=False)
+    expense_date = db.Column(db.Date, default=datetime.utcnow)
+    vendor = db.Column(db.String(200))
+    receipt_url = db.Column(db.String(500))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'property_id': self.property_id,
+            'category': self.category,
+            'description': self.description,
+            'amount': self.amount,
+            'expense_date': self.expense_date.isoformat() if self.expense_date else None,
+            'vendor': self.vendor,
+            'receipt_url': self.receipt_url,
+        }
+    
+class MaintenanceRequest(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))  # copy of property.owner_id
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))
+    issue_type = db.Column(db.String(100))  # plumbing, electrical, hvac, other
+    description = db.Column(db.Text)
+    priority = db.Column(db.String(20))  # low, medium, high, urgent
+    priority_rank = db.Column(db.Integer)  # queue order: 0 is urgent
+    status = db.Column(db.String(20), default='open')  # open, in_progress, completed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime)
+    sla_due_at = db.Column(db.DateTime)
+    sla_breached = db.Column(db.Boolean, default=False)  # set by check-maintenance-sla or on resolution
+    tenant = db.relationship('Tenant', backref='maintenance_requests')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'property_id': self.property_id,
+            'tenant_id': self.tenant_id,
+            'issue_type': self.issue_type,
+            'description': self.description,
+            'priority': self.priority,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'sla_due_at': self.sla_due_at.isoformat() if self.sla_due_at else None,
+            'sla_breached': self.sla_breached,
+        }
+
+class Conversation(db.Model):
+    # A thread between two owners, optionally about one property
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)  # "low_owner:high_owner:property"
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    last_message_id = db.Column(db.Integer, db.ForeignKey('message.id', use_alter=True))
+    last_message_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_message = db.relationship('Message', foreign_keys=[last_message_id])
+
+class ConversationMember(db.Model):
+    # Each participant's inbox entry; unread_count is kept as a counter
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
+    other_owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
+    unread_count = db.Column(db.Integer, default=0, nullable=False)
+    last_message_at = db.Column(db.DateTime)
+    conversation = db.relationship('Conversation')
+    other_owner = db.relationship('Owner', foreign_keys=[other_owner_id])
+    __table_args__ = (
+        db.UniqueConstraint('conversation_id', 'owner_id', name='uq_member_conversation_owner'),
+        db.Index('ix_member_inbox', 'owner_id', 'last_message_at', 'conversation_id'),
+    )
+
+    def to_dict(self):
+        last = self.conversation.last_message
+        return {
+            'conversation_id': self.conversation_id,
+            'property_id': self.conversation.property_id,
+            'other_owner': {'id': self.other_owner_id, 'username': self.other_owner.username},
+            'unread_count': self.unread_count,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None,
+            'last_message': last.to_dict() if last else None,
+        }
+
+class Message(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'))
+    sender_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+    receiver_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    message = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    is_read = db.Column(db.Boolean, default=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'conversation_id': self.conversation_id,
+            'sender_id': self.sender_id,
+            'receiver_id': self.receiver_id,
+            'property_id': self.property_id,
+            'message': self.message,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'is_read': self.is_read,
+        }
+
+class DocumentBlob(db.Model):
+    # One row per distinct file content in the document store
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    mimetype = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Document(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'))
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))  # copy of property.owner_id
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))
+    document_type = db.Column(db.String(50))  # lease, insurance, inspection, receipt
+    file_name = db.Column(db.String(200))
+    file_url = db.Column(db.String(500))
+    sha256 = db.Column(db.String(64), db.ForeignKey('document_blob.sha256'))
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    blob = db.relationship('DocumentBlob', lazy='joined')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'property_id': self.property_id,
+            'tenant_id': self.tenant_id,
+            'document_type': self.document_type,
+            'file_name': self.file_name,
+            'file_url': self.file_url,
+            'size': self.blob.size if self.blob else None,
+            'mimetype': self.blob.mimetype if self.blob else None,
+            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
+        }
+
+# Composite indexes matching the owner-scoped listing predicates: child rows
+# are reached through property_id, then filtered or ordered by these columns
+db.Index('ix_tenant_property_active', Tenant.property_id, Tenant.is_active)
+db.Index('ix_payment_property_date', Payment.property_id, Payment.payment_date.desc(), Payment.id.desc())
+db.Index('ix_payment_tenant', Payment.tenant_id)
+db.Index('ix_payment_date', Payment.payment_date)
+db.Index('ix_expense_property_date', Expense.property_id, Expense.expense_date.desc(), Expense.id.desc())
+db.Index('ix_expense_date', Expense.expense_date)
+db.Index('ix_maintenance_property_status', MaintenanceRequest.property_id, MaintenanceRequest.status)
+
+# Owner-scoped reads go straight to the child table through its own owner_id
+db.Index('ix_tenant_owner', Tenant.owner_id, Tenant.id)
+db.Index('ix_tenant_owner_active', Tenant.owner_id, Tenant.is_active)
+db.Index('ix_payment_owner_date', Payment.owner_id, Payment.payment_date.desc(), Payment.id.desc())
+db.Index('ix_expense_owner_date', Expense.owner_id, Expense.expense_date.desc(), Expense.id.desc())
+db.Index('ix_maintenance_owner_status', MaintenanceRequest.owner_id, MaintenanceRequest.status)
+db.Index('ix_maintenance_owner', MaintenanceRequest.owner_id, MaintenanceRequest.id)
+db.Index('ix_maintenance_queue', MaintenanceRequest.owner_id, MaintenanceRequest.status,
+         MaintenanceRequest.priority_rank, MaintenanceRequest.created_at, MaintenanceRequest.id)
+db.Index('ix_document_owner', Document.owner_id, Document.id)
+db.Index('ix_message_conversation', Message.conversation_id, Message.id)
+db.Index('ix_message_receiver', Message.receiver_id, Message.id)
+db.Index('ix_message_unread', Message.conversation_id, Message.receiver_id, Message.is_read)
+db.Index('ix_document_sha256', Document.sha256)
+db.Index('ix_maintenance_sla', MaintenanceRequest.status, MaintenanceRequest.sla_breached,
+         MaintenanceRequest.sla_due_at)
+
+class OwnerStats(db.Model):
+    # Materialized dashboard counters, one row per owner, kept in step with writes
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), primary_key=True)
+    property_count = db.Column(db.Integer, default=0, nullable=False)
+    active_tenant_count = db.Column(db.Integer, default=0, nullable=False)
+    monthly_rent_total = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    payment_count = db.Column(db.Integer, default=0, nullable=False)
+    total_collected = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    open_maintenance_count = db.Column(db.Integer, default=0, nullable=False)
+    sla_breach_count = db.Column(db.Integer, default=0)  # open requests past their SLA
+    unread_message_count = db.Column(db.Integer, default=0)
+    overdue_count = db.Column(db.Integer, default=0)  # refreshed by the rent ledger run
+    overdue_total = db.Column(db.Numeric(14, 2), default=0)
+    data_version = db.Column(db.Integer, default=0)  # bumped by every write to the owner's data
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MonthlyRollup(db.Model):
+    # Per property, per month financial totals, maintained as payments,
+    # expenses and leases are written so reports never rescan the raw rows
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # first day of the month
+    income = db.Column(db.Numeric(14, 2), default=0, nullable=False)  # completed payments
+    rent_collected = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    expenses = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    rent_due = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    occupied = db.Column(db.Boolean, default=False, nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('property_id', 'month', name='uq_rollup_property_month'),
+        db.Index('ix_rollup_owner_month', 'owner_id', 'month'),
+    )
+
+class RentLedger(db.Model):
+    # Expected rent per tenant per month matched against rent payments,
+    # maintained by `flask run-rent-ledger`
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # first day of the billing cycle
+    due_date = db.Column(db.Date, nullable=False)
+    amount_due = db.Column(db.Numeric(12, 2), default=0, nullable=False)
+    amount_paid = db.Column(db.Numeric(12, 2), default=0, nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # due, partial, paid, overdue
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.UniqueConstraint('tenant_id', 'month', name='uq_ledger_tenant_month'),
+        db.Index('ix_ledger_owner_status', 'owner_id', 'status'),
+        db.Index('ix_ledger_status_due_date', 'status', 'due_date'),
+    )
+
+class RentLedgerChange(db.Model):
+    # Tenants whose lease or rent payments changed since the last ledger run
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, nullable=False)
+
+class BackgroundJob(db.Model):
+    # Durable queue of outbound work, drained by `flask run-worker`
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # whatsapp_reminder
+    owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'))
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    result = db.Column(db.String(200))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'result': self.result,
+            'last_error': self.last_error,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class PropertyTransfer(db.Model):
+    # A property offered to another owner; it only moves when that owner
+    # accepts, and the offer is deleted once accepted, declined or withdrawn
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'), unique=True, nullable=False)
+    from_owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
+    to_owner_id = db.Column(db.Integer, db.ForeignKey('owner.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    property = db.relationship('Property', lazy='joined')
+    from_owner = db.relationship('Owner', foreign_keys=[from_owner_id], lazy='joined')
+    to_owner = db.relationship('Owner', foreign_keys=[to_owner_id], lazy='joined')
+    __table_args__ = (
+        db.Index('ix_transfer_from_owner', 'from_owner_id'),
+        db.Index('ix_transfer_to_owner', 'to_owner_id'),
+    )
+
+# Tables that carry a denormalized copy of property.owner_id
+OWNER_SCOPED_MODELS = (Tenant, Payment, Expense, MaintenanceRequest, MonthlyRollup, RentLedger, Document)
+
+# Full-text search; the index and its triggers live outside the models
+SEARCH_DIALECTS = ('sqlite', 'postgresql')
+
+def install_search_index(connection):
+    dialect = connection.dialect.name
+    if dialect not in SEARCH_DIALECTS:
+        return
+    existed = db.inspect(connection).has_table('search_index')
+    for statement in search_create_statements(dialect):
+        connection.exec_driver_sql(statement)
+    if not existed:
+        for statement in search_fill_statements(dialect):
+            connection.exec_driver_sql(statement)
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
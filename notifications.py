@@ -0,0 +1,172 @@
+"""
+Outbound WhatsApp providers, rate limiting and retry policy.
+
+Nothing in this module touches the database: the job worker in services.py
+claims queued reminders and hands each one to a provider's send(), or to
+send_async() when `flask run-worker --async` sends them from an event loop.
+"""
+import asyncio
+import base64
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+log = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    # retryable=False means the provider rejected the message itself
+    # (bad number, bad credentials) and sending it again will not help
+
+    def __init__(self, message, retryable=True):
+        super(ProviderError, self).__init__(message)
+        self.retryable = retryable
+
+
+class LogProvider(object):
+    # Development default: writes the message to the log instead of sending it
+    name = 'log'
+
+    def send(self, to, body):
+        log.info('WhatsApp to %s: %s', to, body)
+        return 'log-%d' % int(time.time() * 1000)
+
+    async def send_async(self, http, to, body):
+        return self.send(to, body)
+
+
+class FakeProvider(object):
+    # In-memory provider for tests; fail_times makes the first N sends fail
+    name = 'fake'
+
+    def __init__(self, fail_times=0, retryable=True):
+        self.sent = []
+        self.fail_times = fail_times
+        self.retryable = retryable
+        self._lock = threading.Lock()
+
+    def send(self, to, body):
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ProviderError('fake failure', retryable=self.retryable)
+            self.sent.append((to, body))
+            return 'fake-%d' % len(self.sent)
+
+    async def send_async(self, http, to, body):
+        return self.send(to, body)
+
+
+class TwilioWhatsAppProvider(object):
+    name = 'twilio'
+    api_url = '%s/2010-04-01/Accounts/%s/Messages.json'
+
+    def __init__(self, account_sid, auth_token, from_number, timeout=10, api_base='https://api.twilio.com'):
+        self.account_sid = account_sid
+        self.from_number = from_number
+        self.timeout = timeout
+        self.url = self.api_url % (api_base.rstrip('/'), account_sid)
+        credentials = ('%s:%s' % (account_sid, auth_token)).encode()
+        self.authorization = 'Basic ' + base64.b64encode(credentials).decode()
+
+    def _form(self, to, body):
+        return {'From': 'whatsapp:' + self.from_number, 'To': 'whatsapp:' + to, 'Body': body}
+
+    def _http_error(self, status):
+        # 429 and 5xx are worth retrying; other 4xx are permanent
+        return ProviderError('Twilio returned HTTP %d' % status, retryable=status == 429 or status >= 500)
+
+    def send(self, to, body):
+        request = urllib.request.Request(self.url, data=urllib.parse.urlencode(self._form(to, body)).encode(),
+                                         headers={'Authorization': self.authorization})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode()).get('sid')
+        except urllib.error.HTTPError as error:
+            raise self._http_error(error.code)
+        except (urllib.error.URLError, OSError) as error:
+            raise ProviderError('Twilio request failed: %s' % error)
+
+    async def send_async(self, http, to, body):
+        # http is the worker's shared session (see http_session), which
+        # bounds the call with its own timeout
+        import aiohttp
+
+        try:
+            async with http.post(self.url, data=self._form(to, body),
+                                 headers={'Authorization': self.authorization}) as response:
+                if response.status >= 400:
+                    raise self._http_error(response.status)
+                return (await response.json(content_type=None)).get('sid')
+        except asyncio.TimeoutError:
+            raise ProviderError('Twilio request timed out')
+        except (aiohttp.ClientError, OSError) as error:
+            raise ProviderError('Twilio request failed: %s' % error)
+
+
+def build_provider(config):
+    name = config.get('NOTIFICATION_PROVIDER', 'log')
+    if name == 'twilio':
+        return TwilioWhatsAppProvider(config['TWILIO_ACCOUNT_SID'], config['TWILIO_AUTH_TOKEN'],
+                                      config['TWILIO_WHATSAPP_FROM'], timeout=config['NOTIFICATION_TIMEOUT'],
+                                      api_base=config['TWILIO_API_BASE'])
+    if name == 'fake':
+        return FakeProvider()
+    return LogProvider()
+
+
+class RateLimiter(object):
+    # Token bucket shared by all sender threads (or coroutines) of one
+    # worker process
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        # Takes a token and returns 0, or returns the seconds until one is due
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self._take()
+        while wait:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self):
+        wait = self._take()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+
+def http_session(limit, timeout):
+    # The async worker's one aiohttp session: its pool holds at most `limit`
+    # connections, reused across sends, and no call outlives `timeout`
+    # seconds. Must be opened on the running event loop.
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError('run-worker --async needs the aiohttp package')
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit),
+                                 timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+def backoff_delay(attempt, base=30, cap=3600):
+    # Exponential backoff with full jitter, in seconds
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
@@ -0,0 +1,143 @@
+"""
+Schema upgrades for existing databases, and the query plan check behind
+`flask check-query-plans`.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from extensions import db
+from models import (ConversationMember, Document, MaintenanceRequest, Message, OWNER_SCOPED_MODELS, OwnerStats,
+                    Property)
+from search import search_statement
+from services import (API_RESOURCES, EXPENSE_PAGE_KEY, INBOX_PAGE_KEY, MAINTENANCE_PRIORITIES,
+                      MAINTENANCE_QUEUE_KEY, PAYMENT_PAGE_KEY, TENANT_PAGE_KEY, THREAD_PAGE_KEY, add_months,
+                      analytics_queries, api_query, encode_cursor, export_query, financial_report_queries,
+                      inbox_query, keyset_query, maintenance_queue_query, new_messages_query,
+                      owner_documents_query, owner_expenses_query, owner_payments_query, owner_stats_query,
+                      owner_tenants_query, recent_payments_query, thread_query)
+
+def _add_missing_columns():
+    # create_all never alters existing tables, so columns added to a model
+    # after its table was created are added here
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                ddl = '%s %s' % (column.name, column.type.compile(conn.dialect))
+                for fk in column.foreign_keys:
+                    ddl += ' REFERENCES %s (%s)' % (fk.column.table.name, fk.column.name)
+                conn.exec_driver_sql('ALTER TABLE %s ADD COLUMN %s' % (table.name, ddl))
+
+def _backfill_owner_ids():
+    with db.engine.begin() as conn:
+        for model in OWNER_SCOPED_MODELS:
+            conn.execute(db.update(model).where(model.owner_id == None).values(
+                owner_id=db.select(Property.owner_id).where(
+                    Property.id == model.property_id).scalar_subquery()))
+
+def _add_hours_sql(column, hours):
+    if db.engine.dialect.name == 'postgresql':
+        return column + timedelta(hours=hours)
+    return db.func.strftime('%Y-%m-%d %H:%M:%f', column, '+{} hours'.format(hours))
+
+def _backfill_maintenance_sla():
+    # Requests created before the workflow existed get a queue rank and a
+    # deadline; breaches among them are flagged by the next SLA check
+    with db.engine.begin() as conn:
+        for rank, priority in enumerate(MAINTENANCE_PRIORITIES):
+            hours = current_app.config['MAINTENANCE_SLA_HOURS'][priority]
+            matches = MaintenanceRequest.priority == priority
+            if priority == 'medium':
+                matches = db.or_(matches, MaintenanceRequest.priority.notin_(MAINTENANCE_PRIORITIES),
+                                 MaintenanceRequest.priority == None)
+            conn.execute(db.update(MaintenanceRequest).where(
+                MaintenanceRequest.priority_rank == None, matches
+            ).values(priority_rank=rank, sla_breached=False,
+                     sla_due_at=_add_hours_sql(MaintenanceRequest.created_at, hours)))
+
+def upgrade_schema():
+    # create_all only creates missing tables; columns and indexes added to
+    # existing tables have to be created explicitly
+    db.create_all()
+    _add_missing_columns()
+    _backfill_owner_ids()
+    _backfill_maintenance_sla()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def view_queries(owner_id):
+    # The statements behind each owner-scoped view, including a second page
+    # of each keyset listing so the seek predicate is checked too
+    def second_page(query, columns, sample, descending=True):
+        return keyset_query(query, columns, encode_cursor(sample), descending=descending)
+
+    def search(autocomplete):
+        sql, params = search_statement(db.engine.dialect.name, owner_id, ['rent'], ['tenant'], autocomplete)
+        return db.text(sql).bindparams(limit=20, **params)
+
+    end = date.today().replace(day=1)
+    start = add_months(end, -11)
+    report_properties, report_months, report_by_property = financial_report_queries(owner_id, start, end)
+    analytics_payments, analytics_expenses = analytics_queries(owner_id, start, end)
+    return {
+        'dashboard.stats_row': db.select(OwnerStats).filter_by(owner_id=owner_id),
+        'dashboard.stats_rebuild': owner_stats_query(owner_id),
+        'dashboard.recent_payments': recent_payments_query(owner_id),
+        'properties': Property.query.filter_by(owner_id=owner_id),
+        'tenants': keyset_query(owner_tenants_query(owner_id), TENANT_PAGE_KEY, descending=False),
+        'tenants.page': second_page(owner_tenants_query(owner_id), TENANT_PAGE_KEY, [1], descending=False),
+        'payments': keyset_query(owner_payments_query(owner_id), PAYMENT_PAGE_KEY),
+        'payments.page': second_page(owner_payments_query(owner_id), PAYMENT_PAGE_KEY, [date.today(), 1]),
+        'expenses': keyset_query(owner_expenses_query(owner_id), EXPENSE_PAGE_KEY),
+        'expenses.page': second_page(owner_expenses_query(owner_id), EXPENSE_PAGE_KEY, [date.today(), 1]),
+        'documents': keyset_query(owner_documents_query(owner_id), (Document.id,)),
+        'messages.inbox': keyset_query(inbox_query(owner_id), INBOX_PAGE_KEY),
+        'messages.inbox.page': second_page(inbox_query(owner_id), INBOX_PAGE_KEY, [datetime.utcnow(), 1]),
+        'messages.thread.page': second_page(thread_query(1), THREAD_PAGE_KEY, [1]),
+        'messages.new': new_messages_query(owner_id, 1),
+        'messages.member': ConversationMember.query.filter_by(conversation_id=1, owner_id=owner_id),
+        'messages.mark_read': db.update(Message).where(
+            Message.conversation_id == 1, Message.receiver_id == owner_id, Message.is_read == False
+        ).values(is_read=True),
+        'maintenance.queue': keyset_query(maintenance_queue_query(owner_id), MAINTENANCE_QUEUE_KEY,
+                                          descending=False),
+        'maintenance.queue.page': second_page(maintenance_queue_query(owner_id), MAINTENANCE_QUEUE_KEY,
+                                              [0, datetime.utcnow(), 1], descending=False),
+        'maintenance.sla_check': db.select(MaintenanceRequest.owner_id).where(
+            MaintenanceRequest.status.in_(('open', 'in_progress')), MaintenanceRequest.sla_breached == False,
+            MaintenanceRequest.sla_due_at < datetime.utcnow()),
+        'api.maintenance': keyset_query(api_query(owner_id, 'maintenance', ['id', 'status'], {}),
+                                        API_RESOURCES['maintenance']['key']),
+        'api.payments.page': keyset_query(api_query(owner_id, 'payments', ['id', 'amount'], {}),
+                                          PAYMENT_PAGE_KEY, encode_cursor([date.today(), 1])),
+        'reports.properties': report_properties,
+        'reports.months': report_months,
+        'reports.by_property': report_by_property,
+        'analytics.payments': analytics_payments,
+        'analytics.expenses': analytics_expenses,
+        'export.payments': export_query(owner_id, 'payments', start, end, 1),
+        'export.expenses': export_query(owner_id, 'expenses'),
+        'search': search(autocomplete=False),
+        'search.autocomplete': search(autocomplete=True),
+    }
+
+def full_scans(statement):
+    compiled = getattr(statement, 'statement', statement).compile(
+        db.engine, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+    with db.engine.connect() as conn:
+        plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+    # 'SEARCH' is an index lookup; any 'SCAN' of a table reads all of it. A
+    # virtual table (the FTS5 index) always shows as a SCAN, and is only read
+    # whole when no constraint was passed to it, e.g. 'INDEX 0:' without M.
+    return [row[-1] for row in plan
+            if row[-1].startswith('SCAN ') and not row[-1].startswith('SCAN CONSTANT ROW')
+            and not (' VIRTUAL TABLE INDEX ' in row[-1] and not row[-1].endswith(':'))]
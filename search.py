@@ -0,0 +1,157 @@
+"""
+Full-text search over an owner's properties, tenants, payments, expenses
+and maintenance requests.
+
+Every searchable record has one entry in the search_index table, kept
+current by triggers on the source tables, so forms, imports and bulk SQL
+updates are all covered. SQLite uses an FTS5 table with prefix indexes for
+autocomplete; PostgreSQL a tsvector column with a GIN index. An entry's id
+is the record id * 8 + the kind's code, so a trigger replaces it with a
+primary key lookup and results map straight back to their records.
+"""
+import re
+
+KIND_BITS = 3
+
+# (kind, code, table, title columns, body columns, phone columns); phone
+# numbers are also indexed as bare digits so "5551234" finds "555-1234"
+SOURCES = (
+    ('property', 1, 'property', ('name',), ('address',), ()),
+    ('tenant', 2, 'tenant', ('name',), ('email', 'phone', 'whatsapp_number'), ('phone', 'whatsapp_number')),
+    ('payment', 3, 'payment', (), ('notes',), ()),
+    ('expense', 4, 'expense', ('vendor',), ('description',), ()),
+    ('maintenance', 5, 'maintenance_request', (), ('description',), ()),
+)
+KINDS = tuple(source[0] for source in SOURCES)
+_KIND_BY_CODE = {source[1]: source[0] for source in SOURCES}
+
+MAX_TERMS = 8
+
+
+def search_terms(text):
+    return re.findall(r'\w+', (text or '').lower())[:MAX_TERMS]
+
+
+def entry_ref(entry_id):
+    # (kind, record id) for a search_index id
+    return _KIND_BY_CODE.get(entry_id & ((1 << KIND_BITS) - 1)), entry_id >> KIND_BITS
+
+
+def _digits(dialect, expression):
+    if dialect == 'postgresql':
+        return "regexp_replace(%s, '[^0-9]', '', 'g')" % expression
+    for char in ' -()+.':
+        expression = "replace(%s, '%s', '')" % (expression, char)
+    return expression
+
+
+def _text(dialect, prefix, columns, phones=()):
+    parts = ["coalesce(%s%s, '')" % (prefix, column) for column in columns]
+    parts += [_digits(dialect, "coalesce(%s%s, '')" % (prefix, column)) for column in phones]
+    return " || ' ' || ".join(parts) if parts else "''"
+
+
+def _entry_values(dialect, source, prefix):
+    kind, code, _, title, body, phones = source
+    values = {
+        'id': '%sid * %d + %d' % (prefix, 1 << KIND_BITS, code),
+        'title': _text(dialect, prefix, title),
+        'body': _text(dialect, prefix, body, phones),
+    }
+    if dialect == 'postgresql':
+        values.update(owner_id='%sowner_id' % prefix, kind="'%s'" % kind,
+                      document="to_tsvector('simple', %s || ' ' || %s)" % (values['title'], values['body']))
+    else:
+        # owner and kind are tokens, so MATCH narrows to them via the index
+        values['scope'] = "'o' || %sowner_id || ' %s'" % (prefix, kind)
+    return values
+
+
+def _insert(dialect, source, prefix, select_from=None):
+    values = _entry_values(dialect, source, prefix)
+    if dialect == 'sqlite':
+        values['rowid'] = values.pop('id')
+    columns = ', '.join(values)
+    if select_from:
+        return 'INSERT INTO search_index (%s) SELECT %s FROM %s' % (columns, ', '.join(values.values()),
+                                                                   select_from)
+    return 'INSERT INTO search_index (%s) VALUES (%s)' % (columns, ', '.join(values.values()))
+
+
+def _delete(dialect, source, prefix):
+    key = 'id' if dialect == 'postgresql' else 'rowid'
+    return 'DELETE FROM search_index WHERE %s = %sid * %d + %d' % (key, prefix, 1 << KIND_BITS, source[1])
+
+
+def create_statements(dialect):
+    # Idempotent DDL for the index table and the triggers on each source
+    if dialect == 'postgresql':
+        statements = [
+            'CREATE TABLE IF NOT EXISTS search_index (id bigint PRIMARY KEY, owner_id integer, '
+            'kind varchar(20) NOT NULL, title text, body text, document tsvector NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING gin (document)',
+            'CREATE INDEX IF NOT EXISTS ix_search_index_owner ON search_index (owner_id, kind)',
+        ]
+        for source in SOURCES:
+            table = source[2]
+            statements += [
+                'CREATE OR REPLACE FUNCTION search_%s_sync() RETURNS trigger AS $$ BEGIN '
+                "IF TG_OP <> 'INSERT' THEN %s; END IF; "
+                "IF TG_OP <> 'DELETE' THEN %s; END IF; "
+                'RETURN NULL; END $$ LANGUAGE plpgsql'
+                % (table, _delete(dialect, source, 'OLD.'), _insert(dialect, source, 'NEW.')),
+                'DROP TRIGGER IF EXISTS search_%s_sync ON %s' % (table, table),
+                'CREATE TRIGGER search_%s_sync AFTER INSERT OR UPDATE OR DELETE ON %s '
+                'FOR EACH ROW EXECUTE FUNCTION search_%s_sync()' % (table, table, table),
+            ]
+        return statements
+
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "scope, title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')",
+    ]
+    for source in SOURCES:
+        table, columns = source[2], source[3] + source[4]
+        statements += [
+            'CREATE TRIGGER IF NOT EXISTS search_%s_insert AFTER INSERT ON %s BEGIN %s; END'
+            % (table, table, _insert(dialect, source, 'new.')),
+            'CREATE TRIGGER IF NOT EXISTS search_%s_update AFTER UPDATE OF %s, owner_id ON %s BEGIN %s; %s; END'
+            % (table, ', '.join(columns), table, _delete(dialect, source, 'old.'),
+               _insert(dialect, source, 'new.')),
+            'CREATE TRIGGER IF NOT EXISTS search_%s_delete AFTER DELETE ON %s BEGIN %s; END'
+            % (table, table, _delete(dialect, source, 'old.')),
+        ]
+    return statements
+
+
+def fill_statements(dialect):
+    # Index every existing record; run against an empty search_index
+    return [_insert(dialect, source, '', select_from=source[2]) for source in SOURCES]
+
+
+def _fts_query(owner_id, terms, kinds):
+    # Every term matches as a prefix, within titles and bodies only
+    query = 'scope : "o%d"' % owner_id
+    if kinds:
+        query += ' AND scope : (%s)' % ' OR '.join('"%s"' % kind for kind in kinds)
+    return query + ''.join(' AND {title body} : "%s"*' % term.replace('"', '""') for term in terms)
+
+
+def search_statement(dialect, owner_id, terms, kinds=None, autocomplete=False):
+    # (sql, params); autocomplete skips ranking and takes the newest matches,
+    # which the index returns without visiting every match
+    if dialect == 'postgresql':
+        sql = ('SELECT id, title, %s FROM search_index, to_tsquery(\'simple\', :query) query '
+               'WHERE owner_id = :owner_id AND document @@ query' %
+               ('body' if autocomplete else
+                "ts_headline('simple', body, query, 'StartSel=\"\", StopSel=\"\", MaxWords=20')"))
+        params = {'query': ' & '.join(term + ':*' for term in terms), 'owner_id': owner_id}
+        if kinds:
+            sql += ' AND kind IN (%s)' % ', '.join(':kind%d' % i for i in range(len(kinds)))
+            params.update(('kind%d' % i, kind) for i, kind in enumerate(kinds))
+        sql += ' ORDER BY id DESC' if autocomplete else ' ORDER BY ts_rank(document, query) DESC'
+        return sql + ' LIMIT :limit', params
+
+    sql = 'SELECT rowid, title, %s FROM search_index WHERE search_index MATCH :query ORDER BY %s LIMIT :limit' % (
+        ('body', 'rowid DESC') if autocomplete else ("snippet(search_index, 2, '', '', '...', 12)", 'rank'))
+    return sql, {'query': _fts_query(owner_id, terms, kinds)}
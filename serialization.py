@@ -0,0 +1,34 @@
+"""
+Compact JSON encoding for API responses.
+
+orjson is used when it is installed; otherwise the standard library encoder
+produces the same output (no whitespace, ISO dates, Decimals as strings).
+"""
+import json
+from datetime import date
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % type(value).__name__)
+
+
+def dumps(obj):
+    # Returns UTF-8 bytes, ready to be used as a response body
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def rows_to_dicts(names, rows):
+    # Rows may carry trailing columns (e.g. a sort key) that zip drops
+    return [dict(zip(names, row)) for row in rows]
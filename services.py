@@ -0,0 +1,1370 @@
+"""
+Domain logic shared by the blueprints, the CLI and the benchmarks: owner
+counters, rollups, the rent ledger, reports, imports and exports, jobs,
+documents, messaging, search and keyset pagination.
+
+Everything here runs inside an application context.
+"""
+import asyncio
+import base64
+import json
+import os
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from flask import Response, abort, current_app, send_file, url_for
+from sqlalchemy.orm import joinedload
+
+from events import build_broker
+from extensions import db
+from importer import PARSERS, ImportRowError, property_ref, tenant_ref
+from models import (BackgroundJob, Conversation, ConversationMember, Document, DocumentBlob, Expense,
+                    MaintenanceRequest, Message, MonthlyRollup, OWNER_SCOPED_MODELS, OwnerStats, Payment,
+                    Property, PropertyTransfer, RentLedger, RentLedgerChange, SEARCH_DIALECTS, Tenant)
+from search import entry_ref, fill_statements as search_fill_statements, search_statement, search_terms
+from serialization import rows_to_dicts
+from storage import INLINE_TYPES, ContentStore, DocumentTooLarge
+
+# Owner stats
+def owner_stats_query(owner_id):
+    # All dashboard counters in a single round trip
+    return db.select(
+        db.select(db.func.count(Property.id)).where(
+            Property.owner_id == owner_id).scalar_subquery(),
+        db.select(db.func.count(Tenant.id)).where(
+            Tenant.owner_id == owner_id, Tenant.is_active == True).scalar_subquery(),
+        db.select(db.func.coalesce(db.func.sum(Property.monthly_rent), 0)).where(
+            Property.owner_id == owner_id).scalar_subquery(),
+        db.select(db.func.count(Payment.id)).where(
+            Payment.owner_id == owner_id, Payment.status == 'completed').scalar_subquery(),
+        db.select(db.func.coalesce(db.func.sum(Payment.amount), 0)).where(
+            Payment.owner_id == owner_id, Payment.status == 'completed').scalar_subquery(),
+        db.select(db.func.count(MaintenanceRequest.id)).where(
+            MaintenanceRequest.owner_id == owner_id,
+            MaintenanceRequest.status != 'completed').scalar_subquery(),
+        db.select(db.func.count(MaintenanceRequest.id)).where(
+            MaintenanceRequest.owner_id == owner_id, MaintenanceRequest.status != 'completed',
+            MaintenanceRequest.sla_breached == True).scalar_subquery(),
+        db.select(db.func.count(Message.id)).where(
+            Message.receiver_id == owner_id, Message.is_read == False).scalar_subquery(),
+        *owner_overdue_subqueries(RentLedger.owner_id == owner_id),
+    )
+
+def owner_overdue_subqueries(owner_filter):
+    overdue = [owner_filter, RentLedger.status == 'overdue']
+    return (
+        db.select(db.func.count(RentLedger.id)).where(*overdue).scalar_subquery(),
+        db.select(db.func.coalesce(db.func.sum(RentLedger.amount_due - RentLedger.amount_paid), 0)).where(
+            *overdue).scalar_subquery(),
+    )
+
+def compute_owner_stats(owner_id):
+    # From the primary, since the result is written back
+    row = db.session.execute(owner_stats_query(owner_id), bind_arguments={'bind': db.engine}).one()
+    return dict(zip(('property_count', 'active_tenant_count', 'monthly_rent_total',
+                     'payment_count', 'total_collected', 'open_maintenance_count',
+                     'sla_breach_count', 'unread_message_count', 'overdue_count', 'overdue_total'), row))
+
+def refresh_owner_stats(owner_id, stats=None):
+    stats = stats or db.session.get(OwnerStats, owner_id)
+    if stats is None:
+        stats = OwnerStats(owner_id=owner_id)
+        db.session.add(stats)
+    for key, value in compute_owner_stats(owner_id).items():
+        setattr(stats, key, value)
+    stats.data_version = (stats.data_version or 0) + 1
+    stats.updated_at = datetime.utcnow()
+    return stats
+
+def adjust_owner_stats(owner_id, **deltas):
+    # Atomic in-place increments so concurrent writers don't lose updates;
+    # call before commit so the counters land in the same transaction. Also
+    # bumps the data version, so call it (without deltas if need be) on any
+    # write that changes what the owner's pages show.
+    values = {getattr(OwnerStats, key): getattr(OwnerStats, key) + delta
+              for key, delta in deltas.items()}
+    values[OwnerStats.data_version] = db.func.coalesce(OwnerStats.data_version, 0) + 1
+    values[OwnerStats.updated_at] = datetime.utcnow()
+    db.session.flush()
+    updated = db.session.query(OwnerStats).filter_by(owner_id=owner_id).update(
+        values, synchronize_session=False)
+    if not updated and not create_owner_stats(owner_id):
+        # No row yet (owner predates the stats table), so one was built from
+        # scratch, which already includes the rows flushed above; unless a
+        # concurrent request created it first, which then gets the deltas
+        db.session.query(OwnerStats).filter_by(owner_id=owner_id).update(values, synchronize_session=False)
+
+def create_owner_stats(owner_id):
+    # Inserts the owner's stats row unless one exists, as a single statement
+    # on the primary so two requests creating it at once don't collide.
+    # Returns whether this call created it.
+    row = dict(compute_owner_stats(owner_id), owner_id=owner_id, data_version=1, updated_at=datetime.utcnow())
+    table = OwnerStats.__table__
+    return db.session.execute(dialect_insert(table).values(row).on_conflict_do_nothing(
+        index_elements=[table.c.owner_id]).returning(table.c.owner_id)).first() is not None
+
+def get_owner_stats(owner_id):
+    stats = db.session.get(OwnerStats, owner_id)
+    if stats is None:
+        # Missing on the replica too when it lags, so it is created (or
+        # found) and read back on the primary
+        create_owner_stats(owner_id)
+        db.session.commit()
+        stats = db.session.get(OwnerStats, owner_id, bind_arguments={'bind': db.engine})
+    return stats
+
+# Maintenance workflow
+MAINTENANCE_PRIORITIES = ('urgent', 'high', 'medium', 'low')  # queue order
+MAINTENANCE_TRANSITIONS = {
+    'open': ('in_progress', 'completed'),
+    'in_progress': ('open', 'completed'),
+    'completed': ('open',),
+}
+MAINTENANCE_QUEUE_KEY = (MaintenanceRequest.priority_rank, MaintenanceRequest.created_at,
+                         MaintenanceRequest.id)
+
+def maintenance_sla_due(priority, created_at):
+    hours = current_app.config['MAINTENANCE_SLA_HOURS']
+    return created_at + timedelta(hours=hours.get(priority, hours['medium']))
+
+def _sla_counted(maintenance_request):
+    return maintenance_request.status != 'completed' and bool(maintenance_request.sla_breached)
+
+def _sla_breached(maintenance_request, now):
+    # Resolved requests are judged by when they were resolved, open ones by now
+    finished = maintenance_request.resolved_at or now
+    return maintenance_request.sla_due_at is not None and finished > maintenance_request.sla_due_at
+
+def new_maintenance_request(property, priority, **fields):
+    now = datetime.utcnow()
+    maintenance_request = MaintenanceRequest(
+        property_id=property.id, owner_id=property.owner_id, priority=priority,
+        priority_rank=MAINTENANCE_PRIORITIES.index(priority), status='open', created_at=now,
+        sla_due_at=maintenance_sla_due(priority, now), sla_breached=False, **fields)
+    db.session.add(maintenance_request)
+    adjust_owner_stats(property.owner_id, open_maintenance_count=1)
+    return maintenance_request
+
+def set_maintenance_status(maintenance_request, status):
+    current = maintenance_request.status or 'open'
+    if status not in MAINTENANCE_TRANSITIONS.get(current, ()):
+        raise ValueError('A {} request cannot be moved to {}'.format(current.replace('_', ' '), status))
+    was_open, was_counted = current != 'completed', _sla_counted(maintenance_request)
+    now = datetime.utcnow()
+    maintenance_request.status = status
+    maintenance_request.resolved_at = now if status == 'completed' else None
+    if status == 'completed':
+        maintenance_request.sla_breached = _sla_breached(maintenance_request, now)
+    is_open, is_counted = status != 'completed', _sla_counted(maintenance_request)
+    deltas = {}
+    if was_open != is_open:
+        deltas['open_maintenance_count'] = 1 if is_open else -1
+    if was_counted != is_counted:
+        deltas['sla_breach_count'] = 1 if is_counted else -1
+    if deltas:
+        adjust_owner_stats(maintenance_request.owner_id, **deltas)
+
+def set_maintenance_priority(maintenance_request, priority):
+    # A new priority moves the request in the queue and re-bases its SLA on
+    # the original report time
+    was_counted = _sla_counted(maintenance_request)
+    maintenance_request.priority = priority
+    maintenance_request.priority_rank = MAINTENANCE_PRIORITIES.index(priority)
+    maintenance_request.sla_due_at = maintenance_sla_due(
+        priority, maintenance_request.created_at or datetime.utcnow())
+    maintenance_request.sla_breached = _sla_breached(maintenance_request, datetime.utcnow())
+    is_counted = _sla_counted(maintenance_request)
+    if was_counted != is_counted:
+        adjust_owner_stats(maintenance_request.owner_id, sla_breach_count=1 if is_counted else -1)
+
+def detect_sla_breaches(now=None):
+    # Incremental: only open requests whose deadline passed since the last
+    # check match, through ix_maintenance_sla
+    now = now or datetime.utcnow()
+    newly_breached = (MaintenanceRequest.status.in_(('open', 'in_progress')),
+                      MaintenanceRequest.sla_breached == False, MaintenanceRequest.sla_due_at < now)
+    counts = db.session.execute(db.select(MaintenanceRequest.owner_id, db.func.count()).where(
+        *newly_breached).group_by(MaintenanceRequest.owner_id)).all()
+    if not counts:
+        return 0
+    db.session.execute(db.update(MaintenanceRequest).where(*newly_breached).values(sla_breached=True))
+    for owner_id, count in counts:
+        adjust_owner_stats(owner_id, sla_breach_count=count)
+    return sum(count for _, count in counts)
+
+# Monthly rollups
+ROLLUP_AMOUNTS = ('income', 'rent_collected', 'expenses')
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def add_months(month, count):
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+def _as_date(value):
+    # Month expressions come back as text on SQLite and timestamps on Postgres
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value.date() if isinstance(value, datetime) else value
+
+def month_start_sql(column):
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.func.date_trunc('month', column), db.Date)
+    return db.func.date(column, 'start of month')
+
+def dialect_insert(table):
+    # INSERT .. ON CONFLICT is spelled the same on both supported backends.
+    # The dialect module is imported here: PostgreSQL's is slow to load and
+    # unused on SQLite deployments
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def add_to_rollups(entries):
+    # entries are (owner_id, property_id, day, column, amount); they are summed
+    # per property-month first and applied as a single executemany upsert
+    totals = {}
+    for owner_id, property_id, day, column, amount in entries:
+        month = month_start(day)
+        row = totals.get((property_id, month))
+        if row is None:
+            row = totals[(property_id, month)] = dict(
+                owner_id=owner_id, property_id=property_id, month=month,
+                **{name: Decimal(0) for name in ROLLUP_AMOUNTS})
+        row[column] += Decimal(amount or 0)
+    if not totals:
+        return
+    table = MonthlyRollup.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.property_id, table.c.month],
+        set_={name: table.c[name] + stmt.excluded[name] for name in ROLLUP_AMOUNTS})
+    db.session.execute(stmt, list(totals.values()))
+
+def mark_occupied(entries):
+    # entries are (owner_id, property_id, month, rent_due)
+    rows = {(property_id, month): dict(owner_id=owner_id, property_id=property_id, month=month,
+                                       rent_due=rent_due or 0, occupied=True)
+            for owner_id, property_id, month, rent_due in entries}
+    if not rows:
+        return
+    table = MonthlyRollup.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.property_id, table.c.month],
+        set_={'occupied': True, 'rent_due': stmt.excluded.rent_due})
+    db.session.execute(stmt, list(rows.values()))
+
+def payment_rollup_entries(payments):
+    for payment in payments:
+        # status is only defaulted on flush, so None means a new completed payment
+        if (payment.status or 'completed') != 'completed':
+            continue
+        yield payment.owner_id, payment.property_id, payment.payment_date, 'income', payment.amount
+        if payment.payment_type == 'rent':
+            yield payment.owner_id, payment.property_id, payment.payment_date, 'rent_collected', payment.amount
+
+def expense_rollup_entries(expenses):
+    for expense in expenses:
+        yield expense.owner_id, expense.property_id, expense.expense_date, 'expenses', expense.amount
+
+def lease_months(lease_start, lease_end, today):
+    # An open-ended lease runs to today's month; the nightly ledger run
+    # extends it from there (see extend_occupancy)
+    if lease_start is None:
+        return
+    month, last = month_start(lease_start), month_start(lease_end or today)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+def occupancy_entries(tenant, monthly_rent, today):
+    # A moved-out tenant always has a lease end; one imported as inactive
+    # without it has no known window, so it marks nothing
+    if tenant.lease_end is None and tenant.is_active is False:
+        return
+    for month in lease_months(tenant.lease_start, tenant.lease_end, today):
+        yield tenant.owner_id, tenant.property_id, month, monthly_rent
+
+def extend_occupancy(month):
+    # Marks the month occupied for every active open-ended lease that has
+    # started by then, as one INSERT .. SELECT
+    rent_due = db.func.coalesce(Property.monthly_rent, 0)
+    leases = db.select(
+        Tenant.owner_id, Tenant.property_id, db.literal(month, db.Date), rent_due, db.true(),
+    ).join(Property, Tenant.property_id == Property.id).where(
+        Tenant.is_active == True, Tenant.lease_end == None, Tenant.lease_start < add_months(month, 1),
+    ).distinct()
+    table = MonthlyRollup.__table__
+    stmt = dialect_insert(table).from_select(['owner_id', 'property_id', 'month', 'rent_due', 'occupied'], leases)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.property_id, table.c.month],
+        set_={'occupied': True, 'rent_due': stmt.excluded.rent_due}))
+
+def reset_occupancy(property_id, since, today):
+    # Clears the property's occupancy from `since` on, then marks it again
+    # from the leases that still cover those months
+    db.session.execute(db.update(MonthlyRollup).where(
+        MonthlyRollup.property_id == property_id, MonthlyRollup.month >= since,
+    ).values(occupied=False, rent_due=0))
+    rent = db.session.scalar(db.select(Property.monthly_rent).where(Property.id == property_id))
+    tenants = db.session.execute(db.select(Tenant).where(Tenant.property_id == property_id)).scalars().all()
+    mark_occupied(entry for tenant in tenants for entry in occupancy_entries(tenant, rent, today)
+                  if entry[2] >= since)
+
+def end_lease(tenant, today):
+    # Moves the tenant out today, or at the lease end if that came first;
+    # the months after it no longer count the tenant as occupying the property
+    end = min(tenant.lease_end, today) if tenant.lease_end else today
+    was_active = tenant.is_active
+    tenant.is_active = False
+    tenant.lease_end = end
+    if was_active:
+        adjust_owner_stats(tenant.owner_id, active_tenant_count=-1)
+    else:
+        adjust_owner_stats(tenant.owner_id)
+    reset_occupancy(tenant.property_id, add_months(month_start(end), 1), today)
+
+def rebuild_rollups(owner_id=None, batch_size=10000, today=None):
+    # Full backfill from the raw tables, grouped in SQL wherever possible
+    today = today or date.today()
+
+    def scoped(model, stmt):
+        return stmt.where(model.owner_id == owner_id) if owner_id else stmt
+
+    db.session.execute(scoped(MonthlyRollup, db.delete(MonthlyRollup)))
+
+    month = month_start_sql(Payment.payment_date)
+    payments = scoped(Payment, db.select(
+        Payment.owner_id, Payment.property_id, month,
+        db.func.sum(Payment.amount),
+        db.func.sum(db.case((Payment.payment_type == 'rent', Payment.amount), else_=0)),
+    ).where(Payment.status == 'completed').group_by(Payment.owner_id, Payment.property_id, month))
+    for chunk in db.session.execute(payments).yield_per(batch_size).partitions():
+        add_to_rollups(entry for owner, prop, day, income, rent in chunk for entry in (
+            (owner, prop, _as_date(day), 'income', income),
+            (owner, prop, _as_date(day), 'rent_collected', rent)))
+
+    month = month_start_sql(Expense.expense_date)
+    expenses = scoped(Expense, db.select(
+        Expense.owner_id, Expense.property_id, month, db.func.sum(Expense.amount),
+    ).group_by(Expense.owner_id, Expense.property_id, month))
+    for chunk in db.session.execute(expenses).yield_per(batch_size).partitions():
+        add_to_rollups((owner, prop, _as_date(day), 'expenses', amount)
+                       for owner, prop, day, amount in chunk)
+
+    leases = scoped(Tenant, db.select(Tenant, Property.monthly_rent).join(Property))
+    for chunk in _chunks(db.session.execute(leases).yield_per(batch_size), batch_size):
+        mark_occupied(entry for tenant, rent in chunk for entry in occupancy_entries(tenant, rent, today))
+
+# Rent ledger
+def rent_due_date(month):
+    return month + timedelta(days=current_app.config['RENT_GRACE_DAYS'])
+
+def ledger_status(amount_due, amount_paid, due_date, today):
+    if amount_paid >= amount_due:
+        return 'paid'
+    if due_date < today:
+        return 'overdue'
+    return 'partial' if amount_paid > 0 else 'due'
+
+def ledger_status_sql(amount_due, amount_paid, due_date, today):
+    # ledger_status for one billing cycle, as a SQL expression
+    late = 'overdue' if due_date < today else None
+    return db.case((amount_paid >= amount_due, 'paid'), (amount_paid > 0, late or 'partial'),
+                   else_=late or 'due')
+
+def mark_rent_ledger_stale(tenant_ids):
+    # Queue tenants for the next ledger run; call in the writing transaction
+    rows = [{'tenant_id': tenant_id} for tenant_id in set(tenant_ids) if tenant_id]
+    if rows:
+        db.session.execute(db.insert(RentLedgerChange), rows)
+
+def recompute_rent_ledger(tenant_ids, today):
+    # Rebuild every entry of these tenants from their lease window and their
+    # completed rent payments, each payment counting toward its own month
+    tenants = db.session.execute(db.select(
+        Tenant.id, Tenant.owner_id, Tenant.property_id, Tenant.lease_start, Tenant.lease_end,
+        Tenant.is_active, Property.monthly_rent,
+    ).join(Property, Tenant.property_id == Property.id).where(Tenant.id.in_(tenant_ids))).all()
+    month = month_start_sql(Payment.payment_date)
+    # Only payments recorded against the tenant's own property count
+    paid = {(tenant_id, _as_date(day)): amount for tenant_id, day, amount in db.session.execute(
+        db.select(Payment.tenant_id, month, db.func.sum(Payment.amount)).join(
+            Tenant, Payment.tenant_id == Tenant.id).where(
+            Payment.tenant_id.in_(tenant_ids), Payment.property_id == Tenant.property_id,
+            Payment.payment_type == 'rent', Payment.status == 'completed').group_by(Payment.tenant_id, month))}
+    # Ended leases get no new cycles, but the entries they already have are kept
+    kept = {}
+    inactive = [tenant.id for tenant in tenants if not tenant.is_active]
+    if inactive:
+        for tenant_id, day in db.session.execute(db.select(RentLedger.tenant_id, RentLedger.month).where(
+                RentLedger.tenant_id.in_(inactive))):
+            kept.setdefault(tenant_id, []).append(day)
+    db.session.execute(db.delete(RentLedger).where(RentLedger.tenant_id.in_(tenant_ids)))
+
+    current, now, rows = month_start(today), datetime.utcnow(), []
+    for tenant in tenants:
+        if tenant.is_active:
+            months = [day for day in lease_months(tenant.lease_start, tenant.lease_end, today) if day <= current]
+        else:
+            months = kept.get(tenant.id, [])
+        amount_due = tenant.monthly_rent or Decimal(0)
+        for day in months:
+            amount_paid = paid.get((tenant.id, day), Decimal(0))
+            due_date = rent_due_date(day)
+            rows.append(dict(owner_id=tenant.owner_id, property_id=tenant.property_id, tenant_id=tenant.id,
+                             month=day, due_date=due_date, amount_due=amount_due, amount_paid=amount_paid,
+                             status=ledger_status(amount_due, amount_paid, due_date, today), updated_at=now))
+    if rows:
+        db.session.execute(db.insert(RentLedger), rows)
+
+def open_rent_cycle(month, today):
+    # One INSERT .. SELECT adds the cycle for every active lease covering the
+    # month; leases that already have the entry are left alone
+    due_date = rent_due_date(month)
+    paid = db.select(db.func.sum(Payment.amount)).where(
+        Payment.tenant_id == Tenant.id, Payment.property_id == Tenant.property_id,
+        Payment.payment_type == 'rent', Payment.status == 'completed',
+        Payment.payment_date >= month, Payment.payment_date < add_months(month, 1))
+    amount_paid = db.func.coalesce(paid.scalar_subquery(), 0)
+    amount_due = db.func.coalesce(Property.monthly_rent, 0)
+    leases = db.select(
+        Tenant.owner_id, Tenant.property_id, Tenant.id, db.literal(month, db.Date),
+        db.literal(due_date, db.Date), amount_due, amount_paid,
+        ledger_status_sql(amount_due, amount_paid, due_date, today),
+        db.literal(datetime.utcnow(), db.DateTime),
+    ).join(Property, Tenant.property_id == Property.id).where(
+        Tenant.is_active == True, Tenant.lease_start < add_months(month, 1),
+        db.or_(Tenant.lease_end == None, Tenant.lease_end >= month))
+    table = RentLedger.__table__
+    columns = ['owner_id', 'property_id', 'tenant_id', 'month', 'due_date', 'amount_due', 'amount_paid',
+               'status', 'updated_at']
+    db.session.execute(dialect_insert(table).from_select(columns, leases).on_conflict_do_nothing(
+        index_elements=[table.c.tenant_id, table.c.month]))
+
+def settle_rent_ledger(today):
+    # Cycles past their grace period become overdue, then every owner's
+    # dashboard counters are refreshed from the ledger
+    db.session.execute(db.update(RentLedger).where(
+        RentLedger.status.in_(('due', 'partial')), RentLedger.due_date < today,
+    ).values(status='overdue', updated_at=datetime.utcnow()))
+    overdue_count, overdue_total = owner_overdue_subqueries(RentLedger.owner_id == OwnerStats.owner_id)
+    db.session.execute(db.update(OwnerStats).values(
+        overdue_count=overdue_count, overdue_total=overdue_total,
+        data_version=db.func.coalesce(OwnerStats.data_version, 0) + 1, updated_at=datetime.utcnow()))
+
+def run_rent_ledger(today=None, batch_size=1000):
+    # Nightly incremental run: only queued tenants are recomputed; every other
+    # lease only gets its new cycle and overdue transition, both set-based
+    today = today or date.today()
+    # The last run's month, read before recomputing moves it forward
+    current = month_start(today)
+    month = db.session.scalar(db.select(db.func.max(RentLedger.month))) or current
+    last_change = db.session.scalar(db.select(db.func.max(RentLedgerChange.id)))
+    changed = []
+    if last_change:
+        changed = db.session.execute(db.select(RentLedgerChange.tenant_id).where(
+            RentLedgerChange.id <= last_change).distinct()).scalars().all()
+        for chunk in _chunks(changed, batch_size):
+            recompute_rent_ledger(chunk, today)
+        db.session.execute(db.delete(RentLedgerChange).where(RentLedgerChange.id <= last_change))
+    # Catch up on every cycle since the last run, in case a night was missed;
+    # open-ended leases get each of those months marked occupied as well
+    while month <= current:
+        open_rent_cycle(month, today)
+        extend_occupancy(month)
+        month = add_months(month, 1)
+    settle_rent_ledger(today)
+    return len(changed)
+
+def rebuild_rent_ledger(owner_id=None, today=None, batch_size=1000):
+    # Full recompute from leases and payments, for first use or repair
+    today = today or date.today()
+    tenants = db.select(Tenant.id).order_by(Tenant.id)
+    if owner_id:
+        tenants = tenants.where(Tenant.owner_id == owner_id)
+    tenant_ids = db.session.execute(tenants).scalars().all()
+    for chunk in _chunks(tenant_ids, batch_size):
+        recompute_rent_ledger(chunk, today)
+    settle_rent_ledger(today)
+    return len(tenant_ids)
+
+# Financial reports
+def _ratio(numerator, denominator):
+    return round(float(numerator) / float(denominator), 4) if denominator else None
+
+def financial_report_queries(owner_id, start, end, property_id=None):
+    # The owner's properties, then the rollups summed by month and by property
+    filters = [MonthlyRollup.owner_id == owner_id, MonthlyRollup.month >= start,
+               MonthlyRollup.month <= end]
+    property_filters = [Property.owner_id == owner_id]
+    if property_id:
+        filters.append(MonthlyRollup.property_id == property_id)
+        property_filters.append(Property.id == property_id)
+    sums = (db.func.sum(MonthlyRollup.income), db.func.sum(MonthlyRollup.expenses),
+            db.func.sum(MonthlyRollup.rent_collected), db.func.sum(MonthlyRollup.rent_due),
+            db.func.sum(db.case((MonthlyRollup.occupied == True, 1), else_=0)))
+    return (db.select(Property.id, Property.name).where(*property_filters),
+            db.select(MonthlyRollup.month, *sums).where(*filters).group_by(MonthlyRollup.month),
+            db.select(MonthlyRollup.property_id, *sums).where(*filters).group_by(MonthlyRollup.property_id))
+
+def financial_report(owner_id, start, end, property_id=None):
+    # Reads only the rollup table (one row per property-month) plus the owner's
+    # property list; the raw payment and expense rows are never touched
+    properties_query, monthly_query, by_property_query = financial_report_queries(
+        owner_id, start, end, property_id)
+
+    def summarize(income, expenses, collected, due, occupied, units):
+        income, expenses = income or Decimal(0), expenses or Decimal(0)
+        return {
+            'income': income,
+            'expenses': expenses,
+            'net_operating_income': income - expenses,
+            'rent_due': due or Decimal(0),
+            'rent_collected': collected or Decimal(0),
+            'collection_rate': _ratio(collected or 0, due),
+            'occupancy': _ratio(occupied or 0, max(units, occupied or 0)),
+        }
+
+    properties = db.session.execute(properties_query).all()
+    units = len(properties)
+
+    months = []
+    monthly = dict((_as_date(row[0]), row[1:]) for row in db.session.execute(monthly_query))
+    month = start
+    while month <= end:
+        months.append(dict(month=month.strftime('%Y-%m'),
+                           **summarize(*monthly.get(month, (None,) * 5), units=units)))
+        month = add_months(month, 1)
+
+    by_property = dict((row[0], row[1:]) for row in db.session.execute(by_property_query))
+    property_rows = [dict(property_id=prop_id, name=name,
+                          **summarize(*by_property.get(prop_id, (None,) * 5), units=len(months)))
+                     for prop_id, name in properties]
+
+    totals = [sum((row[i] or 0 for row in monthly.values()), Decimal(0)) for i in range(5)]
+    return {
+        'start': start.strftime('%Y-%m'),
+        'end': end.strftime('%Y-%m'),
+        'months': months,
+        'properties': property_rows,
+        'totals': summarize(*totals, units=units * len(months)),
+    }
+
+# Vectorized analytics
+ANALYTICS_BATCH = 50000
+PAYMENT_TYPES = ('rent', 'security_deposit', 'maintenance')
+EXPENSE_CATEGORIES = ('maintenance', 'utilities', 'taxes', 'insurance')
+
+def month_index_sql(column):
+    # year * 12 + month - 1, so consecutive months are consecutive integers
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.extract('year', column) * 12 + db.extract('month', column) - 1, db.Integer)
+    return (db.cast(db.func.strftime('%Y', column), db.Integer) * 12
+            + db.cast(db.func.strftime('%m', column), db.Integer) - 1)
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+def _ledger_query(model, amount, day, kind, labels, owner_id, start, end, *conditions,
+                  property_id=None):
+    # Plain numeric tuples: amounts are cast to float in SQL so no per-row
+    # Decimal or ORM object is ever built
+    stmt = db.select(
+        db.cast(amount, db.Float), month_index_sql(day), model.property_id,
+        db.case({label: code for code, label in enumerate(labels)}, value=kind, else_=len(labels)),
+    ).where(model.owner_id == owner_id, day >= start, day < add_months(end, 1), *conditions)
+    if property_id:
+        stmt = stmt.where(model.property_id == property_id)
+    return stmt
+
+def analytics_queries(owner_id, start, end, property_id=None):
+    # Payments and expenses from a year before `start`, so every month has a
+    # YoY baseline
+    history_start = add_months(start, -12)
+    return (_ledger_query(Payment, Payment.amount, Payment.payment_date, Payment.payment_type,
+                          PAYMENT_TYPES, owner_id, history_start, end,
+                          Payment.status == 'completed', property_id=property_id),
+            _ledger_query(Expense, Expense.amount, Expense.expense_date, Expense.category,
+                          EXPENSE_CATEGORIES, owner_id, history_start, end,
+                          property_id=property_id))
+
+def _ledger_columns(stmt):
+    import analytics
+
+    # One streamed query; Core execution on the session's connection skips
+    # ORM row processing
+    result = db.session.connection().execute(stmt.execution_options(stream_results=True))
+    return analytics.to_columns(result.partitions(ANALYTICS_BATCH))
+
+def analytics_report(owner_id, start, end, property_id=None):
+    import analytics
+    from analytics import AMOUNT, MONTH, PROPERTY, KIND
+
+    history_start = add_months(start, -12)
+    payments_query, expenses_query = analytics_queries(owner_id, start, end, property_id)
+    payments = _ledger_columns(payments_query)
+    expenses = _ledger_columns(expenses_query)
+
+    base = _month_index(history_start)
+    size = _month_index(end) - base + 1
+    income = analytics.group_sum(payments[:, MONTH] - base, payments[:, AMOUNT], size)
+    spent = analytics.group_sum(expenses[:, MONTH] - base, expenses[:, AMOUNT], size)
+    noi = income - spent
+    income_avg = analytics.rolling_mean(income, 3)
+    noi_avg = analytics.rolling_mean(noi, 3)
+    income_yoy, income_yoy_pct = analytics.period_delta(income)
+    noi_yoy, noi_yoy_pct = analytics.period_delta(noi)
+
+    shown = slice(12, None)
+    labels = []
+    month = start
+    while month <= end:
+        labels.append(month.strftime('%Y-%m'))
+        month = add_months(month, 1)
+
+    # Breakdowns cover the requested range only, not the YoY history
+    paid = payments[payments[:, MONTH] >= base + 12]
+    spent_rows = expenses[expenses[:, MONTH] >= base + 12]
+    income_ids, income_by_property = analytics.group_by_key(paid[:, PROPERTY], paid[:, AMOUNT])
+    expense_ids, expense_by_property = analytics.group_by_key(spent_rows[:, PROPERTY], spent_rows[:, AMOUNT])
+    by_property = {}
+    for prop_id, amount in zip(income_ids.tolist(), income_by_property.tolist()):
+        by_property.setdefault(prop_id, {'property_id': prop_id, 'income': 0.0, 'expenses': 0.0})['income'] = round(amount, 2)
+    for prop_id, amount in zip(expense_ids.tolist(), expense_by_property.tolist()):
+        by_property.setdefault(prop_id, {'property_id': prop_id, 'income': 0.0, 'expenses': 0.0})['expenses'] = round(amount, 2)
+    for row in by_property.values():
+        row['net_operating_income'] = round(row['income'] - row['expenses'], 2)
+
+    income_by_type = analytics.group_sum(paid[:, KIND], paid[:, AMOUNT], len(PAYMENT_TYPES) + 1)
+    expense_by_category = analytics.group_sum(spent_rows[:, KIND], spent_rows[:, AMOUNT],
+                                              len(EXPENSE_CATEGORIES) + 1)
+    return {
+        'start': start.strftime('%Y-%m'),
+        'end': end.strftime('%Y-%m'),
+        'months': labels,
+        'income': analytics.to_list(income[shown]),
+        'expenses': analytics.to_list(spent[shown]),
+        'net_operating_income': analytics.to_list(noi[shown]),
+        'income_rolling_3m': analytics.to_list(income_avg[shown]),
+        'noi_rolling_3m': analytics.to_list(noi_avg[shown]),
+        'income_yoy_delta': analytics.to_list(income_yoy[shown]),
+        'income_yoy_pct': analytics.to_list(income_yoy_pct[shown], 4),
+        'noi_yoy_delta': analytics.to_list(noi_yoy[shown]),
+        'noi_yoy_pct': analytics.to_list(noi_yoy_pct[shown], 4),
+        'income_by_type': dict(zip(PAYMENT_TYPES + ('other',), analytics.to_list(income_by_type))),
+        'expenses_by_category': dict(zip(EXPENSE_CATEGORIES + ('other',),
+                                         analytics.to_list(expense_by_category))),
+        'properties': sorted(by_property.values(), key=lambda row: row['property_id']),
+    }
+
+# Bulk import
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MODELS = {'properties': Property, 'tenants': Tenant, 'payments': Payment, 'expenses': Expense}
+
+def _resolve_properties(owner_id, refs):
+    ids = {property_id for property_id, name in refs if property_id is not None}
+    names = {name for property_id, name in refs if property_id is None}
+    conditions = []
+    if ids:
+        conditions.append(Property.id.in_(ids))
+    if names:
+        conditions.append(Property.name.in_(names))
+    if not conditions:
+        return {}
+    rows = db.session.execute(db.select(Property.id, Property.name, Property.monthly_rent).where(
+        Property.owner_id == owner_id, db.or_(*conditions))).all()
+    resolved = {}
+    for row in rows:
+        if row.id in ids:
+            resolved[(row.id, None)] = row
+        if row.name in names:
+            # Two properties with the same name can't be told apart by name
+            resolved[(None, row.name)] = None if (None, row.name) in resolved else row
+    return resolved
+
+def _resolve_tenants(owner_id, refs):
+    ids = {tenant_id for tenant_id, phone in refs if tenant_id is not None}
+    phones = {phone for tenant_id, phone in refs if tenant_id is None and phone}
+    conditions = []
+    if ids:
+        conditions.append(Tenant.id.in_(ids))
+    if phones:
+        conditions.append(Tenant.phone.in_(phones))
+    if not conditions:
+        return {}
+    resolved = {}
+    for row in db.session.execute(db.select(Tenant.id, Tenant.phone, Tenant.property_id).where(
+            Tenant.owner_id == owner_id, db.or_(*conditions))):
+        if row.id in ids:
+            resolved[(row.id, None)] = row
+        if row.phone in phones:
+            resolved[(None, row.phone)] = None if (None, row.phone) in resolved else row
+    return resolved
+
+def _apply_import(owner_id, kind, rows, rents, today):
+    # Derived state for a committed batch, using the same incremental paths
+    # as the single-row forms
+    items = [SimpleNamespace(**row) for row in rows]
+    if kind == 'properties':
+        adjust_owner_stats(owner_id, property_count=len(rows),
+                           monthly_rent_total=sum(row['monthly_rent'] or 0 for row in rows))
+    elif kind == 'tenants':
+        adjust_owner_stats(owner_id, active_tenant_count=sum(1 for row in rows if row['is_active']))
+        mark_occupied(entry for item in items
+                      for entry in occupancy_entries(item, rents[item.property_id], today))
+        mark_rent_ledger_stale(row['id'] for row in rows)
+    elif kind == 'payments':
+        completed = [row['amount'] for row in rows if row['status'] == 'completed']
+        adjust_owner_stats(owner_id, payment_count=len(completed), total_collected=sum(completed))
+        add_to_rollups(payment_rollup_entries(items))
+        mark_rent_ledger_stale(row['tenant_id'] for row in rows if row['payment_type'] == 'rent')
+    elif kind == 'expenses':
+        adjust_owner_stats(owner_id)
+        add_to_rollups(expense_rollup_entries(items))
+
+def import_records(owner_id, kind, records, errors, batch_size=IMPORT_BATCH_SIZE, today=None):
+    # Validates, resolves references and inserts one batch per transaction;
+    # rejected rows go to `errors` and never stop the import
+    today = today or date.today()
+    parse, table = PARSERS[kind], IMPORT_MODELS[kind].__table__
+    imported = 0
+    for chunk in _chunks(records, batch_size):
+        parsed = []
+        for number, record in chunk:
+            try:
+                values = parse(record)
+                references = (None if kind == 'properties' else property_ref(record),
+                              tenant_ref(record) if kind == 'payments' else None)
+            except ImportRowError as error:
+                errors.add(number, record, str(error))
+                continue
+            parsed.append((number, record, values, references))
+
+        properties = _resolve_properties(owner_id, [refs[0] for _, _, _, refs in parsed if refs[0]])
+        tenants = _resolve_tenants(owner_id, [refs[1] for _, _, _, refs in parsed if refs[1]])
+        rows, rents = [], {}
+        for number, record, values, (property_key, tenant_key) in parsed:
+            values['owner_id'] = owner_id
+            if property_key:
+                property = properties.get(property_key)
+                if property is None:
+                    errors.add(number, record, 'unknown or ambiguous property')
+                    continue
+                values['property_id'] = property.id
+                rents[property.id] = property.monthly_rent
+            if tenant_key and tenant_key != (None, None):
+                tenant = tenants.get(tenant_key)
+                if tenant is None or tenant.property_id != values['property_id']:
+                    errors.add(number, record, 'unknown or ambiguous tenant for this property')
+                    continue
+                values['tenant_id'] = tenant.id
+            elif kind == 'payments':
+                values['tenant_id'] = None
+            rows.append(values)
+
+        if rows:
+            if kind == 'tenants':
+                # New tenant ids are needed to queue their rent ledger entries
+                ids = db.session.execute(db.insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                                         rows).scalars().all()
+                for row, tenant_id in zip(rows, ids):
+                    row['id'] = tenant_id
+            else:
+                db.session.execute(db.insert(table), rows)
+            _apply_import(owner_id, kind, rows, rents, today)
+        db.session.commit()
+        imported += len(rows)
+    return imported
+
+# Ledger exports
+EXPORT_BATCH = 5000
+EXPORT_KINDS = ('payments', 'expenses')
+
+def _export_columns(kind):
+    if kind == 'payments':
+        return Payment, Payment.payment_date, [
+            ('id', int, Payment.id), ('payment_date', date, Payment.payment_date),
+            ('property_id', int, Payment.property_id), ('property', str, Property.name),
+            ('tenant_id', int, Payment.tenant_id), ('amount', Decimal, Payment.amount),
+            ('payment_method', str, Payment.payment_method), ('payment_type', str, Payment.payment_type),
+            ('status', str, Payment.status), ('notes', str, Payment.notes)]
+    return Expense, Expense.expense_date, [
+        ('id', int, Expense.id), ('expense_date', date, Expense.expense_date),
+        ('property_id', int, Expense.property_id), ('property', str, Property.name),
+        ('category', str, Expense.category), ('description', str, Expense.description),
+        ('amount', Decimal, Expense.amount), ('vendor', str, Expense.vendor),
+        ('receipt_url', str, Expense.receipt_url)]
+
+def export_query(owner_id, kind, start=None, end=None, property_id=None):
+    model, day, columns = _export_columns(kind)
+    stmt = db.select(*[column for _, _, column in columns]).join(
+        Property, model.property_id == Property.id).where(model.owner_id == owner_id)
+    if start:
+        stmt = stmt.where(day >= start)
+    if end:
+        stmt = stmt.where(day <= end)
+    if property_id:
+        stmt = stmt.where(model.property_id == property_id)
+    return stmt.order_by(day, model.id)
+
+def export_batches(owner_id, kind, start=None, end=None, property_id=None):
+    # Rows stream off a server-side cursor (or SQLite's lazy cursor) in
+    # fixed-size batches, so memory stays flat however long the ledger is
+    stmt = export_query(owner_id, kind, start, end, property_id)
+    result = db.session.connection().execute(stmt.execution_options(stream_results=True))
+    for batch in result.partitions(EXPORT_BATCH):
+        yield [tuple(row) for row in batch]
+
+def export_header(kind):
+    return [(name, python_type) for name, python_type, _ in _export_columns(kind)[2]]
+
+# Background jobs
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    # Handlers run on worker threads and must not touch the database
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+ASYNC_JOB_HANDLERS = {}
+
+def async_job_handler(kind):
+    # Coroutine versions used by `flask run-worker --async`; they get the
+    # worker's shared aiohttp session. Kinds without one run on a thread.
+    def register(handler):
+        ASYNC_JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+def notification_provider():
+    # Only `flask run-worker` sends, so web workers never load the providers
+    from notifications import build_provider
+
+    if 'notification_provider' not in current_app.extensions:
+        current_app.extensions['notification_provider'] = build_provider(current_app.config)
+    return current_app.extensions['notification_provider']
+
+def _rate_limiter(name):
+    from notifications import RateLimiter
+
+    # This process's share of the account-wide rate
+    limiters = current_app.extensions.setdefault('rate_limiters', {})
+    if name not in limiters:
+        limiters[name] = RateLimiter(current_app.config['NOTIFICATION_RATE_PER_SECOND']
+                                     / max(1, current_app.config['NOTIFICATION_WORKERS']))
+    return limiters[name]
+
+@job_handler('whatsapp_reminder')
+def send_whatsapp_job(payload):
+    provider = notification_provider()
+    _rate_limiter(provider.name).acquire()
+    return provider.send(payload['to'], payload['message'])
+
+@async_job_handler('whatsapp_reminder')
+async def send_whatsapp_job_async(payload, http):
+    provider = notification_provider()
+    await _rate_limiter(provider.name).acquire_async()
+    return await provider.send_async(http, payload['to'], payload['message'])
+
+def enqueue_jobs(kind, owner_id, jobs):
+    # jobs are (idempotency_key, payload) pairs; a key that was already
+    # enqueued is skipped, so retried requests never send twice. Returns the
+    # number of jobs actually added.
+    now = datetime.utcnow()
+    rows = [dict(kind=kind, owner_id=owner_id, idempotency_key=key, payload=json.dumps(payload),
+                 status='queued', attempts=0, run_after=now, created_at=now)
+            for key, payload in jobs]
+    table = BackgroundJob.__table__
+    # rowcount is unreliable for an executemany; RETURNING yields exactly the
+    # rows that were inserted, and nothing for the skipped conflicts
+    stmt = dialect_insert(table).on_conflict_do_nothing(
+        index_elements=[table.c.idempotency_key]).returning(table.c.id)
+    enqueued = 0
+    for chunk in _chunks(rows, 5000):
+        enqueued += len(db.session.execute(stmt, chunk).all())
+    return enqueued
+
+def claim_jobs(worker_id, limit):
+    # Mark a batch of due jobs as ours. The status check in the UPDATE makes
+    # the claim safe when several worker processes race for the same rows.
+    now = datetime.utcnow()
+    db.session.query(BackgroundJob).filter(
+        BackgroundJob.status == 'running',
+        BackgroundJob.locked_at < now - current_app.config['JOB_LOCK_TIMEOUT']
+    ).update({BackgroundJob.status: 'queued', BackgroundJob.locked_by: None}, synchronize_session=False)
+    due = db.select(BackgroundJob.id).where(
+        BackgroundJob.status == 'queued', BackgroundJob.run_after <= now
+    ).order_by(BackgroundJob.run_after).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        due = due.with_for_update(skip_locked=True)
+    ids = db.session.execute(due).scalars().all()
+    if ids:
+        db.session.query(BackgroundJob).filter(
+            BackgroundJob.id.in_(ids), BackgroundJob.status == 'queued'
+        ).update({BackgroundJob.status: 'running', BackgroundJob.locked_by: worker_id,
+                  BackgroundJob.locked_at: now, BackgroundJob.attempts: BackgroundJob.attempts + 1},
+                 synchronize_session=False)
+    db.session.commit()
+    return BackgroundJob.query.filter_by(locked_by=worker_id, status='running').all()
+
+def _unknown_job(payload):
+    raise LookupError('no handler for this job kind')
+
+def _run_job(app, handler, payload):
+    # Handlers run on pool threads, which don't inherit the caller's app context
+    with app.app_context():
+        return handler(payload)
+
+def _finish_job(job, result=None, error=None):
+    from notifications import backoff_delay
+
+    now = datetime.utcnow()
+    job.locked_by = None
+    if error is not None:
+        job.last_error = '{}: {}'.format(type(error).__name__, error)[:1000]
+        if getattr(error, 'retryable', False) and job.attempts < current_app.config['JOB_MAX_ATTEMPTS']:
+            job.status = 'queued'
+            job.run_after = now + timedelta(seconds=backoff_delay(job.attempts))
+        else:
+            job.status = 'failed'
+            job.finished_at = now
+    else:
+        job.status = 'done'
+        job.result = None if result is None else str(result)[:200]
+        job.finished_at = now
+
+def run_jobs(worker_id, concurrency=8, batch_size=100):
+    jobs = claim_jobs(worker_id, batch_size)
+    if not jobs:
+        return 0
+    app = current_app._get_current_object()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(_run_job, app, JOB_HANDLERS.get(job.kind, _unknown_job),
+                               json.loads(job.payload)): job
+                   for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                _finish_job(futures[future], error=error)
+            else:
+                _finish_job(futures[future], result=result)
+    db.session.commit()
+    return len(jobs)
+
+async def run_jobs_async(worker_id, http, concurrency=200, batch_size=500):
+    # run_jobs on the event loop: up to `concurrency` jobs in flight at once,
+    # sending over the shared session. Claims and commits stay synchronous.
+    jobs = claim_jobs(worker_id, batch_size)
+    if not jobs:
+        return 0
+    app = current_app._get_current_object()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with slots:
+            payload = json.loads(job.payload)
+            if job.kind in ASYNC_JOB_HANDLERS:
+                return await ASYNC_JOB_HANDLERS[job.kind](payload, http)
+            return await asyncio.to_thread(_run_job, app, JOB_HANDLERS.get(job.kind, _unknown_job), payload)
+
+    results = await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+    for job, result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            _finish_job(job, error=result)
+        else:
+            _finish_job(job, result=result)
+    db.session.commit()
+    return len(jobs)
+
+async def run_worker_async(worker_id, concurrency=200, batch_size=500, poll_interval=2.0, once=False):
+    # The loop behind `flask run-worker --async`; the session, and with it
+    # the connection pool, lives as long as the worker
+    from notifications import http_session
+
+    async with http_session(concurrency, current_app.config['NOTIFICATION_TIMEOUT']) as http:
+        while True:
+            if await run_jobs_async(worker_id, http, concurrency, batch_size):
+                continue
+            if once:
+                break
+            await asyncio.sleep(poll_interval)
+
+def overdue_reminder_jobs(owner_id):
+    # Overdue cycles come straight from the rent ledger, one reminder per
+    # tenant and month
+    rows = db.session.execute(db.select(
+        RentLedger.tenant_id, RentLedger.month, RentLedger.amount_due - RentLedger.amount_paid,
+        Tenant.name, Tenant.phone, Tenant.whatsapp_number, Property.name,
+    ).join(Tenant, RentLedger.tenant_id == Tenant.id).join(Property, RentLedger.property_id == Property.id).where(
+        RentLedger.owner_id == owner_id, RentLedger.status == 'overdue', Tenant.is_active == True))
+    for tenant_id, month, outstanding, name, phone, whatsapp, property_name in rows:
+        message = 'Hi {}, your {} rent for {} is overdue; {} is still outstanding.'.format(
+            name, month.strftime('%B %Y'), property_name, outstanding)
+        yield ('overdue:{}:{}'.format(tenant_id, month.strftime('%Y-%m')),
+               {'tenant_id': tenant_id, 'to': whatsapp or phone, 'message': message})
+
+# Documents
+def document_store():
+    if 'document_store' not in current_app.extensions:
+        current_app.extensions['document_store'] = ContentStore(current_app.config['DOCUMENT_ROOT'])
+    return current_app.extensions['document_store']
+
+def store_document(property, stream, file_name, **fields):
+    # Streams the upload into the store; content that is already stored
+    # (say, the same lease for several tenants) only gets a new Document row
+    file_name = os.path.basename(file_name or 'document')[:200]
+    try:
+        sha256, size, mimetype = document_store().save(stream, file_name, current_app.config['DOCUMENT_MAX_BYTES'])
+    except DocumentTooLarge as error:
+        abort(413, str(error))
+    table = DocumentBlob.__table__
+    db.session.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=[table.c.sha256]), [
+        dict(sha256=sha256, size=size, mimetype=mimetype, created_at=datetime.utcnow())])
+    return attach_document(property, sha256, file_name, **fields)
+
+def attach_document(property, sha256, file_name, **fields):
+    # Every document write (uploads, shares, expense receipts) comes through
+    # here, so this is where the owner's cached pages are invalidated
+    document = Document(property_id=property.id, owner_id=property.owner_id, sha256=sha256,
+                        file_name=file_name, **fields)
+    db.session.add(document)
+    db.session.flush()
+    document.file_url = url_for('documents.download_document', document_id=document.id)
+    adjust_owner_stats(property.owner_id)
+    return document
+
+def send_document(sha256, mimetype, download_name):
+    # Range and conditional requests are answered by send_file, which hands
+    # the open file to the server's wsgi.file_wrapper (sendfile where available)
+    path = document_store().path(sha256)
+    inline = mimetype in INLINE_TYPES
+    accel_prefix = current_app.config['DOCUMENT_ACCEL_PREFIX']
+    if accel_prefix:
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + os.path.relpath(
+            path, current_app.config['DOCUMENT_ROOT']).replace(os.sep, '/')
+        response.headers['Content-Disposition'] = "{}; filename*=UTF-8''{}".format(
+            'inline' if inline else 'attachment', urllib.parse.quote(download_name))
+    else:
+        response = send_file(path, mimetype=mimetype, as_attachment=not inline, download_name=download_name,
+                             conditional=True, etag=sha256, max_age=3600)
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.cache_control.private = True
+    return response
+
+@job_handler('document_thumbnail')
+def make_document_thumbnail(payload):
+    return document_store().make_thumbnail(payload['sha256'], payload['mimetype'])
+
+def request_thumbnail(blob):
+    # Thumbnails are made on first request by `flask run-worker`; the job is
+    # keyed by content, so a shared file is only rendered once
+    key = 'thumbnail:' + blob.sha256
+    enqueue_jobs('document_thumbnail', None, [(key, {'sha256': blob.sha256, 'mimetype': blob.mimetype})])
+    job = BackgroundJob.query.filter_by(idempotency_key=key).one()
+    if job.status == 'done':
+        # Rendered before, but the file has since gone missing
+        job.status, job.run_after, job.finished_at = 'queued', datetime.utcnow(), None
+    db.session.commit()
+    return job
+
+# Messaging
+def message_broker():
+    if 'message_broker' not in current_app.extensions:
+        current_app.extensions['message_broker'] = build_broker(current_app.config)
+    return current_app.extensions['message_broker']
+
+def send_message(sender_id, receiver_id, body, property_id=None):
+    # Publish the returned message with publish_message() after committing
+    now = datetime.utcnow()
+    low, high = sorted((sender_id, receiver_id))
+    key = '{}:{}:{}'.format(low, high, property_id or '')
+    conversations = Conversation.__table__
+    db.session.execute(dialect_insert(conversations).on_conflict_do_nothing(
+        index_elements=[conversations.c.key]), [dict(key=key, property_id=property_id, created_at=now)])
+    conversation = Conversation.query.filter_by(key=key).one()
+    members = ConversationMember.__table__
+    db.session.execute(dialect_insert(members).on_conflict_do_nothing(
+        index_elements=[members.c.conversation_id, members.c.owner_id]), [
+        dict(conversation_id=conversation.id, owner_id=sender_id, other_owner_id=receiver_id, unread_count=0),
+        dict(conversation_id=conversation.id, owner_id=receiver_id, other_owner_id=sender_id, unread_count=0)])
+
+    message = Message(conversation_id=conversation.id, sender_id=sender_id, receiver_id=receiver_id,
+                      property_id=property_id, message=body, timestamp=now, is_read=False)
+    db.session.add(message)
+    db.session.flush()
+    conversation.last_message_id, conversation.last_message_at = message.id, now
+    db.session.query(ConversationMember).filter_by(conversation_id=conversation.id).update({
+        ConversationMember.last_message_at: now,
+        ConversationMember.unread_count: ConversationMember.unread_count + db.case(
+            (ConversationMember.owner_id == receiver_id, 1), else_=0),
+    }, synchronize_session=False)
+    adjust_owner_stats(receiver_id, unread_message_count=1)
+    return message
+
+def publish_message(message):
+    message_broker().publish(message.receiver_id, message.to_dict())
+
+def mark_conversation_read(member):
+    if not member.unread_count:
+        return 0
+    read = db.session.query(Message).filter(
+        Message.conversation_id == member.conversation_id, Message.receiver_id == member.owner_id,
+        Message.is_read == False).update({Message.is_read: True}, synchronize_session=False)
+    member.unread_count = 0
+    adjust_owner_stats(member.owner_id, unread_message_count=-read)
+    return read
+
+def new_messages_query(owner_id, after_id, limit=100):
+    # Messages received since the client's last one, off ix_message_receiver
+    return Message.query.filter(Message.receiver_id == owner_id, Message.id > after_id).order_by(
+        Message.id).limit(limit)
+
+def new_messages(owner_id, after_id):
+    return new_messages_query(owner_id, after_id).all()
+
+def unread_message_count(owner_id):
+    return db.session.execute(db.select(OwnerStats.unread_message_count).where(
+        OwnerStats.owner_id == owner_id)).scalar() or 0
+
+# Full-text search
+def rebuild_search_index():
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('DELETE FROM search_index')
+        for statement in search_fill_statements(conn.dialect.name):
+            conn.exec_driver_sql(statement)
+        if conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+def search_records(owner_id, text, kinds=None, limit=20, autocomplete=False):
+    # Every word matches as a prefix; autocomplete waits for two characters
+    terms = search_terms(text)
+    if not terms or (autocomplete and len(terms[-1]) < 2) or db.engine.dialect.name not in SEARCH_DIALECTS:
+        return []
+    sql, params = search_statement(db.engine.dialect.name, owner_id, terms, kinds, autocomplete)
+    params['limit'] = limit
+    results = []
+    for entry_id, title, text in db.session.execute(db.text(sql), params):
+        kind, record_id = entry_ref(entry_id)
+        if autocomplete:
+            results.append({'kind': kind, 'id': record_id, 'label': title or text[:80]})
+        else:
+            results.append({'kind': kind, 'id': record_id, 'title': title, 'snippet': text})
+    return results
+
+# Keyset pagination
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('cursor does not match sort key')
+        return [datetime.fromisoformat(v) if isinstance(c.type, db.DateTime)
+                else date.fromisoformat(v) if isinstance(c.type, db.Date) else c.type.python_type(v)
+                for c, v in zip(columns, values)]
+    except (ValueError, TypeError):
+        abort(400, 'Invalid cursor')
+
+def keyset_query(query, columns, cursor=None, limit=PAGE_SIZE, descending=True):
+    # Seek past the last row of the previous page instead of OFFSET, so every
+    # page is an index range scan no matter how deep the client has paged
+    if cursor:
+        key, after = db.tuple_(*columns), db.tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < after if descending else key > after)
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    return query.limit(limit + 1)
+
+def keyset_page(query, columns, cursor=None, limit=PAGE_SIZE, descending=True):
+    rows = keyset_query(query, columns, cursor, limit, descending).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in columns])
+    return rows, next_cursor
+
+TENANT_PAGE_KEY = (Tenant.id,)
+PAYMENT_PAGE_KEY = (Payment.payment_date, Payment.id)
+EXPENSE_PAGE_KEY = (Expense.expense_date, Expense.id)
+
+# Listing templates print the related property/tenant names for every row,
+# so those many-to-one relationships are joined into the page query
+def owner_tenants_query(owner_id):
+    return Tenant.query.filter(Tenant.owner_id == owner_id).options(
+        joinedload(Tenant.property))
+
+def owner_payments_query(owner_id):
+    return Payment.query.filter(Payment.owner_id == owner_id).options(
+        joinedload(Payment.property), joinedload(Payment.tenant))
+
+def owner_expenses_query(owner_id):
+    return Expense.query.filter(Expense.owner_id == owner_id).options(
+        joinedload(Expense.property))
+
+def recent_payments_query(owner_id, limit=5):
+    return owner_payments_query(owner_id).order_by(Payment.payment_date.desc()).limit(limit)
+
+INBOX_PAGE_KEY = (ConversationMember.last_message_at, ConversationMember.conversation_id)
+THREAD_PAGE_KEY = (Message.id,)
+
+def inbox_query(owner_id):
+    # Reads only the owner's newest inbox entries, however long the history
+    return ConversationMember.query.filter(ConversationMember.owner_id == owner_id).options(
+        joinedload(ConversationMember.other_owner),
+        joinedload(ConversationMember.conversation).joinedload(Conversation.last_message))
+
+def thread_query(conversation_id):
+    return Message.query.filter(Message.conversation_id == conversation_id)
+
+def owner_documents_query(owner_id):
+    return Document.query.filter(Document.owner_id == owner_id)
+
+def maintenance_queue_query(owner_id, status='open'):
+    # Triage order (priority, then oldest first) comes straight off ix_maintenance_queue
+    return MaintenanceRequest.query.filter(
+        MaintenanceRequest.owner_id == owner_id, MaintenanceRequest.status == status
+    ).options(joinedload(MaintenanceRequest.property), joinedload(MaintenanceRequest.tenant))
+
+def maintenance_queue_page(owner_id, status='open', cursor=None, limit=PAGE_SIZE):
+    return keyset_page(maintenance_queue_query(owner_id, status), MAINTENANCE_QUEUE_KEY, cursor, limit,
+                       descending=False)
+
+def inbox_page(owner_id, cursor=None, limit=PAGE_SIZE):
+    return keyset_page(inbox_query(owner_id), INBOX_PAGE_KEY, cursor, limit)
+
+def thread_page(conversation_id, cursor=None, limit=PAGE_SIZE):
+    return keyset_page(thread_query(conversation_id), THREAD_PAGE_KEY, cursor, limit)
+
+def documents_page(owner_id, cursor=None, limit=PAGE_SIZE):
+    return keyset_page(owner_documents_query(owner_id), (Document.id,), cursor, limit)
+
+def tenants_page(owner_id, cursor=None, limit=PAGE_SIZE):
+    return keyset_page(owner_tenants_query(owner_id), TENANT_PAGE_KEY, cursor, limit, descending=False)
+
+def payments_page(owner_id, cursor=None, limit=PAGE_SIZE):
+    return keyset_page(owner_payments_query(owner_id), PAYMENT_PAGE_KEY, cursor, limit)
+
+def expenses_page(owner_id, cursor=None, limit=PAGE_SIZE):
+    return keyset_page(owner_expenses_query(owner_id), EXPENSE_PAGE_KEY, cursor, limit)
+
+# JSON API (v1): each resource lists the fields a client may select, the
+# query parameters it may filter on and its keyset sort key
+def _api_fields(model):
+    # Money is stored as a floating point value by SQLite anyway, so it is
+    # read as a float and sent as a JSON number rather than a Decimal string
+    fields = {}
+    for column in model.__table__.columns:
+        if column.key == 'owner_id':
+            continue
+        field = getattr(model, column.key)
+        fields[column.key] = db.type_coerce(field, db.Float) if isinstance(column.type, db.Numeric) else field
+    return fields
+
+API_RESOURCES = {
+    'properties': dict(model=Property, key=(Property.id,), descending=False,
+                       filters={'property_type': str}),
+    'tenants': dict(model=Tenant, key=TENANT_PAGE_KEY, descending=False,
+                    filters={'property_id': int, 'is_active': bool}),
+    'payments': dict(model=Payment, key=PAYMENT_PAGE_KEY, descending=True, date_field='payment_date',
+                     filters={'property_id': int, 'tenant_id': int, 'status': str, 'payment_type': str}),
+    'expenses': dict(model=Expense, key=EXPENSE_PAGE_KEY, descending=True, date_field='expense_date',
+                     filters={'property_id': int, 'category': str}),
+    'maintenance': dict(model=MaintenanceRequest, key=(MaintenanceRequest.id,), descending=True,
+                        filters={'property_id': int, 'tenant_id': int, 'status': str, 'priority': str}),
+}
+for _resource in API_RESOURCES.values():
+    _resource['fields'] = _api_fields(_resource['model'])
+
+def api_query(owner_id, resource, names, filters):
+    # Selects only the requested columns (plus the sort key, which the cursor
+    # needs); no ORM objects are built
+    spec = API_RESOURCES[resource]
+    model = spec['model']
+    columns = [spec['fields'][name].label(name) for name in names]
+    columns += [column.label('_key{}'.format(index)) for index, column in enumerate(spec['key'])]
+    stmt = db.select(*columns).where(model.owner_id == owner_id)
+    for name, value in filters.items():
+        if name == 'from' and value:
+            stmt = stmt.where(getattr(model, spec['date_field']) >= value)
+        elif name == 'to' and value:
+            stmt = stmt.where(getattr(model, spec['date_field']) <= value)
+        elif name not in ('from', 'to'):
+            stmt = stmt.where(getattr(model, name) == value)
+    return stmt
+
+def api_page(owner_id, resource, names, filters, cursor=None, limit=PAGE_SIZE):
+    spec = API_RESOURCES[resource]
+    stmt = keyset_query(api_query(owner_id, resource, names, filters), spec['key'], cursor, limit,
+                        spec['descending'])
+    rows = db.session.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][len(names):])
+    return rows_to_dicts(names, rows), next_cursor
+
+# Property transfers: an owner offers a property, and it moves with its
+# history only when the recipient accepts
+def offer_property_transfer(property, to_owner_id):
+    # Replaces any earlier offer of the same property
+    transfer = PropertyTransfer.query.filter_by(property_id=property.id).first()
+    if transfer is None:
+        transfer = PropertyTransfer(property_id=property.id, from_owner_id=property.owner_id)
+        db.session.add(transfer)
+    elif transfer.to_owner_id != to_owner_id:
+        adjust_owner_stats(transfer.to_owner_id)
+    transfer.to_owner_id = to_owner_id
+    transfer.created_at = datetime.utcnow()
+    adjust_owner_stats(property.owner_id)
+    adjust_owner_stats(to_owner_id)
+    return transfer
+
+def accept_property_transfer(transfer):
+    property = transfer.property
+    db.session.delete(transfer)
+    transfer_property(property, transfer.to_owner_id)
+
+def cancel_property_transfer(transfer):
+    # Declined by the recipient or withdrawn by the owner
+    db.session.delete(transfer)
+    adjust_owner_stats(transfer.from_owner_id)
+    adjust_owner_stats(transfer.to_owner_id)
+
+def transfer_property(property, new_owner_id):
+    # Move the property and its history to another owner, keeping every
+    # denormalized owner_id and both owners' counters in step
+    old_owner_id = property.owner_id
+    property.owner_id = new_owner_id
+    for model in OWNER_SCOPED_MODELS:
+        db.session.query(model).filter(model.property_id == property.id).update(
+            {model.owner_id: new_owner_id}, synchronize_session=False)
+    db.session.flush()
+    refresh_owner_stats(old_owner_id)
+    refresh_owner_stats(new_owner_id)
@@ -0,0 +1,156 @@
+"""
+Server-side session storage.
+
+The browser only holds a signed, random session id; the session data lives
+in a store. SQLiteSessionStore serves any number of workers on one host,
+RedisSessionStore several hosts. Values are serialized with Flask's tagged
+JSON, the same format its cookie sessions use.
+"""
+import random
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSession(CallbackDict, SessionMixin):
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.previous_sid = None
+
+
+def new_session_id():
+    return secrets.token_urlsafe(32)
+
+
+def regenerate_session(session):
+    # Move the session to a fresh id, e.g. at login, so an id planted
+    # before authentication can't be reused; a no-op for cookie sessions
+    if isinstance(session, ServerSession):
+        session.previous_sid = session.previous_sid or session.sid
+        session.sid = new_session_id()
+        session.modified = True
+
+
+class SQLiteSessionStore(object):
+    # One connection per thread; expired rows are purged now and then on write
+
+    def __init__(self, path, purge_probability=0.01):
+        self.path = path
+        self.purge_probability = purge_probability
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS session ('
+            'sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)')
+        self._connection().execute('CREATE INDEX IF NOT EXISTS ix_session_expires ON session (expires)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def get(self, sid):
+        row = self._connection().execute(
+            'SELECT data FROM session WHERE sid = ? AND expires > ?', (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, data, ttl):
+        now = time.time()
+        conn = self._connection()
+        conn.execute('INSERT INTO session (sid, data, expires) VALUES (?, ?, ?) '
+                     'ON CONFLICT (sid) DO UPDATE SET data = excluded.data, expires = excluded.expires',
+                     (sid, data, now + ttl))
+        if random.random() < self.purge_probability:
+            conn.execute('DELETE FROM session WHERE expires <= ?', (now,))
+
+    def delete(self, sid):
+        self._connection().execute('DELETE FROM session WHERE sid = ?', (sid,))
+
+
+class RedisSessionStore(object):
+
+    def __init__(self, url, prefix='session:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('The redis session backend needs the redis package')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid):
+        data = self.client.get(self.prefix + sid)
+        return data.decode('utf-8') if data is not None else None
+
+    def set(self, sid, data, ttl):
+        self.client.setex(self.prefix + sid, int(ttl), data)
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('utf-8')
+            except BadSignature:
+                sid = None
+            data = self.store.get(sid) if sid else None
+            if data is not None:
+                return ServerSession(self.serializer.loads(data), sid=sid)
+        return ServerSession(sid=new_session_id(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain, path = self.get_cookie_domain(app), self.get_cookie_path(app)
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+        response.vary.add('Cookie')
+        if not session:
+            # Emptied (e.g. at logout): drop the stored copy and the cookie
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not self.should_set_cookie(app, session):
+            return
+        ttl = app.permanent_session_lifetime.total_seconds()
+        self.store.set(session.sid, self.serializer.dumps(dict(session)), ttl)
+        response.set_cookie(
+            name, self._signer(app).sign(session.sid.encode('utf-8')).decode('utf-8'),
+            expires=self.get_expiration_time(app, session), domain=domain, path=path,
+            httponly=self.get_cookie_httponly(app), secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app))
+
+
+def build_session_interface(config):
+    # None keeps Flask's signed-cookie sessions
+    backend = config.get('SESSION_BACKEND', 'sqlite')
+    if backend == 'redis':
+        return ServerSideSessionInterface(RedisSessionStore(config['SESSION_REDIS_URL']))
+    if backend == 'sqlite':
+        return ServerSideSessionInterface(SQLiteSessionStore(config['SESSION_SQLITE_PATH']))
+    return None
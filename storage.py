@@ -0,0 +1,135 @@
+"""
+Content-addressed document store on the local filesystem.
+
+Files are keyed by the SHA-256 of their content, so identical uploads (a
+lease shared by several tenants, a re-sent receipt) are stored once.
+Uploads are streamed to a temporary file in fixed-size chunks while being
+hashed, then moved into place atomically.
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import subprocess
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the formats we can show inline and thumbnail
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+INLINE_TYPES = frozenset(mimetype for _, mimetype in SIGNATURES)
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+class ThumbnailError(Exception):
+    # Raised for formats or environments that can't produce a thumbnail;
+    # trying again will not help
+    retryable = False
+
+
+def sniff_mimetype(head, file_name):
+    # Trust the content for formats served inline; anything else keeps the
+    # type its name suggests and is only ever served as an attachment
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    guessed = mimetypes.guess_type(file_name or '')[0]
+    if guessed in INLINE_TYPES or not guessed:
+        return 'application/octet-stream'
+    return guessed
+
+
+class ContentStore(object):
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256):
+        return os.path.join(self.root, 'blobs', sha256[:2], sha256[2:4], sha256)
+
+    def thumbnail_path(self, sha256):
+        return os.path.join(self.root, 'thumbnails', sha256[:2], sha256 + '.png')
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def save(self, stream, file_name=None, max_bytes=None):
+        # Returns (sha256, size, mimetype); never holds more than one chunk
+        digest, size, head = hashlib.sha256(), 0, b''
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise DocumentTooLarge('Documents are limited to {} bytes'.format(max_bytes))
+                    if len(head) < 16:
+                        head += chunk[:16]
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            sha256 = digest.hexdigest()
+            path = self.path(sha256)
+            if os.path.exists(path):
+                os.unlink(tmp_path)  # already stored
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return sha256, size, sniff_mimetype(head, file_name)
+
+    def make_thumbnail(self, sha256, mimetype, size=320):
+        # Renders a PNG no larger than size x size next to the blob; Pillow
+        # handles images and poppler's pdftoppm the first page of PDFs
+        target = self.thumbnail_path(sha256)
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.png')
+        os.close(fd)
+        try:
+            if mimetype.startswith('image/'):
+                _image_thumbnail(self.path(sha256), tmp_path, size)
+            elif mimetype == 'application/pdf':
+                _pdf_thumbnail(self.path(sha256), tmp_path, size)
+            else:
+                raise ThumbnailError('No thumbnails for {}'.format(mimetype))
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return target
+
+
+def _image_thumbnail(source, target, size):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ThumbnailError('Image thumbnails need the Pillow package')
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        image.save(target, 'PNG')
+
+
+def _pdf_thumbnail(source, target, size):
+    if shutil.which('pdftoppm') is None:
+        raise ThumbnailError('PDF thumbnails need pdftoppm from poppler-utils')
+    prefix = target[:-len('.png')]
+    subprocess.run(['pdftoppm', '-png', '-singlefile', '-f', '1', '-l', '1', '-scale-to', str(size),
+                    source, prefix], check=True, timeout=60, capture_output=True)
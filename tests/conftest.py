@@ -0,0 +1,111 @@
+"""
+Shared fixtures. Every test gets its own app with its database, sessions,
+documents and import reports under pytest's tmp_path, so nothing is written
+into the repository.
+"""
+import os
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import date
+
+import pytest
+from flask.testing import FlaskClient
+
+os.environ.setdefault('SECRET_KEY', 'test')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from extensions import db
+from models import Owner, Property, Tenant
+
+PASSWORD = 'password'
+_PASSWORD_HASH = generate_password_hash(PASSWORD)
+
+
+class Client(FlaskClient):
+    # The app fixture keeps an app context pushed so tests can use db.session,
+    # and Flask would reuse it for every request: g (with Flask-Login's user)
+    # and the session would carry over from one request to the next. Each
+    # request gets a fresh app context instead, as it does when served.
+    def open(self, *args, **kwargs):
+        with self.application.app_context():
+            return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def app_config():
+    # Extra settings for the app fixture; a test module overrides this
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    app = create_app(dict({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'SESSION_SQLITE_PATH': str(tmp_path / 'sessions.db'),
+        'DOCUMENT_ROOT': str(tmp_path / 'documents'),
+        'IMPORT_ROOT': str(tmp_path / 'imports'),
+        'NOTIFICATION_PROVIDER': 'fake',
+    }, **app_config))
+    app.test_client_class = Client
+    with app.app_context():
+        # Only the primary's tables: Flask-SQLAlchemy remembers the replica
+        # bind of an earlier test's app for the rest of the process
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def replica_config(tmp_path):
+    # For app_config in modules that test read-replica routing
+    return {'SQLALCHEMY_BINDS': {'replica': 'sqlite:///' + str(tmp_path / 'replica.db')}}
+
+
+@pytest.fixture
+def sync_replica(app, tmp_path):
+    # sync_replica(): commit and copy the primary database to the replica,
+    # which then lags behind the primary until the next call
+    def sync_replica():
+        db.session.commit()
+        with closing(sqlite3.connect(str(tmp_path / 'test.db'))) as primary, \
+                closing(sqlite3.connect(str(tmp_path / 'replica.db'))) as replica:
+            primary.backup(replica)
+    return sync_replica
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_owner(app):
+    # add_owner(email, units=1): an owner with `units` properties, each let
+    # to one active tenant
+    def add_owner(email, units=1):
+        owner = Owner(username=email.split('@')[0], email=email, password_hash=_PASSWORD_HASH, phone='5550000')
+        db.session.add(owner)
+        db.session.flush()
+        for n in range(units):
+            property = Property(name='%s unit %d' % (owner.username, n), address='%d Main St' % n,
+                                owner_id=owner.id, monthly_rent=1000)
+            db.session.add(property)
+            db.session.flush()
+            db.session.add(Tenant(name='Tenant %d' % n, phone='555%04d' % n, property_id=property.id,
+                                  owner_id=owner.id, lease_start=date(2025, 1, 1)))
+        db.session.commit()
+        return owner
+    return add_owner
+
+
+@pytest.fixture
+def login(client):
+    def login(email):
+        response = client.post('/login', data={'email': email, 'password': PASSWORD})
+        assert response.status_code == 302
+    return login
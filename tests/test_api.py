@@ -0,0 +1,86 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from extensions import db
+from models import Payment, Tenant
+from serialization import dumps
+
+
+@pytest.fixture
+def payments(client, add_owner, login):
+    # Three payments for a@ on two properties, one for b@
+    owner_a = add_owner('a@example.com', units=2)
+    owner_b = add_owner('b@example.com')
+    tenants = Tenant.query.filter_by(owner_id=owner_a.id).order_by(Tenant.id).all()
+    tenant_b = Tenant.query.filter_by(owner_id=owner_b.id).one()
+    for tenant, day, amount in ((tenants[0], date(2025, 1, 3), 1000), (tenants[0], date(2025, 2, 3), 1000),
+                                (tenants[1], date(2025, 2, 5), 750), (tenant_b, date(2025, 2, 4), 900)):
+        db.session.add(Payment(property_id=tenant.property_id, owner_id=tenant.owner_id, tenant_id=tenant.id,
+                               amount=amount, payment_date=day, payment_type='rent', status='completed'))
+    db.session.commit()
+    login('a@example.com')
+    return tenants
+
+
+def items(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.data
+    return response.get_json()
+
+
+def test_selected_fields_only(client, payments):
+    page = items(client, '/api/v1/payments?fields=id,amount,payment_date')
+
+    assert [set(item) for item in page['items']] == [{'id', 'amount', 'payment_date'}] * 3
+    assert [item['payment_date'] for item in page['items']] == ['2025-02-05', '2025-02-03', '2025-01-03']
+    assert page['items'][0]['amount'] == 750
+
+
+def test_all_fields_leave_out_the_owner(client, payments):
+    item = items(client, '/api/v1/payments')['items'][0]
+
+    assert 'owner_id' not in item
+    assert {'id', 'amount', 'tenant_id', 'property_id', 'status'} <= set(item)
+
+
+def test_filters(client, payments):
+    by_property = items(client, '/api/v1/payments?fields=id&property_id=%d' % payments[1].property_id)
+    by_date = items(client, '/api/v1/payments?fields=payment_date&from=2025-02-01&to=2025-02-04')
+
+    assert len(by_property['items']) == 1
+    assert by_date['items'] == [{'payment_date': '2025-02-03'}]
+    assert len(items(client, '/api/v1/tenants?is_active=true')['items']) == 2
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/api/v1/payments?fields=id,password', 400),
+    ('/api/v1/tenants?is_active=maybe', 400),
+    ('/api/v1/payments?property_id=one', 400),
+    ('/api/v1/payments?from=02/01/2025', 400),
+    ('/api/v1/owners', 404),
+])
+def test_bad_requests(client, payments, url, status):
+    assert client.get(url).status_code == status
+
+
+def test_cursor_walks_every_row_once(client, payments):
+    seen, url = [], '/api/v1/payments?fields=id&limit=1'
+    while True:
+        page = items(client, url)
+        seen += [item['id'] for item in page['items']]
+        if not page['next_cursor']:
+            break
+        url = '/api/v1/payments?fields=id&limit=1&cursor=' + page['next_cursor']
+
+    owned = Payment.query.filter(Payment.tenant_id.in_([tenant.id for tenant in payments])).all()
+    assert sorted(seen) == sorted(payment.id for payment in owned)
+
+
+def test_dumps_is_compact():
+    body = dumps({'amount': Decimal('12.50'), 'day': date(2025, 3, 1), 'ids': [1, 2]})
+
+    assert body == b'{"amount":"12.50","day":"2025-03-01","ids":[1,2]}'
+    assert json.loads(body)['day'] == '2025-03-01'
@@ -0,0 +1,65 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from extensions import db
+from fake_twilio import FakeTwilio
+from models import BackgroundJob
+from services import enqueue_jobs, run_worker_async
+
+pytest.importorskip('aiohttp')
+
+
+@pytest.fixture
+def twilio(app):
+    # The Twilio provider pointed at a local fake API that answers after
+    # `latency` seconds; sends are never held back by the rate limit
+    with contextlib.ExitStack() as servers:
+        def twilio(latency, timeout=5):
+            server = servers.enter_context(FakeTwilio(latency))
+            app.config.update(NOTIFICATION_PROVIDER='twilio', TWILIO_ACCOUNT_SID='ACtest',
+                              TWILIO_AUTH_TOKEN='token', TWILIO_WHATSAPP_FROM='+15550000000',
+                              TWILIO_API_BASE=server.url, NOTIFICATION_TIMEOUT=timeout,
+                              NOTIFICATION_RATE_PER_SECOND=1000000)
+            return server
+        yield twilio
+
+
+def enqueue(count):
+    enqueue_jobs('whatsapp_reminder', None, [
+        ('reminder:%d' % n, {'to': '+1555%07d' % n, 'message': 'Rent is due'}) for n in range(count)])
+    db.session.commit()
+
+
+def drain(concurrency=10):
+    asyncio.run(run_worker_async('worker-1', concurrency, 100, once=True))
+
+
+def test_sends_reminders(twilio):
+    server = twilio(latency=0)
+    enqueue(5)
+    drain()
+    jobs = BackgroundJob.query.all()
+    assert [job.status for job in jobs] == ['done'] * 5
+    assert {job.result for job in jobs} == {'SM%d' % n for n in range(1, 6)}
+    assert server.requests == 5
+
+
+def test_timeout_is_retried(twilio):
+    twilio(latency=2, timeout=0.2)
+    enqueue(1)
+    drain()
+    job = BackgroundJob.query.one()
+    assert job.status == 'queued'
+    assert job.attempts == 1
+    assert job.last_error == 'ProviderError: Twilio request timed out'
+
+
+def test_concurrency_is_capped(twilio):
+    server = twilio(latency=0.1)
+    enqueue(20)
+    drain(concurrency=4)
+    assert BackgroundJob.query.filter_by(status='done').count() == 20
+    assert server.max_in_flight == 4
+    assert server.connections <= 4
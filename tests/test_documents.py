@@ -0,0 +1,53 @@
+import io
+from datetime import date
+
+from extensions import db
+from models import Document, Expense, Property
+from services import refresh_owner_stats
+
+
+def expenses_etag(client):
+    # A page with flashed messages pending is rendered without the cache,
+    # so those are shown first
+    client.get('/expenses')
+    return client.get('/expenses').headers['ETag']
+
+
+def test_receipt_upload_refreshes_cached_expenses_page(client, add_owner, login):
+    owner = add_owner('a@example.com')
+    property = Property.query.filter_by(owner_id=owner.id).one()
+    expense = Expense(property_id=property.id, owner_id=owner.id, category='utilities', amount=80,
+                      expense_date=date(2025, 3, 1))
+    db.session.add(expense)
+    refresh_owner_stats(owner.id)
+    db.session.commit()
+    login('a@example.com')
+    before = expenses_etag(client)
+    assert client.get('/expenses', headers={'If-None-Match': before}).status_code == 304
+
+    response = client.post('/expenses/%d/receipt' % expense.id, content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(b'%PDF-1.4 receipt'), 'receipt.pdf')})
+    assert response.status_code == 302
+
+    client.get('/expenses')
+    after = client.get('/expenses', headers={'If-None-Match': before})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before
+    receipt = Document.query.filter_by(document_type='receipt').one()
+    assert receipt.file_url.encode() in after.data
+
+
+def test_sharing_a_document_bumps_the_data_version(client, add_owner, login):
+    owner = add_owner('a@example.com')
+    property = Property.query.filter_by(owner_id=owner.id).one()
+    tenant_id = property.tenants[0].id
+    login('a@example.com')
+    client.post('/add_document', content_type='multipart/form-data', data={
+        'property_id': property.id, 'document_type': 'lease', 'file': (io.BytesIO(b'lease'), 'lease.txt')})
+    document = Document.query.one()
+    before = expenses_etag(client)
+
+    client.post('/documents/%d/share' % document.id, data={'tenant_id': [tenant_id]})
+
+    assert Document.query.count() == 2
+    assert expenses_etag(client) != before
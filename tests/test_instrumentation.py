@@ -0,0 +1,81 @@
+import json
+import os
+import re
+
+import pytest
+
+from instrumentation import MetricsRegistry, merge_snapshots, render_prometheus
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'INSTRUMENTATION': True, 'METRICS_DIR': str(tmp_path / 'metrics'), 'METRICS_TOKEN': None,
+            'PROFILE_DIR': str(tmp_path / 'profiles'), 'PROFILE_SAMPLE_RATE': 1.0, 'PROFILE_SLOW_MS': 0}
+
+
+def sample(metrics, name, **labels):
+    pattern = r'^%s\{%s\} (\S+)$' % (re.escape(name), ','.join(
+        '%s="%s"' % (key, re.escape(str(value))) for key, value in sorted(labels.items())))
+    match = re.search(pattern, metrics, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_requests_are_measured(client, add_owner, login):
+    add_owner('a@example.com', units=3)
+    login('a@example.com')
+    client.get('/tenants')
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+
+    assert sample(metrics, 'http_requests_total', endpoint='tenants.tenants', method='GET', status='200') == 1
+    assert sample(metrics, 'http_request_sql_statements_count', endpoint='tenants.tenants') == 1
+    assert sample(metrics, 'http_request_sql_statements_sum', endpoint='tenants.tenants') >= 1
+    assert sample(metrics, 'http_request_sql_rows_sum', endpoint='tenants.tenants') >= 3
+    assert sample(metrics, 'http_request_template_seconds_sum', endpoint='tenants.tenants') > 0
+
+
+def test_slow_requests_are_profiled(app, client):
+    client.get('/')
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+
+    assert sample(metrics, 'http_request_profiles_total', endpoint='dashboard.index') == 1
+    assert os.listdir(app.config['PROFILE_DIR'])
+
+
+def test_metrics_token(app, client):
+    app.config['METRICS_TOKEN'] = 'secret'
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+
+def test_other_workers_snapshots_are_merged(app, client):
+    other = MetricsRegistry()
+    other.inc('http_requests_total', {'endpoint': 'dashboard.index', 'method': 'GET', 'status': '200'}, 4)
+    with open('%s/metrics-1.json' % app.config['METRICS_DIR'], 'w') as fileobj:
+        json.dump(other.snapshot(), fileobj)
+    client.get('/')
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+
+    assert sample(metrics, 'http_requests_total', endpoint='dashboard.index', method='GET', status='200') == 5
+
+
+@pytest.mark.parametrize('app_config', [{}])
+def test_metrics_are_off_by_default(client):
+    assert client.get('/metrics').status_code == 404
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    for value in (0.003, 0.02, 0.02, 30):
+        registry.observe('http_request_duration_seconds', {'endpoint': 'x'}, value)
+
+    metrics = render_prometheus(merge_snapshots([registry.snapshot()]))
+
+    assert sample(metrics, 'http_request_duration_seconds_bucket', endpoint='x', le=0.005) == 1
+    assert sample(metrics, 'http_request_duration_seconds_bucket', endpoint='x', le=0.025) == 3
+    assert sample(metrics, 'http_request_duration_seconds_bucket', endpoint='x', le=10) == 3
+    assert sample(metrics, 'http_request_duration_seconds_bucket', endpoint='x', le='+Inf') == 4
+    assert sample(metrics, 'http_request_duration_seconds_count', endpoint='x') == 4
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import BackgroundJob
+from notifications import FakeProvider
+from services import _rate_limiter, claim_jobs, enqueue_jobs, run_jobs
+
+
+@pytest.fixture
+def provider(app):
+    # Replaces the provider build_provider made, so each test picks its failures
+    def provider(**kwargs):
+        app.extensions['notification_provider'] = FakeProvider(**kwargs)
+        return app.extensions['notification_provider']
+    return provider
+
+
+def enqueue(*keys):
+    count = enqueue_jobs('whatsapp_reminder', None, [
+        (key, {'to': '+15550000%03d' % n, 'message': 'Rent is due'}) for n, key in enumerate(keys)])
+    db.session.commit()
+    return count
+
+
+def make_due(job):
+    # Skip the backoff wait
+    job.run_after = datetime.utcnow()
+    db.session.commit()
+
+
+def test_enqueue_is_idempotent(app):
+    assert enqueue('reminder:1') == 1
+    assert enqueue('reminder:1', 'reminder:2') == 1
+    assert BackgroundJob.query.filter_by(idempotency_key='reminder:1').count() == 1
+    assert BackgroundJob.query.count() == 2
+
+
+def test_enqueue_counts_only_inserted_jobs_across_batches(app):
+    # More rows than one multi-row INSERT holds, with skipped keys in each
+    assert enqueue(*['reminder:%d' % n for n in range(0, 3000, 2)]) == 1500
+    assert enqueue(*['reminder:%d' % n for n in range(3000)]) == 1500
+    assert BackgroundJob.query.count() == 3000
+
+
+def test_claimed_jobs_belong_to_one_worker(app):
+    enqueue('a', 'b', 'c')
+    first = claim_jobs('worker-1', 2)
+    second = claim_jobs('worker-2', 10)
+    assert len(first) == 2 and len(second) == 1
+    assert not {job.id for job in first} & {job.id for job in second}
+    assert claim_jobs('worker-3', 10) == []
+    assert all(job.attempts == 1 for job in first + second)
+
+
+def test_retryable_failure_is_retried_with_backoff(app, provider):
+    fake = provider(fail_times=1)
+    enqueue('reminder:1')
+
+    started = datetime.utcnow()
+    assert run_jobs('worker-1') == 1
+    job = BackgroundJob.query.one()
+    assert job.status == 'queued'
+    assert job.attempts == 1
+    assert job.run_after > started
+    assert 'fake failure' in job.last_error
+    assert run_jobs('worker-1') == 0  # not due yet
+
+    make_due(job)
+    assert run_jobs('worker-1') == 1
+    db.session.refresh(job)
+    assert job.status == 'done'
+    assert job.attempts == 2
+    assert fake.sent == [('+15550000000', 'Rent is due')]
+
+
+def test_job_fails_after_max_attempts(app, provider):
+    app.config['JOB_MAX_ATTEMPTS'] = 3
+    fake = provider(fail_times=10)
+    enqueue('reminder:1')
+    job = BackgroundJob.query.one()
+    for attempt in range(3):
+        make_due(job)
+        assert run_jobs('worker-1') == 1
+        db.session.refresh(job)
+    assert job.status == 'failed'
+    assert job.attempts == 3
+    assert job.finished_at is not None
+    assert fake.sent == []
+
+
+def test_permanent_failure_is_not_retried(app, provider):
+    provider(fail_times=1, retryable=False)
+    enqueue('reminder:1')
+    run_jobs('worker-1')
+    job = BackgroundJob.query.one()
+    assert job.status == 'failed'
+    assert job.attempts == 1
+
+
+def test_rate_is_shared_between_worker_processes(app):
+    app.config.update(NOTIFICATION_RATE_PER_SECOND=30, NOTIFICATION_WORKERS=3)
+    assert _rate_limiter('fake').rate == 10
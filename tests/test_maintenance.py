@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import MaintenanceRequest, OwnerStats, Property
+from services import (detect_sla_breaches, maintenance_queue_page, new_maintenance_request,
+                      refresh_owner_stats, set_maintenance_status)
+
+
+@pytest.fixture
+def owner(add_owner):
+    owner = add_owner('a@example.com')
+    refresh_owner_stats(owner.id)
+    db.session.commit()
+    return owner
+
+
+def add_request(owner, priority, created_at=None):
+    request = new_maintenance_request(Property.query.filter_by(owner_id=owner.id).one(), priority,
+                                      issue_type='plumbing', description=priority)
+    if created_at:
+        request.created_at, request.sla_due_at = created_at, created_at + (request.sla_due_at - request.created_at)
+    db.session.commit()
+    return request
+
+
+def test_queue_is_ordered_by_priority_then_age(owner):
+    now = datetime.utcnow()
+    low = add_request(owner, 'low', now - timedelta(days=3))
+    new_urgent = add_request(owner, 'urgent', now - timedelta(hours=1))
+    old_urgent = add_request(owner, 'urgent', now - timedelta(hours=2))
+    medium = add_request(owner, 'medium', now - timedelta(days=1))
+
+    first, cursor = maintenance_queue_page(owner.id, limit=2)
+    rest, end = maintenance_queue_page(owner.id, cursor=cursor, limit=2)
+
+    assert [r.id for r in first + rest] == [old_urgent.id, new_urgent.id, medium.id, low.id]
+    assert end is None
+
+
+def test_sla_deadline_follows_priority(app, owner):
+    request = add_request(owner, 'high')
+
+    hours = app.config['MAINTENANCE_SLA_HOURS']['high']
+    assert request.sla_due_at - request.created_at == timedelta(hours=hours)
+
+
+def test_invalid_transition_is_rejected(owner):
+    request = add_request(owner, 'medium')
+    set_maintenance_status(request, 'completed')
+
+    with pytest.raises(ValueError):
+        set_maintenance_status(request, 'in_progress')
+
+
+def test_breaches_are_flagged_once_and_counted(owner):
+    request = add_request(owner, 'urgent', datetime.utcnow() - timedelta(hours=5))
+    add_request(owner, 'low')
+
+    assert detect_sla_breaches() == 1
+    assert detect_sla_breaches() == 0
+    db.session.commit()
+    assert db.session.get(OwnerStats, owner.id).sla_breach_count == 1
+
+    set_maintenance_status(request, 'completed')
+    db.session.commit()
+    stats = db.session.get(OwnerStats, owner.id)
+    assert (stats.open_maintenance_count, stats.sla_breach_count) == (1, 0)
+    # resolved late, so it stays marked as a breach
+    assert request.sla_breached
+
+
+def test_status_route_rejects_another_owners_request(client, owner, add_owner, login):
+    request = add_request(owner, 'medium')
+    add_owner('b@example.com')
+    login('b@example.com')
+
+    response = client.post('/maintenance/%d/status' % request.id, data={'status': 'completed'})
+
+    assert response.status_code == 404
+    assert db.session.get(MaintenanceRequest, request.id).status == 'open'
+
+
+def test_api_queue(client, owner, login):
+    add_request(owner, 'low')
+    urgent = add_request(owner, 'urgent')
+    login('a@example.com')
+
+    assert client.get('/api/maintenance/queue?status=open').get_json()['items'][0]['id'] == urgent.id
+    assert client.get('/api/maintenance/queue?status=closed').status_code == 400
@@ -0,0 +1,52 @@
+import pytest
+
+from models import Message, Property
+
+
+@pytest.mark.parametrize('fields', [
+    {'receiver_id': 'abc'},
+    {'receiver_id': [1]},
+    {'receiver_id': True},
+    {'email': 'b@example.com', 'property_id': 'x'},
+    {'email': 'b@example.com', 'property_id': {'id': 1}},
+    {'email': 'nobody@example.com'},
+])
+def test_api_rejects_invalid_message_args(client, add_owner, login, fields):
+    add_owner('a@example.com')
+    add_owner('b@example.com')
+    login('a@example.com')
+
+    response = client.post('/api/messages', json=dict(fields, message='Hello'))
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+    assert Message.query.count() == 0
+
+
+def test_api_sends_message_about_receivers_property(client, add_owner, login):
+    add_owner('a@example.com')
+    owner_b = add_owner('b@example.com')
+    property_b = Property.query.filter_by(owner_id=owner_b.id).one()
+    login('a@example.com')
+
+    response = client.post('/api/messages', json={
+        'receiver_id': str(owner_b.id), 'property_id': property_b.id, 'message': 'Hello'})
+
+    assert response.status_code == 201
+    assert Message.query.one().property_id == property_b.id
+
+
+@pytest.mark.parametrize('fields', [
+    {'receiver_id': 'abc'},
+    {'email': 'b@example.com', 'property_id': 'x'},
+])
+def test_send_form_flashes_invalid_message_args(client, add_owner, login, fields):
+    add_owner('a@example.com')
+    add_owner('b@example.com')
+    login('a@example.com')
+
+    response = client.post('/messages/send', data=dict(fields, message='Hello'))
+
+    assert response.status_code == 302
+    assert response.location.endswith('/messages')
+    assert Message.query.count() == 0
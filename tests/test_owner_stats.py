@@ -0,0 +1,90 @@
+"""
+The dashboard counters are adjusted in place by every write path; after each
+one they must equal a full recompute from the raw tables.
+"""
+import io
+from datetime import date, datetime, timedelta
+
+from extensions import db
+from importer import ErrorReport
+from models import ConversationMember, MaintenanceRequest, OwnerStats, Property, PropertyTransfer, Tenant
+from services import (compute_owner_stats, detect_sla_breaches, import_records, refresh_owner_stats,
+                      run_rent_ledger, send_message)
+
+
+def assert_stats_current(step, *owners):
+    db.session.expire_all()
+    for owner in owners:
+        stats = db.session.get(OwnerStats, owner.id)
+        expected = compute_owner_stats(owner.id)
+        assert {key: getattr(stats, key) for key in expected} == expected, step
+
+
+def test_counters_match_a_recompute_after_every_write(client, add_owner, login):
+    owner = add_owner('a@example.com', units=0)
+    peer = add_owner('b@example.com', units=0)
+    refresh_owner_stats(owner.id)
+    refresh_owner_stats(peer.id)
+    db.session.commit()
+    login('a@example.com')
+
+    def check(step, response=None):
+        if response is not None:
+            assert response.status_code == 302, step
+        assert_stats_current(step, owner, peer)
+
+    check('add property', client.post('/add_property', data={
+        'name': 'Flat', 'address': '1 High St', 'property_type': 'flat', 'monthly_rent': '1000'}))
+    property = Property.query.filter_by(owner_id=owner.id).one()
+
+    check('add tenant', client.post('/add_tenant', data={
+        'property_id': property.id, 'name': 'Tenant', 'phone': '5550001', 'lease_start': '2025-01-01',
+        'lease_end': '2026-12-31', 'security_deposit': '500'}))
+    tenant = Tenant.query.filter_by(owner_id=owner.id).one()
+
+    check('add payment', client.post('/add_payment', data={
+        'property_id': property.id, 'tenant_id': tenant.id, 'amount': '1000', 'payment_date': '2025-01-03',
+        'payment_method': 'cash', 'payment_type': 'rent'}))
+
+    errors = ErrorReport(io.StringIO())
+    import_records(owner.id, 'payments', [(2, {
+        'property_id': str(property.id), 'tenant_id': str(tenant.id), 'amount': '250',
+        'payment_date': '2025-02-03', 'payment_type': 'rent', 'status': 'pending'}), (3, {
+        'property_id': str(property.id), 'tenant_id': str(tenant.id), 'amount': '750',
+        'payment_date': '2025-02-04', 'payment_type': 'rent'})], errors)
+    assert errors.count == 0
+    check('import payments')
+
+    check('add maintenance', client.post('/add_maintenance', data={
+        'property_id': property.id, 'priority': 'urgent', 'issue_type': 'plumbing', 'description': 'Leak'}))
+    request = MaintenanceRequest.query.one()
+    detect_sla_breaches(datetime.utcnow() + timedelta(hours=12))
+    db.session.commit()
+    check('sla breach')
+    # A low priority deadline is days away, so the request is no longer late
+    check('maintenance priority', client.post('/maintenance/%d/priority' % request.id,
+                                              data={'priority': 'low'}))
+    check('maintenance in progress', client.post('/maintenance/%d/status' % request.id,
+                                                 data={'status': 'in_progress'}))
+    check('maintenance completed', client.post('/maintenance/%d/status' % request.id,
+                                               data={'status': 'completed'}))
+    check('maintenance reopened', client.post('/maintenance/%d/status' % request.id, data={'status': 'open'}))
+
+    send_message(peer.id, owner.id, 'Is the flat still yours?')
+    db.session.commit()
+    check('message received')
+    member = ConversationMember.query.filter_by(owner_id=owner.id).one()
+    assert client.get('/messages/%d' % member.conversation_id).status_code == 200
+    check('messages read')
+
+    run_rent_ledger(date.today())
+    db.session.commit()
+    check('rent ledger run')
+
+    check('move out', client.post('/tenants/%d/move_out' % tenant.id))
+
+    check('transfer offered', client.post('/properties/%d/transfer' % property.id,
+                                          data={'email': 'b@example.com'}))
+    login('b@example.com')
+    check('transfer accepted', client.post('/transfers/%d/accept' % PropertyTransfer.query.one().id))
+    assert db.session.get(OwnerStats, peer.id).property_count == 1
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+from extensions import db
+from models import Tenant
+from services import adjust_owner_stats, refresh_owner_stats
+
+
+@pytest.fixture
+def app_config(replica_config):
+    return replica_config
+
+
+@pytest.fixture
+def owner(add_owner, login):
+    owner = add_owner('a@example.com')
+    refresh_owner_stats(owner.id)
+    db.session.commit()
+    login('a@example.com')
+    return owner
+
+
+def tenants_etag(client):
+    # The first page after login shows its flashed message uncached
+    client.get('/tenants')
+    return client.get('/tenants').headers['ETag']
+
+
+def test_lagging_replica_does_not_validate_an_old_page(client, owner, sync_replica):
+    sync_replica()
+    before = tenants_etag(client)
+    assert client.get('/tenants', headers={'If-None-Match': before}).status_code == 304
+
+    # Written on the primary only; the replica still has the old version
+    db.session.add(Tenant(name='Newcomer', phone='5551111', property_id=owner.properties[0].id,
+                          owner_id=owner.id, lease_start=date(2025, 1, 1)))
+    adjust_owner_stats(owner.id, active_tenant_count=1)
+    db.session.commit()
+
+    response = client.get('/tenants', headers={'If-None-Match': before})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != before
+    assert b'Newcomer' in response.data
+    # and the cached copy of the new version has it too
+    assert b'Newcomer' in client.get('/tenants').data
+
+
+def test_if_modified_since_alone_does_not_answer_304(client, owner, sync_replica):
+    sync_replica()
+    tenants_etag(client)
+
+    response = client.get('/tenants', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+
+    assert response.status_code == 200
+    assert 'Last-Modified' not in response.headers
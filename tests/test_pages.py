@@ -0,0 +1,55 @@
+import io
+from datetime import date
+
+import pytest
+
+from extensions import db
+from models import Conversation, Document, Expense, Property
+from services import new_maintenance_request, send_message, store_document
+
+
+@pytest.fixture
+def owner(app, add_owner, login):
+    # An owner with a record behind every listing page, signed in
+    owner = add_owner('a@example.com')
+    other = add_owner('b@example.com')
+    property = Property.query.filter_by(owner_id=owner.id).one()
+    db.session.add(Expense(property_id=property.id, owner_id=owner.id, category='utilities', amount=120,
+                           expense_date=date(2025, 3, 1), vendor='Water Co'))
+    new_maintenance_request(property, 'high', issue_type='plumbing', description='Leaking tap')
+    with app.test_request_context():
+        store_document(property, io.BytesIO(b'lease text'), 'lease.txt', document_type='lease')
+    send_message(owner.id, other.id, 'Hello')
+    db.session.commit()
+    login('a@example.com')
+    return owner
+
+
+@pytest.mark.parametrize('path', [
+    '/dashboard', '/properties', '/add_property', '/tenants', '/add_tenant', '/payments', '/add_payment',
+    '/expenses', '/maintenance', '/maintenance?status=completed', '/add_maintenance', '/documents',
+    '/add_document', '/messages', '/search?q=tap', '/import', '/import?errors=abc', '/reports',
+    '/reports?mode=analytics',
+])
+def test_page_renders(client, owner, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert b'<h1>' in response.data
+
+
+def test_conversation_renders(client, owner):
+    conversation = Conversation.query.one()
+    response = client.get('/messages/%d' % conversation.id)
+    assert response.status_code == 200
+    assert b'Hello' in response.data
+
+
+def test_anonymous_pages_render(client):
+    for path in ('/', '/login', '/register'):
+        assert client.get(path).status_code == 200
+
+
+def test_listing_links_to_document(client, owner):
+    document = Document.query.one()
+    response = client.get('/documents')
+    assert ('/documents/%d' % document.id).encode() in response.data
@@ -0,0 +1,92 @@
+import io
+from datetime import date
+
+from extensions import db
+from importer import ErrorReport
+from models import Payment, Property, RentLedger, Tenant
+from services import import_records, recompute_rent_ledger
+
+
+def test_add_payment_rejects_another_owners_tenant(client, add_owner, login):
+    add_owner('a@example.com')
+    owner_b = add_owner('b@example.com')
+    tenant_a = Tenant.query.filter(Tenant.owner_id != owner_b.id).first()
+    property_b = Property.query.filter_by(owner_id=owner_b.id).first()
+    login('b@example.com')
+
+    response = client.post('/add_payment', data={
+        'property_id': property_b.id, 'tenant_id': tenant_a.id, 'amount': '5000', 'payment_date': '2025-03-01',
+        'payment_method': 'cash', 'payment_type': 'rent'})
+
+    assert response.status_code == 302
+    assert response.location.endswith('/add_payment')
+    assert Payment.query.count() == 0
+
+
+def test_add_payment_records_own_tenant(client, add_owner, login):
+    owner = add_owner('a@example.com')
+    tenant = Tenant.query.filter_by(owner_id=owner.id).one()
+    login('a@example.com')
+
+    response = client.post('/add_payment', data={
+        'property_id': tenant.property_id, 'tenant_id': tenant.id, 'amount': '1000',
+        'payment_date': '2025-03-01', 'payment_method': 'cash', 'payment_type': 'rent'})
+
+    assert response.status_code == 302
+    assert Payment.query.filter_by(tenant_id=tenant.id).count() == 1
+
+
+def test_ledger_ignores_payments_on_other_properties(app, add_owner):
+    owner_a = add_owner('a@example.com')
+    owner_b = add_owner('b@example.com')
+    tenant_a = Tenant.query.filter_by(owner_id=owner_a.id).one()
+    property_b = Property.query.filter_by(owner_id=owner_b.id).one()
+    db.session.add_all([
+        Payment(property_id=property_b.id, owner_id=owner_b.id, tenant_id=tenant_a.id, amount=5000,
+                payment_date=date(2025, 3, 2), payment_type='rent'),
+        Payment(property_id=tenant_a.property_id, owner_id=owner_a.id, tenant_id=tenant_a.id, amount=1000,
+                payment_date=date(2025, 2, 2), payment_type='rent'),
+    ])
+    db.session.commit()
+
+    recompute_rent_ledger([tenant_a.id], date(2025, 3, 20))
+
+    ledger = {entry.month: entry for entry in RentLedger.query.filter_by(tenant_id=tenant_a.id)}
+    assert ledger[date(2025, 2, 1)].status == 'paid'
+    assert ledger[date(2025, 3, 1)].amount_paid == 0
+    assert ledger[date(2025, 3, 1)].status == 'overdue'
+
+
+def test_payments_from_a_former_tenant_are_accepted_by_both_paths(client, add_owner, login):
+    owner = add_owner('a@example.com')
+    tenant = Tenant.query.filter_by(owner_id=owner.id).one()
+    tenant.is_active = False
+    db.session.commit()
+    login('a@example.com')
+
+    response = client.post('/add_payment', data={
+        'property_id': tenant.property_id, 'tenant_id': tenant.id, 'amount': '1000',
+        'payment_date': '2025-03-01', 'payment_method': 'cash', 'payment_type': 'rent'})
+    assert response.status_code == 302
+    assert response.location.endswith('/payments')
+
+    errors = ErrorReport(io.StringIO())
+    import_records(owner.id, 'payments', [(2, {
+        'property_id': str(tenant.property_id), 'tenant_id': str(tenant.id), 'amount': '500',
+        'payment_date': '2025-04-01', 'payment_type': 'rent'})], errors)
+    assert errors.count == 0
+
+    assert Payment.query.filter_by(tenant_id=tenant.id).count() == 2
+
+
+def test_import_rejects_another_propertys_tenant(add_owner):
+    owner = add_owner('a@example.com', units=2)
+    tenant, other = Tenant.query.filter_by(owner_id=owner.id).order_by(Tenant.id).all()
+
+    errors = ErrorReport(io.StringIO())
+    import_records(owner.id, 'payments', [(2, {
+        'property_id': str(other.property_id), 'tenant_id': str(tenant.id), 'amount': '500',
+        'payment_date': '2025-04-01', 'payment_type': 'rent'})], errors)
+
+    assert errors.count == 1
+    assert Payment.query.count() == 0
@@ -0,0 +1,21 @@
+from extensions import db
+from schema import full_scans, view_queries
+
+
+def test_view_queries_use_indexes(app):
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+
+    assert result.exit_code == 0, result.output
+    for name in ('reports.months', 'analytics.payments', 'export.payments', 'search', 'messages.mark_read'):
+        assert '\n%s ' % name in '\n' + result.output
+
+
+def test_a_missing_index_is_reported(app):
+    db.session.execute(db.text('DROP INDEX ix_rollup_owner_month'))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['check-query-plans'])
+
+    assert result.exit_code == 1
+    assert full_scans(view_queries(owner_id=1)['reports.months'])
+    assert 'FULL SCAN' in result.output
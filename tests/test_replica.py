@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import OwnerStats, Property
+from services import adjust_owner_stats, compute_owner_stats, refresh_owner_stats
+
+
+@pytest.fixture
+def app_config(replica_config):
+    return replica_config
+
+
+@pytest.fixture
+def statements(app):
+    # statements[bind_key]: the SQL each engine ran, None being the primary
+    seen = {}
+
+    def recorder(key):
+        def record(conn, cursor, statement, parameters, context, executemany):
+            seen[key].append(statement)
+        return record
+
+    for key, engine in db.engines.items():
+        seen[key] = []
+        event.listen(engine, 'before_cursor_execute', recorder(key))
+    return seen
+
+
+def ran(statements, text):
+    return any(text in statement for statement in statements)
+
+
+def test_read_only_views_query_the_replica(client, add_owner, login, sync_replica, statements):
+    add_owner('a@example.com')
+    login('a@example.com')
+    sync_replica()
+    statements[None].clear()
+
+    assert client.get('/maintenance').status_code == 200
+
+    assert ran(statements['replica'], 'FROM maintenance_request')
+    assert not ran(statements[None], 'FROM maintenance_request')
+
+
+def test_writes_go_to_the_primary(client, add_owner, login, sync_replica, statements):
+    owner = add_owner('a@example.com')
+    login('a@example.com')
+    sync_replica()
+    statements['replica'].clear()
+
+    response = client.post('/add_property', data={'name': 'New build', 'address': '2 Side St',
+                                                  'property_type': 'flat', 'monthly_rent': '900'})
+
+    assert response.status_code == 302
+    assert ran(statements[None], 'INSERT INTO property')
+    assert statements['replica'] == []
+    assert Property.query.filter_by(owner_id=owner.id).count() == 2
+
+
+def test_dashboard_with_stats_row_missing_on_the_replica(client, add_owner, login, sync_replica):
+    owner = add_owner('a@example.com')
+    login('a@example.com')
+    sync_replica()
+    # Created on the primary after the replica was copied
+    refresh_owner_stats(owner.id)
+    db.session.commit()
+
+    assert client.get('/dashboard').status_code == 200
+    assert OwnerStats.query.filter_by(owner_id=owner.id).count() == 1
+
+
+def test_first_write_creates_the_stats_row(app, add_owner):
+    owner = add_owner('a@example.com')
+
+    adjust_owner_stats(owner.id, active_tenant_count=1)
+    db.session.commit()
+
+    stats = db.session.get(OwnerStats, owner.id)
+    assert stats.active_tenant_count == compute_owner_stats(owner.id)['active_tenant_count'] == 1
+    assert stats.data_version == 1
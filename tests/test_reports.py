@@ -0,0 +1,87 @@
+import io
+from datetime import date
+
+from extensions import db
+from importer import ErrorReport
+from models import OwnerStats, Property, Tenant
+from services import compute_owner_stats, end_lease, financial_report, import_records, run_rent_ledger
+
+
+def add_property(owner):
+    property = Property(name='Flat', address='1 High St', owner_id=owner.id, monthly_rent=1000)
+    db.session.add(property)
+    db.session.commit()
+    return property
+
+
+def import_tenant(owner, property, today, **fields):
+    errors = ErrorReport(io.StringIO())
+    record = dict({'name': 'Imported', 'phone': '5559999', 'property_id': str(property.id),
+                   'lease_start': '2025-01-15'}, **fields)
+    assert import_records(owner.id, 'tenants', [(2, record)], errors, today=today) == 1
+    assert errors.count == 0
+    return Tenant.query.filter_by(phone='5559999').one()
+
+
+def occupancy(owner, start, end):
+    report = financial_report(owner.id, start, end)
+    return {month['month']: (month['occupancy'], month['rent_due']) for month in report['months']}
+
+
+def test_open_ended_lease_stays_occupied_after_the_import_month(app, add_owner):
+    owner = add_owner('a@example.com', units=0)
+    property = add_property(owner)
+    import_tenant(owner, property, date(2025, 3, 10))
+    run_rent_ledger(date(2025, 3, 10))
+    db.session.commit()
+
+    # April's run was missed; May's catches up on it
+    run_rent_ledger(date(2025, 5, 2))
+    db.session.commit()
+
+    months = occupancy(owner, date(2025, 1, 1), date(2025, 6, 1))
+    for month in ('2025-01', '2025-02', '2025-03', '2025-04', '2025-05'):
+        assert months[month] == (1.0, 1000)
+    assert months['2025-06'] == (0.0, 0)
+    assert financial_report(owner.id, date(2025, 4, 1), date(2025, 4, 1))['totals']['rent_due'] == 1000
+
+
+def test_moving_out_clears_occupancy_after_the_lease_ends(app, add_owner):
+    owner = add_owner('a@example.com', units=0)
+    property = add_property(owner)
+    tenant = import_tenant(owner, property, date(2025, 2, 1), lease_end='2025-12-31')
+    assert occupancy(owner, date(2025, 12, 1), date(2025, 12, 1))['2025-12'] == (1.0, 1000)
+
+    end_lease(tenant, date(2025, 3, 15))
+    db.session.commit()
+
+    months = occupancy(owner, date(2025, 1, 1), date(2025, 12, 1))
+    assert [months['2025-%02d' % n][0] for n in range(1, 13)] == [1.0] * 3 + [0.0] * 9
+    assert tenant.lease_end == date(2025, 3, 15)
+    assert db.session.get(OwnerStats, owner.id).active_tenant_count == 0
+
+
+def test_move_out_route(client, add_owner, login):
+    owner = add_owner('a@example.com')
+    tenant = Tenant.query.filter_by(owner_id=owner.id).one()
+    login('a@example.com')
+
+    response = client.post('/tenants/%d/move_out' % tenant.id)
+
+    assert response.status_code == 302
+    db.session.refresh(tenant)
+    assert not tenant.is_active
+    assert tenant.lease_end == date.today()
+    stats = db.session.get(OwnerStats, owner.id)
+    assert stats.active_tenant_count == compute_owner_stats(owner.id)['active_tenant_count'] == 0
+
+
+def test_move_out_route_rejects_another_owners_tenant(client, add_owner, login):
+    owner_a = add_owner('a@example.com')
+    add_owner('b@example.com')
+    tenant = Tenant.query.filter_by(owner_id=owner_a.id).one()
+    login('b@example.com')
+
+    assert client.post('/tenants/%d/move_out' % tenant.id).status_code == 404
+    db.session.refresh(tenant)
+    assert tenant.is_active
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+from extensions import db
+from models import Expense, Property, Tenant
+from services import rebuild_search_index, search_records, transfer_property
+
+
+@pytest.fixture
+def owners(add_owner):
+    owner_a = add_owner('a@example.com')
+    owner_b = add_owner('b@example.com')
+    tenant = Tenant.query.filter_by(owner_id=owner_a.id).one()
+    tenant.name, tenant.phone = 'Harriet Quill', '555-867-5309'
+    Tenant.query.filter_by(owner_id=owner_b.id).one().name = 'Harriet Other'
+    property = db.session.get(Property, tenant.property_id)
+    db.session.add(Expense(property_id=property.id, owner_id=owner_a.id, category='maintenance', amount=120,
+                           expense_date=date(2025, 3, 1), vendor='Quickfix Plumbing',
+                           description='Replaced the boiler valve'))
+    db.session.commit()
+    return owner_a, owner_b
+
+
+def found(owner, text, **kwargs):
+    return {(result['kind'], result['id']) for result in search_records(owner.id, text, **kwargs)}
+
+
+def test_prefix_search_is_scoped_to_the_owner(owners):
+    owner_a, owner_b = owners
+    tenant = Tenant.query.filter_by(owner_id=owner_a.id).one()
+
+    assert found(owner_a, 'harr qui') == {('tenant', tenant.id)}
+    assert ('tenant', tenant.id) not in found(owner_b, 'harriet')
+
+
+def test_phone_numbers_match_as_digits(owners):
+    owner_a, _ = owners
+
+    assert {kind for kind, _ in found(owner_a, '5558675309')} == {'tenant'}
+
+
+def test_kinds_filter(owners):
+    owner_a, _ = owners
+
+    assert {kind for kind, _ in found(owner_a, 'boiler')} == {'expense'}
+    assert found(owner_a, 'boiler', kinds=['tenant']) == set()
+
+
+def test_edits_and_transfers_update_the_index(owners):
+    owner_a, owner_b = owners
+    property = Property.query.filter_by(owner_id=owner_a.id).one()
+    property.name = 'Lighthouse Cottage'
+    db.session.commit()
+    assert found(owner_a, 'lighthouse') == {('property', property.id)}
+
+    transfer_property(property, owner_b.id)
+    db.session.commit()
+
+    assert found(owner_a, 'lighthouse') == set()
+    assert found(owner_b, 'lighthouse') == {('property', property.id)}
+
+
+def test_rebuild_keeps_the_same_results(owners):
+    owner_a, _ = owners
+    before = found(owner_a, 'harriet')
+
+    rebuild_search_index()
+
+    assert found(owner_a, 'harriet') == before != set()
+
+
+def test_autocomplete_waits_for_two_characters(client, owners, login):
+    login('a@example.com')
+
+    assert client.get('/api/search/autocomplete?q=h').get_json()['items'] == []
+    labels = [item['label'] for item in client.get('/api/search/autocomplete?q=ha').get_json()['items']]
+    assert 'Harriet Quill' in labels
+    assert client.get('/api/search?q=harriet&kind=owner').status_code == 400
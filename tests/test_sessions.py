@@ -0,0 +1,98 @@
+import time
+
+from sqlalchemy import event
+
+from cache import TTLCache
+from config import _secret_key
+from extensions import db
+
+
+def session_cookie(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+
+def stored_sessions(app):
+    store = app.session_interface.store
+    return dict(store._connection().execute('SELECT sid, data FROM session').fetchall())
+
+
+def test_session_data_stays_on_the_server(app, client, add_owner, login):
+    add_owner('a@example.com')
+    login('a@example.com')
+
+    cookie = session_cookie(client)
+    sid = app.session_interface._signer(app).unsign(cookie).decode('utf-8')
+    assert '_user_id' not in cookie
+    assert '_user_id' in stored_sessions(app)[sid]
+
+
+def test_login_moves_the_session_to_a_new_id(app, client, add_owner, login):
+    add_owner('a@example.com')
+    client.get('/toggle_dark_mode')
+    before = session_cookie(client)
+    assert len(stored_sessions(app)) == 1
+
+    login('a@example.com')
+
+    assert session_cookie(client) != before
+    assert len(stored_sessions(app)) == 1
+    # the planted id no longer carries anything
+    client.set_cookie('session', before)
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_logout_signs_the_stored_session_out(app, client, add_owner, login):
+    add_owner('a@example.com')
+    login('a@example.com')
+    cookie = session_cookie(client)
+
+    client.get('/logout')
+
+    assert not any('_user_id' in data for data in stored_sessions(app).values())
+    client.set_cookie('session', cookie)
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_tampered_cookie_starts_an_anonymous_session(client, add_owner, login):
+    add_owner('a@example.com')
+    login('a@example.com')
+    client.set_cookie('session', session_cookie(client) + 'x')
+
+    assert client.get('/dashboard').status_code == 302
+
+
+def test_signed_in_requests_reuse_the_cached_owner(app, client, add_owner, login):
+    add_owner('a@example.com')
+    login('a@example.com')
+    owner_reads = []
+    event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: owner_reads.append(
+        statement) if 'FROM owner ' in statement else None)
+
+    assert client.get('/tenants').status_code == 200
+    assert client.get('/tenants').status_code == 200
+
+    assert len(owner_reads) <= 1
+    app.extensions['owner_cache'].clear()
+    client.get('/tenants')
+    assert len(owner_reads) >= 1
+
+
+def test_ttl_cache_expires_and_evicts():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (None, 2, 3)
+
+    expiring = TTLCache(ttl=0.01)
+    expiring.set('a', 1)
+    time.sleep(0.02)
+    assert expiring.get('a', 'gone') == 'gone'
+
+
+def test_generated_secret_key_is_kept(tmp_path, monkeypatch):
+    monkeypatch.delenv('SECRET_KEY')
+    key = _secret_key(str(tmp_path))
+
+    assert key == _secret_key(str(tmp_path)) == (tmp_path / 'secret_key').read_text().strip()
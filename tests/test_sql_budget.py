@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pytest
+from flask import g, request, request_finished
+
+from extensions import db
+from models import Expense, Payment, Tenant
+from services import refresh_owner_stats
+
+
+@pytest.fixture
+def owner_with(add_owner):
+    # owner_with(email, units): `units` let properties with three months of
+    # rent and two expenses each
+    def owner_with(email, units):
+        owner = add_owner(email, units=units)
+        for tenant in Tenant.query.filter_by(owner_id=owner.id):
+            for month in range(3):
+                db.session.add(Payment(property_id=tenant.property_id, owner_id=owner.id, tenant_id=tenant.id,
+                                       amount=1000, payment_date=date(2025, month + 1, 1), payment_type='rent'))
+            for n in range(2):
+                db.session.add(Expense(property_id=tenant.property_id, owner_id=owner.id, category='utilities',
+                                       amount=50, expense_date=date(2025, 1, 1) + timedelta(days=n)))
+        refresh_owner_stats(owner.id)
+        db.session.commit()
+        return owner
+    return owner_with
+
+
+def statements(app, client, path):
+    # SQL statements the view issued, counted by its sql_budget decorator,
+    # and that budget
+    counted = []
+
+    def record(sender, response, **extra):
+        counted.append((g.sql_statements, app.view_functions[request.endpoint].sql_budget))
+
+    with request_finished.connected_to(record, app):
+        assert client.get(path).status_code == 200
+    return counted[0]
+
+
+@pytest.mark.parametrize('path', ['/dashboard', '/payments', '/tenants', '/expenses'])
+def test_statement_count_does_not_grow_with_data(app, client, owner_with, login, path):
+    owner_with('small@example.com', units=1)
+    owner_with('large@example.com', units=20)
+
+    login('small@example.com')
+    small, budget = statements(app, client, path)
+    login('large@example.com')
+    large, _ = statements(app, client, path)
+
+    assert small == large
+    assert large <= budget
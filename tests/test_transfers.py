@@ -0,0 +1,118 @@
+from datetime import date
+
+import pytest
+
+from extensions import db
+from models import MonthlyRollup, OwnerStats, Payment, Property, PropertyTransfer, Tenant
+from services import compute_owner_stats, financial_report, refresh_owner_stats
+
+
+@pytest.fixture
+def owners(client, add_owner, login):
+    # a@ owns one let property with a recorded rent payment; b@ owns one too
+    owner_a = add_owner('a@example.com')
+    owner_b = add_owner('b@example.com')
+    for owner in (owner_a, owner_b):
+        refresh_owner_stats(owner.id)
+    db.session.commit()
+    tenant = Tenant.query.filter_by(owner_id=owner_a.id).one()
+    login('a@example.com')
+    client.post('/add_payment', data={
+        'property_id': tenant.property_id, 'tenant_id': tenant.id, 'amount': '1000',
+        'payment_date': '2025-03-01', 'payment_method': 'cash', 'payment_type': 'rent'})
+    assert Payment.query.count() == 1
+    return owner_a, owner_b, db.session.get(Property, tenant.property_id)
+
+
+def offer(client, property, email):
+    return client.post('/properties/%d/transfer' % property.id, data={'email': email})
+
+
+def assert_stats_match(owner_id):
+    stats = db.session.get(OwnerStats, owner_id)
+    db.session.refresh(stats)
+    assert {key: getattr(stats, key) for key in compute_owner_stats(owner_id)} == compute_owner_stats(owner_id)
+
+
+def income(owner_id):
+    return financial_report(owner_id, date(2025, 1, 1), date(2025, 12, 1))['totals']['income']
+
+
+def test_accepted_transfer_moves_the_property_and_its_totals(client, login, owners):
+    owner_a, owner_b, property = owners
+    assert offer(client, property, 'b@example.com').status_code == 302
+    transfer = PropertyTransfer.query.one()
+    # Nothing moves until the recipient accepts
+    assert property.owner_id == owner_a.id
+    assert income(owner_a.id) == 1000
+
+    login('b@example.com')
+    assert client.post('/transfers/%d/accept' % transfer.id).status_code == 302
+
+    db.session.refresh(property)
+    assert property.owner_id == owner_b.id
+    assert PropertyTransfer.query.count() == 0
+    assert Payment.query.one().owner_id == owner_b.id
+    assert MonthlyRollup.query.filter_by(property_id=property.id, owner_id=owner_a.id).count() == 0
+    assert (income(owner_a.id), income(owner_b.id)) == (0, 1000)
+    assert_stats_match(owner_a.id)
+    assert_stats_match(owner_b.id)
+    assert db.session.get(OwnerStats, owner_b.id).property_count == 2
+
+
+def test_only_the_recipient_can_accept(client, add_owner, login, owners):
+    owner_a, owner_b, property = owners
+    add_owner('c@example.com')
+    offer(client, property, 'b@example.com')
+    transfer = PropertyTransfer.query.one()
+
+    assert client.post('/transfers/%d/accept' % transfer.id).status_code == 404
+    login('c@example.com')
+    assert client.post('/transfers/%d/accept' % transfer.id).status_code == 404
+    assert client.post('/transfers/%d/cancel' % transfer.id).status_code == 404
+
+    db.session.refresh(property)
+    assert property.owner_id == owner_a.id
+    assert PropertyTransfer.query.count() == 1
+
+
+def test_declined_transfer_leaves_the_property(client, login, owners):
+    owner_a, owner_b, property = owners
+    offer(client, property, 'b@example.com')
+    login('b@example.com')
+
+    client.post('/transfers/%d/cancel' % PropertyTransfer.query.one().id)
+
+    db.session.refresh(property)
+    assert property.owner_id == owner_a.id
+    assert PropertyTransfer.query.count() == 0
+
+
+def test_cannot_offer_another_owners_property(client, login, owners):
+    owner_a, owner_b, property = owners
+    property_b = Property.query.filter_by(owner_id=owner_b.id).one()
+
+    assert offer(client, property_b, 'a@example.com').status_code == 404
+    assert PropertyTransfer.query.count() == 0
+
+
+@pytest.mark.parametrize('email', ['nobody@example.com', 'a@example.com'])
+def test_offer_needs_another_registered_owner(client, owners, email):
+    owner_a, owner_b, property = owners
+
+    response = offer(client, property, email)
+
+    assert response.status_code == 302
+    assert PropertyTransfer.query.count() == 0
+    assert income(owner_a.id) == 1000
+
+
+def test_properties_page_lists_offers(client, login, owners):
+    owner_a, owner_b, property = owners
+    offer(client, property, 'b@example.com')
+    client.get('/properties')
+    assert b'Offered to b' in client.get('/properties').data
+
+    login('b@example.com')
+    client.get('/properties')
+    assert b'/accept' in client.get('/properties').data